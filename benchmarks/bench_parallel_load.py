@@ -0,0 +1,66 @@
+"""Замер масштабирования параллельного разбора CSV от 1 до N процессов.
+
+    python benchmarks/bench_parallel_load.py --rows 2000000 --max-workers 8
+"""
+import argparse
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from csv_editor.core.utils.importers.parallel_csv import parse_csv_parallel
+
+
+def generate_csv(filename, rows, seed=0):
+    # Числа, текст и многострочные поля в кавычках
+    rnd = random.Random(seed)
+    with open(filename, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        for i in range(rows):
+            writer.writerow([
+                i,
+                f"{rnd.uniform(-1000, 1000):.3f}",
+                f"name {rnd.randint(0, 5000)}",
+                "line one\nline \"two\"" if i % 10 == 0 else "plain",
+            ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--file', help="существующий CSV вместо сгенерированного")
+    args = parser.parse_args()
+
+    filename = args.file
+    if filename is None:
+        fd, filename = tempfile.mkstemp(suffix='.csv')
+        os.close(fd)
+        generate_csv(filename, args.rows)
+    try:
+        size_mb = os.path.getsize(filename) / 1e6
+        print(f"{filename}: {size_mb:.1f} MB")
+        baseline = None
+        rows = None
+        for workers in range(1, args.max_workers + 1):
+            start = time.perf_counter()
+            store = parse_csv_parallel(filename, workers=workers)
+            elapsed = time.perf_counter() - start
+            if rows is None:
+                rows = store.row_count()
+            elif store.row_count() != rows:
+                raise SystemExit(f"row count mismatch with {workers} workers")
+            baseline = baseline or elapsed
+            print(f"workers={workers:2d}  {elapsed:7.2f} s  "
+                  f"{size_mb / elapsed:7.1f} MB/s  speedup x{baseline / elapsed:.2f}")
+    finally:
+        if args.file is None:
+            os.remove(filename)
+
+
+if __name__ == '__main__':
+    main()
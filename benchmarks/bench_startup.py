@@ -0,0 +1,116 @@
+"""Время холодного запуска редактора и проверка бюджета запуска.
+
+    python benchmarks/bench_startup.py --runs 5
+    python benchmarks/bench_startup.py --import-budget-ms 150 --window-budget-ms 500
+
+Каждый замер — отдельный процесс Python (холодный импорт). Скрипт
+завершается с кодом 1, если медиана превысила бюджет или при запуске
+импортирован модуль, который должен загружаться только при первом
+использовании (openpyxl, диалоги и т.п.).
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Бюджеты по умолчанию (мс, медиана): примерно вдвое больше измеренных
+# медиан (импорт 30-45 мс, окно 105-125 мс), чтобы регрессия была заметна;
+# на медленной машине бюджеты задаются ключами
+IMPORT_BUDGET_MS = 90
+WINDOW_BUDGET_MS = 250
+
+# Модули, которых не должно быть в процессе сразу после показа окна
+LAZY_MODULES = [
+    'openpyxl',
+    'markdown',
+    'multiprocessing',
+    'concurrent.futures',
+    'csv_editor.ui.dialogs.group_dialog',
+    'csv_editor.ui.dialogs.pivot_dialog',
+    'csv_editor.ui.dialogs.history_browser',
+    'csv_editor.ui.dialogs.comparison',
+    'csv_editor.ui.dialogs.find_replace',
+    'csv_editor.ui.dialogs.performance',
+    'csv_editor.core.controllers.comparison',
+    'csv_editor.core.controllers.pipeline',
+]
+
+# Выполняется в дочернем процессе; печатает одну строку JSON
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+from PyQt5.QtWidgets import QApplication
+app = QApplication(sys.argv)
+qt_done = time.perf_counter()
+from csv_editor.ui.main_window import MainWindow
+import_done = time.perf_counter()
+window = MainWindow()
+window.show()
+app.processEvents()
+shown = time.perf_counter()
+print(json.dumps({
+    'qt_ms': (qt_done - start) * 1000,
+    'import_ms': (import_done - qt_done) * 1000,
+    'window_ms': (shown - import_done) * 1000,
+    'total_ms': (shown - start) * 1000,
+    'lazy_loaded': [name for name in LAZY if name in sys.modules],
+}))
+window.close()
+"""
+
+
+def probe(cwd):
+    env = dict(os.environ)
+    env['PYTHONPATH'] = ROOT + os.pathsep + env.get('PYTHONPATH', '')
+    # Без дисплея (CI, ssh) окно рисуется вне экрана
+    env.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    code = f"LAZY = {LAZY_MODULES!r}\n" + PROBE
+    # Рабочий каталог — временный: журнал и автосохранение не попадают в репозиторий
+    output = subprocess.run([sys.executable, '-c', code], cwd=cwd, env=env,
+                            check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--import-budget-ms', type=float, default=IMPORT_BUDGET_MS,
+                        help="бюджет импорта main_window (медиана)")
+    parser.add_argument('--window-budget-ms', type=float, default=WINDOW_BUDGET_MS,
+                        help="бюджет от старта процесса до показа окна (медиана)")
+    args = parser.parse_args()
+
+    samples = []
+    with tempfile.TemporaryDirectory() as cwd:
+        for run in range(args.runs):
+            sample = probe(cwd)
+            samples.append(sample)
+            print(f"run {run + 1}: Qt {sample['qt_ms']:6.1f} ms  "
+                  f"import {sample['import_ms']:6.1f} ms  "
+                  f"window {sample['window_ms']:6.1f} ms  total {sample['total_ms']:6.1f} ms")
+
+    import_ms = statistics.median(s['import_ms'] for s in samples)
+    total_ms = statistics.median(s['total_ms'] for s in samples)
+    loaded = sorted({name for s in samples for name in s['lazy_loaded']})
+    print(f"median: import {import_ms:.1f} ms (budget {args.import_budget_ms:.0f}), "
+          f"window shown {total_ms:.1f} ms (budget {args.window_budget_ms:.0f})")
+
+    failures = []
+    if import_ms > args.import_budget_ms:
+        failures.append(f"import took {import_ms:.1f} ms")
+    if total_ms > args.window_budget_ms:
+        failures.append(f"window shown after {total_ms:.1f} ms")
+    if loaded:
+        failures.append("imported at startup: " + ", ".join(loaded))
+    if failures:
+        raise SystemExit("startup budget exceeded: " + "; ".join(failures))
+    print("startup budget OK")
+
+
+if __name__ == '__main__':
+    main()
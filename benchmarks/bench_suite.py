@@ -0,0 +1,311 @@
+"""Набор замеров горячих путей редактора: загрузка, сортировка, фильтр,
+группировка, история и экспорт на синтетических CSV от 10k до 10M строк.
+
+    python benchmarks/bench_suite.py --sizes 10k,100k,1m -o results.json
+    python benchmarks/bench_suite.py --sizes 100k --ops sort,filter --baseline results.json
+
+Каждая операция выполняется в отдельном процессе без дисплея (платформа
+Qt offscreen); записываются время операции и пик RSS. Подготовка
+(загрузка таблицы для всех операций, кроме load_*) в замер не входит.
+Результаты сохраняются в JSON; с --baseline прогон сравнивается
+с прошлым, и скрипт завершается с кодом 1 при замедлении больше допуска.
+"""
+import argparse
+import csv
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+HEADERS = ['id', 'amount', 'category', 'name', 'city', 'created', 'notes']
+CATEGORIES = [f"cat{n:02d}" for n in range(20)]
+CITIES = ['Oslo', 'Rome', 'Lima', 'Kyiv', 'Pune', 'Quito', 'Perth', 'Tunis']
+
+# Для медленных операций замер выше этого числа строк пропускается
+# (снимается ограничение флагом --no-limits)
+SLOW_LIMIT = 1000000
+DEFAULT_SIZES = '10k,100k,1m'
+# Замедление больше этой доли относительно базового прогона — регрессия
+TOLERANCE = 0.25
+# Разница меньше этой (секунды) — шум, а не регрессия
+MIN_DELTA = 0.01
+
+
+def parse_size(text):
+    text = text.strip().lower()
+    scale = {'k': 1000, 'm': 1000000}.get(text[-1:], 1)
+    return int(float(text.rstrip('km')) * scale)
+
+
+def generate_csv(filename, rows, seed=0):
+    # Числа, повторяющийся и уникальный текст, даты и многострочные поля
+    rnd = random.Random(seed)
+    with open(filename, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADERS)
+        for i in range(rows):
+            writer.writerow([
+                i,
+                f"{rnd.uniform(-1000, 1000):.2f}",
+                rnd.choice(CATEGORIES),
+                f"name {rnd.randint(0, 50000)}",
+                rnd.choice(CITIES),
+                f"2024-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}",
+                "line one\nline \"two\"" if i % 10 == 0 else "plain note",
+            ])
+
+
+def data_file(data_dir, rows):
+    # Сгенерированные файлы переиспользуются между прогонами
+    filename = os.path.join(data_dir, f"bench_{rows}.csv")
+    if not os.path.exists(filename):
+        print(f"generating {filename}...", flush=True)
+        generate_csv(filename + '.tmp', rows)
+        os.replace(filename + '.tmp', filename)
+    return filename
+
+
+# --- Операции (выполняются в дочернем процессе) ---
+
+class Bench:
+    """Окружение одного замера: модель, прокси и контроллеры как в MainWindow"""
+    def __init__(self, filename, out_dir):
+        from PyQt5.QtWidgets import QUndoStack
+        from csv_editor.core.models.csv_table_model import ColumnarTableModel
+        from csv_editor.core.models.proxy_model import MySortFilterProxyModel
+        from csv_editor.core.controllers.file_io import FileIOController
+        from csv_editor.core.controllers.history import HistoryController
+        from csv_editor.core.controllers.data_operations import DataOperationsController
+        self.filename = filename
+        self.out_dir = out_dir
+        self.undo_stack = QUndoStack()
+        self.model = ColumnarTableModel(0, 0, None, self.undo_stack)
+        self.proxy = MySortFilterProxyModel()
+        self.proxy.setSourceModel(self.model)
+        self.file_io = FileIOController(self.model)
+        self.history = HistoryController(self.model, self.undo_stack)
+        self.data_ops = DataOperationsController(self.model, self.undo_stack)
+
+    def load(self):
+        self.file_io.load_csv(self.filename, workers=1)
+
+    def write_cache(self):
+        # Первое открытие разбирает файл и пишет кэш сессии (если его не было)
+        self.file_io.load_csv(self.filename, workers=1, cache=True)
+
+    def output(self, suffix):
+        return os.path.join(self.out_dir, f"out{suffix}")
+
+
+def _edit_cells(bench, count=1000):
+    rows = bench.model.rowCount()
+    step = max(1, rows // count)
+    targets = list(range(0, rows, step))[:count]
+    bench.model.set_cells({3: (targets, [f"edited {row}" for row in targets])}, "Bench")
+
+
+def _prepare_history(bench):
+    bench.history.take_snapshot("Loaded")
+    _edit_cells(bench)
+    bench.history.take_snapshot("Edited")
+
+
+def _filter_regexp(bench):
+    bench.proxy.setFilterRegExp("name 123")
+    return bench.proxy.rowCount()
+
+
+# имя: (подготовка, замеряемое действие, медленная ли операция)
+OPERATIONS = {
+    'load_csv': (None, lambda b: b.file_io.load_csv(b.filename, workers=1), False),
+    'load_parallel': (None, lambda b: b.file_io.load_csv(b.filename), False),
+    'open_lazy': (None, lambda b: b.file_io.open_csv_lazy(b.filename), False),
+    'load_cached': (Bench.write_cache, lambda b: b.file_io.load_csv(b.filename, cache=True), False),
+    'sort_numeric': (Bench.load, lambda b: b.proxy.sort(1), False),
+    'sort_text': (Bench.load, lambda b: b.proxy.sort(3), False),
+    'sort_multi': (Bench.load, lambda b: b.proxy.sort_by_columns([(2, 0), (1, 1)]), False),
+    'filter_regexp': (Bench.load, _filter_regexp, False),
+    'filter_words': (Bench.load,
+                     lambda b: b.proxy.set_extended_filter(["oslo", "cat07"], True), False),
+    'filter_lazy': (lambda b: b.file_io.open_csv_lazy(b.filename), _filter_regexp, True),
+    'group_by_column': (Bench.load, lambda b: b.data_ops.group_by_column(2), True),
+    'group_data': (Bench.load,
+                   lambda b: b.data_ops.group_data([2, 4], [(1, 'sum'), (1, 'avg'),
+                                                            (0, 'count')]), False),
+    'edit_batch': (Bench.load, _edit_cells, False),
+    'history_checkpoint': (Bench.load, lambda b: b.history.take_snapshot("Bench"), False),
+    'history_restore': (lambda b: (b.load(), _prepare_history(b)),
+                        lambda b: b.history.restore_snapshot(0), False),
+    'export_csv': (Bench.load, lambda b: b.file_io.save_csv(b.output('.csv')), False),
+    'export_excel': (Bench.load, lambda b: b.file_io.export_to_excel(b.output('.xlsx')), True),
+    'export_sqlite': (Bench.load, lambda b: b.file_io.export_sqlite(b.output('.db'), 'data'),
+                      False),
+}
+
+
+def _reset_peak_rss():
+    # Linux: запись "5" в clear_refs сбрасывает пик RSS (VmHWM) процесса
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _rss_mb(field):
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # Не Linux: пик за всё время процесса (на macOS в байтах)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def run_operation(name, filename):
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication([sys.argv[0]])
+    prepare, action, _ = OPERATIONS[name]
+    with tempfile.TemporaryDirectory() as out_dir:
+        bench = Bench(filename, out_dir)
+        if prepare is not None:
+            prepare(bench)
+        app.processEvents()
+        rss_before = _rss_mb('VmRSS')
+        peak_reset = _reset_peak_rss()
+        start = time.perf_counter()
+        action(bench)
+        seconds = time.perf_counter() - start
+        peak = _rss_mb('VmHWM')
+    return {
+        'seconds': seconds,
+        'rss_before_mb': round(rss_before, 1),
+        'peak_rss_mb': round(peak, 1),
+        # False — пик включает подготовку (нет /proc/self/clear_refs)
+        'peak_is_operation_only': peak_reset,
+    }
+
+
+# --- Управляющий процесс ---
+
+def measure(name, filename, repeat):
+    env = dict(os.environ)
+    env.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    best = None
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, os.path.abspath(__file__),
+                                 '--run-op', name, '--file', filename],
+                                env=env, check=True, capture_output=True, text=True).stdout
+        sample = json.loads(output.strip().splitlines()[-1])
+        # Лучший из повторов: меньше всего шума от остальной системы
+        if best is None or sample['seconds'] < best['seconds']:
+            best = sample
+    return best
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(results, baseline_file, tolerance):
+    with open(baseline_file, encoding='utf-8') as f:
+        baseline = {(r['op'], r['rows']): r for r in json.load(f)['results']}
+    regressions = []
+    print(f"\ncompared with {baseline_file} (tolerance {tolerance:.0%}):")
+    for result in results:
+        old = baseline.get((result['op'], result['rows']))
+        if old is None:
+            continue
+        ratio = result['seconds'] / old['seconds'] if old['seconds'] else 1.0
+        mark = ""
+        if ratio > 1 + tolerance and result['seconds'] - old['seconds'] > MIN_DELTA:
+            mark = "  REGRESSION"
+            regressions.append(result)
+        print(f"  {result['op']:<20} {result['rows']:>9}  {old['seconds']:8.3f} s -> "
+              f"{result['seconds']:8.3f} s  x{ratio:.2f}{mark}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default=DEFAULT_SIZES,
+                        help="число строк через запятую, например 10k,1m,10m")
+    parser.add_argument('--ops', help="операции или их префиксы через запятую "
+                                      f"(по умолчанию все: {', '.join(OPERATIONS)})")
+    parser.add_argument('--repeat', type=int, default=1, help="повторов на замер (берётся лучший)")
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(),
+                                                           'csv_editor_bench'))
+    parser.add_argument('-o', '--output', default='bench_results.json')
+    parser.add_argument('--baseline', help="JSON прошлого прогона для сравнения")
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE)
+    parser.add_argument('--no-limits', action='store_true',
+                        help=f"медленные операции и на таблицах больше {SLOW_LIMIT} строк")
+    parser.add_argument('--run-op', help=argparse.SUPPRESS)
+    parser.add_argument('--file', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_op:
+        print(json.dumps(run_operation(args.run_op, args.file)))
+        return
+
+    names = list(OPERATIONS)
+    if args.ops:
+        prefixes = [name.strip() for name in args.ops.split(',') if name.strip()]
+        names = [name for name in names if any(name.startswith(p) for p in prefixes)]
+        if not names:
+            raise SystemExit(f"no operations match {args.ops!r}")
+    os.makedirs(args.data_dir, exist_ok=True)
+
+    results = []
+    for rows in map(parse_size, args.sizes.split(',')):
+        filename = data_file(args.data_dir, rows)
+        for name in names:
+            if OPERATIONS[name][2] and rows > SLOW_LIMIT and not args.no_limits:
+                print(f"{name:<20} {rows:>9}  skipped (slow, see --no-limits)")
+                continue
+            sample = measure(name, filename, args.repeat)
+            result = {'op': name, 'rows': rows, **sample}
+            results.append(result)
+            print(f"{name:<20} {rows:>9}  {sample['seconds']:8.3f} s  "
+                  f"peak {sample['peak_rss_mb']:8.1f} MB", flush=True)
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'repeat': args.repeat,
+        },
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"results written to {args.output}")
+
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.tolerance)
+        if regressions:
+            raise SystemExit(f"{len(regressions)} operations slower than the baseline")
+
+
+if __name__ == '__main__':
+    main()
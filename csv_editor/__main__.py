@@ -0,0 +1,4 @@
+import sys
+from csv_editor.cli import main
+
+sys.exit(main())
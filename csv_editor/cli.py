@@ -0,0 +1,164 @@
+"""Консольные команды csv_editor для конвейеров и заданий cron.
+
+Работают без PyQt5 и без дисплея; строки идут потоком от входного
+файла к выходному, поэтому память не зависит от размера файла
+(кроме group и dedupe, которым нужны группы и ключи).
+"""
+import argparse
+import csv
+import re
+import sqlite3
+import sys
+from csv_editor.core.controllers import pipeline
+from csv_editor.core.models.find_replace import compile_pattern
+
+
+def _split(text):
+    return [name.strip() for name in text.split(",") if name.strip()] if text else []
+
+
+def _open_input(args):
+    return pipeline.read_table(args.input, args.delimiter, not args.no_header,
+                               args.sheet, args.table)
+
+
+def _write(args, headers, rows):
+    delimiter = args.out_delimiter or args.delimiter
+    count = pipeline.write_table_file(args.output, headers, rows, delimiter, args.out_table)
+    if args.output != pipeline.STDIO:
+        print(f"{count} rows written to {args.output}", file=sys.stderr)
+
+
+def cmd_convert(args):
+    headers, rows = _open_input(args)
+    _write(args, headers, rows)
+
+
+def cmd_filter(args):
+    headers, rows = _open_input(args)
+    columns = pipeline.column_indexes(headers, _split(args.columns)) if args.columns else None
+    rx = compile_pattern(args.pattern, args.regex, args.case_sensitive, args.whole_cell)
+    _write(args, headers, pipeline.filter_rows(rows, rx, columns, args.invert))
+
+
+def cmd_sort(args):
+    headers, rows = _open_input(args)
+    columns = pipeline.column_indexes(headers, args.key)
+    _write(args, headers, pipeline.sort_rows(rows, columns, args.numeric, args.desc,
+                                             args.chunk_rows, args.tmp_dir))
+
+
+def cmd_group(args):
+    headers, rows = _open_input(args)
+    keys = pipeline.column_indexes(headers, args.key)
+    aggregations = []
+    for spec in args.agg or []:
+        column, _, name = spec.rpartition(":")
+        if not column:
+            raise ValueError(f"Aggregate must look like column:function, got {spec!r}")
+        aggregations.append((pipeline.column_indexes(headers, [column])[0], name.lower()))
+    _write(args, pipeline.group_headers(headers, keys, aggregations),
+           pipeline.group_rows_stream(rows, keys, aggregations))
+
+
+def cmd_dedupe(args):
+    headers, rows = _open_input(args)
+    columns = pipeline.column_indexes(headers, args.key) if args.key else None
+    _write(args, headers, pipeline.dedupe_rows(rows, columns))
+
+
+def cmd_diff(args):
+    has_header = not args.no_header
+    left = pipeline.open_source(args.left, args.delimiter, has_header, args.sheet, args.table)
+    right = pipeline.open_source(args.right, args.delimiter, has_header, args.sheet, args.table)
+    keys = pipeline.column_indexes(left.headers, args.key) if args.key else None
+    result = pipeline.diff_files(left, right, keys, args.report)
+    print(result.summary())
+    # Как у diff(1): 0 — таблицы совпадают, 1 — есть различия
+    return 0 if result.is_equal() else 1
+
+
+def _input_options(parser):
+    parser.add_argument("-d", "--delimiter", default=",", help="CSV delimiter (default ',')")
+    parser.add_argument("--no-header", action="store_true",
+                        help="the first row is data, columns are named 'Column N'")
+    parser.add_argument("--sheet", help="Excel sheet to read (default: the active one)")
+    parser.add_argument("--table", help="SQLite table to read")
+
+
+def _io_options(parser):
+    parser.add_argument("input", help="input .csv, .xlsx or .db/.sqlite file ('-' for stdin)")
+    parser.add_argument("-o", "--output", default=pipeline.STDIO,
+                        help="output .csv, .xlsx or .db/.sqlite file (default: stdout)")
+    parser.add_argument("--out-delimiter", help="delimiter of the output CSV")
+    parser.add_argument("--out-table", help="SQLite table to write (default 'data')")
+    _input_options(parser)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="csv_editor", description="Streaming table transforms without the GUI"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    convert = commands.add_parser("convert", help="convert between CSV, Excel and SQLite")
+    _io_options(convert)
+    convert.set_defaults(handler=cmd_convert)
+
+    filter_ = commands.add_parser("filter", help="keep rows whose cells match a pattern")
+    _io_options(filter_)
+    filter_.add_argument("pattern")
+    filter_.add_argument("-c", "--columns", help="comma-separated columns to search")
+    filter_.add_argument("--regex", action="store_true", help="pattern is a regular expression")
+    filter_.add_argument("--case-sensitive", action="store_true")
+    filter_.add_argument("--whole-cell", action="store_true", help="match the whole cell")
+    filter_.add_argument("-v", "--invert", action="store_true", help="keep non-matching rows")
+    filter_.set_defaults(handler=cmd_filter)
+
+    sort = commands.add_parser("sort", help="stable external sort by key columns")
+    _io_options(sort)
+    sort.add_argument("-k", "--key", action="append", required=True, help="sort column")
+    sort.add_argument("-n", "--numeric", action="store_true", help="compare keys as numbers")
+    sort.add_argument("-r", "--desc", action="store_true", help="descending order")
+    sort.add_argument("--chunk-rows", type=int, default=pipeline.SORT_CHUNK_ROWS,
+                      help="rows sorted in memory before spilling to disk")
+    sort.add_argument("--tmp-dir", help="directory for sorted runs")
+    sort.set_defaults(handler=cmd_sort)
+
+    group = commands.add_parser("group", help="group rows and aggregate columns")
+    _io_options(group)
+    group.add_argument("-k", "--key", action="append", required=True, help="group column")
+    group.add_argument("-a", "--agg", action="append",
+                       help="column:function, function is sum, avg, count, min, max, "
+                            "distinct or pNN (percentile)")
+    group.set_defaults(handler=cmd_group)
+
+    dedupe = commands.add_parser("dedupe", help="drop repeated rows (or repeated keys)")
+    _io_options(dedupe)
+    dedupe.add_argument("-k", "--key", action="append", help="key column (default: whole row)")
+    dedupe.set_defaults(handler=cmd_dedupe)
+
+    diff = commands.add_parser("diff", help="compare two tables")
+    diff.add_argument("left")
+    diff.add_argument("right")
+    diff.add_argument("-k", "--key", action="append", help="key column (default: whole row)")
+    diff.add_argument("--report", help="write every difference to this CSV file")
+    _input_options(diff)
+    diff.set_defaults(handler=cmd_diff)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        return args.handler(args) or 0
+    except BrokenPipeError:
+        # Вывод оборван (например, `| head`): это не ошибка
+        return 0
+    except (OSError, ValueError, KeyError, csv.Error, sqlite3.Error, re.error) as e:
+        print(f"csv_editor: {e}", file=sys.stderr)
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
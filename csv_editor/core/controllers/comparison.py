@@ -1,43 +1,330 @@
-from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QPushButton, 
-                            QTextEdit, QFileDialog, QInputDialog, QDialogButtonBox)
-
-class TableComparisonDialog(QDialog):
-    def __init__(self, main_model, parent=None):
-        super().__init__(parent)
-        self.main_model = main_model
-        self.setWindowTitle("Compare Tables")
-        self.resize(800, 600)
-        self.init_ui()
-    
-    def init_ui(self):
-        layout = QVBoxLayout()
-        
-        # Кнопки загрузки
-        btn_layout = QHBoxLayout()
-        self.load_btn = QPushButton("Load Second Table")
-        self.load_btn.clicked.connect(self.load_second_table)
-        btn_layout.addWidget(self.load_btn)
-        
-        # Поле для вывода результатов
-        self.result_edit = QTextEdit()
-        self.result_edit.setReadOnly(True)
-        
-        # Кнопки диалога
-        buttons = QDialogButtonBox(QDialogButtonBox.Close)
-        buttons.rejected.connect(self.reject)
-        
-        layout.addLayout(btn_layout)
-        layout.addWidget(self.result_edit)
-        layout.addWidget(buttons)
-        self.setLayout(layout)
-    
-    def load_second_table(self):
-        filename, _ = QFileDialog.getOpenFileName(
-            self, "Open Second Table", "", "CSV Files (*.csv);;All Files (*)"
-        )
-        if filename:
-            self.compare_with_file(filename)
-    
-    def compare_with_file(self, filename):
-        # Здесь будет реализация сравнения
-        self.result_edit.setPlainText(f"Comparison with {filename}\n\nFeature coming soon")
+import copy
+import csv
+import io
+import os
+import sqlite3
+import tempfile
+from math import ceil
+from csv_editor.core.models.sqlite_store import SqliteStore, quote_name
+
+# Столько строк левой таблицы сопоставляется в памяти за раз; при большем
+# числе обе таблицы раскладываются по хешу ключа во временные файлы
+PARTITION_ROWS = 500000
+# Сколько примеров каждого вида различий хранится в результате
+MAX_DETAILS = 1000
+CHECK_EVERY = 10000
+# Сколько байт начала файла читается для оценки числа строк
+SAMPLE_BYTES = 1 << 20
+
+ADDED = 'added'
+REMOVED = 'removed'
+CHANGED = 'changed'
+
+
+def _sqlite_rows(db_file, table_name):
+    conn = sqlite3.connect(db_file)
+    try:
+        for record in conn.execute(f"SELECT * FROM {quote_name(table_name)} ORDER BY rowid"):
+            yield ["" if value is None else str(value) for value in record]
+    finally:
+        conn.close()
+
+
+class StoreSource:
+    """Таблица из хранилища модели как источник строк для сравнения.
+
+    Создаётся в GUI-потоке и не обращается к хранилищу из фонового:
+    столбцы ColumnStore копируются, у LazyCsvStore копируются правки
+    (файл отображён только для чтения), а таблица SQLite после записи
+    правок читается целиком своим соединением в порядке rowid.
+    """
+    def __init__(self, store):
+        self.headers = list(store.headers)
+        self.count = store.row_count()
+        if store.in_memory:
+            columns = [column[:self.count] for column in store.columns]
+            self._rows = lambda: map(list, zip(*columns))
+        elif isinstance(store, SqliteStore):
+            store.flush()
+            self._rows = lambda: _sqlite_rows(store.db_file, store.table_name)
+        else:
+            snapshot = copy.copy(store)
+            snapshot.headers = list(store.headers)
+            snapshot.overlay = dict(store.overlay)
+            self._rows = snapshot.rows
+
+    def row_count(self):
+        return self.count
+
+    def estimated_row_count(self):
+        return self.count
+
+    def rows(self, progress=None):
+        return self._rows()
+
+
+class CsvSource:
+    """CSV-файл как источник строк; читается потоком, в память не грузится"""
+    def __init__(self, filename, delimiter=',', has_header=True):
+        self.filename = filename
+        self.delimiter = delimiter
+        self.has_header = has_header
+        self.headers = None
+        if has_header:
+            with open(filename, 'r', encoding='utf-8', newline='') as f:
+                self.headers = next(csv.reader(f, delimiter=delimiter), [])
+
+    def row_count(self):
+        return None
+
+    def estimated_row_count(self):
+        """Оценка числа строк по размеру файла и длине строк в его начале"""
+        with open(self.filename, 'rb') as f:
+            sample = f.read(SAMPLE_BYTES)
+        lines = sample.count(b'\n')
+        if len(sample) < SAMPLE_BYTES or not lines:
+            return lines
+        return int(os.path.getsize(self.filename) * lines / len(sample))
+
+    def rows(self, progress=None):
+        # progress(прочитано байт, размер файла) вызывается раз в CHECK_EVERY строк
+        total = os.path.getsize(self.filename)
+        with open(self.filename, 'rb') as raw:
+            text = io.TextIOWrapper(raw, encoding='utf-8', newline='')
+            reader = csv.reader(text, delimiter=self.delimiter)
+            if self.has_header:
+                next(reader, None)
+            for number, row in enumerate(reader):
+                if progress is not None and not number % CHECK_EVERY:
+                    progress(raw.tell(), total)
+                yield row
+
+
+class DiffResult:
+    """Итог сравнения: счётчики и первые MAX_DETAILS примеров каждого вида"""
+    def __init__(self, key_names, left_only_columns, right_only_columns):
+        self.key_names = key_names
+        self.left_only_columns = left_only_columns
+        self.right_only_columns = right_only_columns
+        self.counts = {ADDED: 0, REMOVED: 0, CHANGED: 0}
+        self.unchanged = 0
+        self.details = {ADDED: [], REMOVED: [], CHANGED: []}
+
+    def add(self, status, detail):
+        self.counts[status] += 1
+        if len(self.details[status]) < MAX_DETAILS:
+            self.details[status].append(detail)
+
+    def is_equal(self):
+        return not any(self.counts.values()) and not self.left_only_columns \
+            and not self.right_only_columns
+
+    def summary(self):
+        match = ", ".join(self.key_names) if self.key_names else "whole rows (all shared columns)"
+        lines = [
+            f"Rows matched by: {match}",
+            f"Unchanged rows: {self.unchanged}",
+            f"Changed rows: {self.counts[CHANGED]}",
+            f"Added rows (only in second table): {self.counts[ADDED]}",
+            f"Removed rows (only in current table): {self.counts[REMOVED]}",
+        ]
+        if self.left_only_columns:
+            lines.append(f"Columns only in current table: {', '.join(self.left_only_columns)}")
+        if self.right_only_columns:
+            lines.append(f"Columns only in second table: {', '.join(self.right_only_columns)}")
+        return "\n".join(lines)
+
+
+class ComparisonController:
+    """Сравнение таблиц с сопоставлением строк по ключевым столбцам или
+    по значениям всех общих столбцов.
+
+    Вторая таблица читается потоком. Если левая таблица больше
+    PARTITION_ROWS строк, обе стороны раскладываются по хешу ключа во
+    временные файлы и сопоставляются по одной части, так что память
+    ограничена размером части, а не таблицы.
+    """
+    def __init__(self, model=None):
+        self.model = model
+
+    def compare_with_file(self, filename, key_columns=None, delimiter=',', has_header=True,
+                          report_file=None, progress=None, cancelled=None, left=None):
+        """Сравнивает таблицу модели с CSV-файлом (см. diff). Из фонового
+        потока left передаётся готовым: StoreSource, снятый в GUI-потоке."""
+        if left is None:
+            left = StoreSource(self.model.store)
+        right = CsvSource(filename, delimiter, has_header)
+        return self.diff(left, right, key_columns, report_file, progress, cancelled)
+
+    def diff(self, left, right, key_columns=None, report_file=None,
+             progress=None, cancelled=None):
+        """Сравнивает два источника строк.
+
+        key_columns — имена или номера столбцов левой таблицы; без них строки
+        сопоставляются целиком. report_file — CSV, куда пишутся все различия.
+        progress(сделано, всего) получает проценты; cancelled() прерывает
+        сравнение, тогда возвращается None. Возвращает DiffResult.
+        """
+        progress = progress or (lambda done, total: None)
+        cancelled = cancelled or (lambda: False)
+        pairs, left_only, right_only = self._pair_columns(left.headers, right.headers)
+        key_pairs = self._key_pairs(key_columns, left.headers, pairs)
+        left_names = left.headers
+
+        result = DiffResult([left_names[l] for l, _ in key_pairs] if key_columns else [],
+                            left_only, right_only)
+        if key_columns:
+            left_key = [l for l, _ in key_pairs]
+            right_key = [r for _, r in key_pairs]
+            compared = [(l, r) for l, r in pairs if (l, r) not in key_pairs]
+        else:
+            left_key = [l for l, _ in pairs]
+            right_key = [r for _, r in pairs]
+            compared = []
+
+        def take(values, columns):
+            return tuple(values[c] if c < len(values) else "" for c in columns)
+
+        report = None
+        report_handle = None
+        if report_file:
+            report_handle = open(report_file, 'w', encoding='utf-8', newline='')
+            report = csv.writer(report_handle)
+            report.writerow(['status', 'left_row', 'right_row', 'key',
+                             'column', 'left_value', 'right_value'])
+
+        def emit(status, left_row, right_row, key, values=None, cells=None):
+            result.add(status, {'left_row': left_row, 'right_row': right_row, 'key': key,
+                                'values': values, 'cells': cells})
+            if report is None:
+                return
+            key_text = " | ".join(key)
+            if cells:
+                for name, old, new in cells:
+                    report.writerow([status, left_row, right_row, key_text, name, old, new])
+            else:
+                text = " | ".join(values)
+                report.writerow([status, left_row, right_row, key_text, "",
+                                 text if status == REMOVED else "",
+                                 text if status == ADDED else ""])
+
+        def match(left_rows, right_rows):
+            # Сопоставление одной части: левая часть в словаре, правая потоком
+            index = {}
+            for count, (number, values) in enumerate(left_rows):
+                if not count % CHECK_EVERY and cancelled():
+                    return False
+                index.setdefault(take(values, left_key), []).append((number, values))
+            for bucket in index.values():
+                # Дубликаты ключа сопоставляются по порядку появления
+                bucket.reverse()
+            for count, (number, values) in enumerate(right_rows):
+                if not count % CHECK_EVERY and cancelled():
+                    return False
+                key = take(values, right_key)
+                bucket = index.get(key)
+                if not bucket:
+                    emit(ADDED, None, number, key, values=list(values))
+                    continue
+                left_number, left_values = bucket.pop()
+                cells = []
+                for l, r in compared:
+                    old = left_values[l] if l < len(left_values) else ""
+                    new = values[r] if r < len(values) else ""
+                    if old != new:
+                        cells.append((left_names[l], old, new))
+                if cells:
+                    emit(CHANGED, left_number, number, key, cells=cells)
+                else:
+                    result.unchanged += 1
+            for bucket in index.values():
+                for left_number, left_values in reversed(bucket):
+                    emit(REMOVED, left_number, None, take(left_values, left_key),
+                         values=list(left_values))
+            return True
+
+        def right_progress(done, total):
+            progress(int(done * 50 / total) if total else 0, 100)
+
+        try:
+            # Без точного числа строк (файл читается потоком) — по оценке
+            count = left.row_count()
+            if count is None:
+                count = left.estimated_row_count()
+            partitions = max(1, ceil(count / PARTITION_ROWS)) if count else 1
+            if partitions == 1:
+                left_rows = enumerate(left.rows(), 1)
+                right_rows = enumerate(right.rows(right_progress), 1)
+                if not match(left_rows, right_rows):
+                    return None
+                progress(100, 100)
+                return result
+            with tempfile.TemporaryDirectory(prefix="csv_diff_") as spill_dir:
+                left_parts = self._spill(left.rows(), left_key, partitions, spill_dir, 'left',
+                                         cancelled)
+                right_parts = self._spill(right.rows(right_progress), right_key, partitions,
+                                          spill_dir, 'right', cancelled)
+                if left_parts is None or right_parts is None:
+                    return None
+                for part in range(partitions):
+                    if not match(self._read_part(left_parts[part]),
+                                 self._read_part(right_parts[part])):
+                        return None
+                    progress(50 + int((part + 1) * 50 / partitions), 100)
+            return result
+        finally:
+            if report_handle is not None:
+                report_handle.close()
+
+    def _pair_columns(self, left_headers, right_headers):
+        # Столбцы сопоставляются по имени; без заголовка второй таблицы
+        # (или без общих имён) — по позиции
+        if right_headers:
+            positions = {}
+            for col, name in enumerate(right_headers):
+                positions.setdefault(name, col)
+            pairs = [(col, positions[name]) for col, name in enumerate(left_headers)
+                     if name in positions]
+            if pairs:
+                left_only = [name for name in left_headers if name not in positions]
+                known = set(left_headers)
+                right_only = [name for name in right_headers if name not in known]
+                return pairs, left_only, right_only
+        width = len(right_headers) if right_headers else len(left_headers)
+        pairs = [(col, col) for col in range(min(width, len(left_headers)))]
+        return pairs, list(left_headers[width:]), list((right_headers or [])[len(left_headers):])
+
+    def _key_pairs(self, key_columns, left_headers, pairs):
+        if not key_columns:
+            return []
+        by_left = dict(pairs)
+        result = []
+        for column in key_columns:
+            col = column if isinstance(column, int) else \
+                left_headers.index(column) if column in left_headers else -1
+            if col not in by_left:
+                raise ValueError(f"Key column {column!r} is missing in one of the tables")
+            result.append((col, by_left[col]))
+        return result
+
+    def _spill(self, rows, key_columns, partitions, spill_dir, side, cancelled):
+        # Раскладывает строки по частям hash(ключ) % partitions; в файл
+        # вместе со строкой пишется её номер
+        paths = [os.path.join(spill_dir, f"{side}_{part}.csv") for part in range(partitions)]
+        handles = [open(path, 'w', encoding='utf-8', newline='') for path in paths]
+        try:
+            writers = [csv.writer(handle) for handle in handles]
+            for number, values in enumerate(rows, 1):
+                if not number % CHECK_EVERY and cancelled():
+                    return None
+                key = tuple(values[c] if c < len(values) else "" for c in key_columns)
+                writers[hash(key) % partitions].writerow([number] + list(values))
+        finally:
+            for handle in handles:
+                handle.close()
+        return paths
+
+    def _read_part(self, path):
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            for row in csv.reader(f):
+                yield int(row[0]), row[1:]
@@ -1,28 +1,101 @@
 from collections import defaultdict
 from PyQt5.QtCore import Qt
+from csv_editor.core.models.group_by import GroupBy, COUNT
+from csv_editor.core.models.pivot import PivotTable
+
+
+def _numbers(values):
+    # Числа из значений ячеек: отрицательные и дробные тоже, нечисловые пропускаются
+    result = []
+    for value in values:
+        try:
+            result.append(float(value))
+        except (TypeError, ValueError):
+            continue
+    return result
+
 
 class DataOperationsController:
     def __init__(self, model, undo_stack):
         self.model = model
         self.undo_stack = undo_stack
     
+    def _column_index(self, column):
+        if isinstance(column, int):
+            return column
+        return self.model.store.headers.index(column)
+    
+    def _block_changes(self, parts):
+        # parts — (столбец, строки, значения); части одного столбца склеиваются
+        changes = {}
+        for col, rows, values in parts:
+            if col in changes:
+                old_rows, old_values = changes[col]
+                changes[col] = (list(old_rows) + list(rows), old_values + values)
+            else:
+                changes[col] = (rows, values)
+        return changes
+    
+    def paste_block(self, rows, columns, block):
+        """Вставляет блок (список строк значений) в строки rows и столбцы
+        columns источника; что не помещается в таблицу, отбрасывается.
+        Вся вставка — один шаг отмены."""
+        block = block[:len(rows)]
+        rows = rows[:len(block)]
+        parts = [(col, rows, [values[offset] if offset < len(values) else "" for values in block])
+                 for offset, col in enumerate(columns)]
+        return self.model.set_cells(self._block_changes(parts), "Paste")
+    
+    def fill_down(self, blocks):
+        """Заполняет каждый блок (строки, столбцы) значениями его первой строки"""
+        store = self.model.store
+        parts = [(col, rows[1:], [store.cell(rows[0], col)] * (len(rows) - 1))
+                 for rows, columns in blocks if len(rows) > 1 for col in columns]
+        return self.model.set_cells(self._block_changes(parts), "Fill Down")
+    
+    def clear_cells(self, blocks):
+        """Очищает ячейки блоков (строки, столбцы) одной командой"""
+        parts = [(col, rows, [""] * len(rows)) for rows, columns in blocks for col in columns]
+        return self.model.set_cells(self._block_changes(parts), "Clear Cells")
+    
+    def replace_cells(self, changes):
+        """Применяет замены {столбец: (строки, значения)} одной командой"""
+        return self.model.set_cells(changes, "Replace All")
+    
+    def group_data(self, group_columns, aggregations=None):
+        """Группирует таблицу по одному или нескольким столбцам.
+        
+        group_columns — имена или номера ключевых столбцов; aggregations —
+        список (столбец, агрегат), агрегаты см. core.models.group_by.
+        Возвращает ColumnStore с результатом (строка на группу).
+        """
+        if isinstance(group_columns, (str, int)):
+            group_columns = [group_columns]
+        keys = [self._column_index(column) for column in group_columns]
+        aggregations = [(self._column_index(column), name)
+                        for column, name in aggregations or []]
+        return GroupBy(self.model.store, keys).to_store(aggregations)
+    
+    def pivot_data(self, row_columns, column_columns, value_column=None, aggregate=COUNT):
+        """Сводная таблица: строки по row_columns, столбцы по column_columns,
+        в ячейках агрегат value_column (без него — число строк).
+        Возвращает PivotTable (хранит только непустые ячейки)."""
+        rows = [self._column_index(column) for column in row_columns]
+        columns = [self._column_index(column) for column in column_columns]
+        if value_column is not None:
+            value_column = self._column_index(value_column)
+        return PivotTable(self.model.store, rows, columns, value_column, aggregate)
+    
     def group_by_column(self, column_index, aggregate_funcs=None):
         """Группирует данные по указанному столбцу"""
         if column_index < 0 or column_index >= self.model.columnCount():
             return None
         
+        store = self.model.store
         groups = defaultdict(list)
         
-        for row in range(self.model.rowCount()):
-            key = self.model.data(self.model.index(row, column_index))
-            row_data = {
-                'source_row': row,
-                'values': [
-                    self.model.data(self.model.index(row, col))
-                    for col in range(self.model.columnCount())
-                ]
-            }
-            groups[key].append(row_data)
+        for row, values in enumerate(store.rows()):
+            groups[values[column_index]].append({'source_row': row, 'values': values})
         
         # Применяем агрегатные функции, если они заданы
         result = []
@@ -41,11 +114,11 @@ class DataOperationsController:
     
     @staticmethod
     def aggregate_sum(values):
-        return sum(float(v) for v in values if str(v).isdigit())
+        return sum(_numbers(values))
     
     @staticmethod
     def aggregate_avg(values):
-        nums = [float(v) for v in values if str(v).isdigit()]
+        nums = _numbers(values)
         return sum(nums) / len(nums) if nums else 0
     
     @staticmethod
@@ -54,10 +127,10 @@ class DataOperationsController:
     
     @staticmethod
     def aggregate_min(values):
-        nums = [float(v) for v in values if str(v).isdigit()]
+        nums = _numbers(values)
         return min(nums) if nums else None
     
     @staticmethod
     def aggregate_max(values):
-        nums = [float(v) for v in values if str(v).isdigit()]
+        nums = _numbers(values)
         return max(nums) if nums else None
@@ -1,130 +1,167 @@
 import csv
 import json
-from PyQt5.QtWidgets import QMessageBox
-from PyQt5.QtGui import QStandardItem
-from PyQt5.QtCore import Qt
-from openpyxl import Workbook
+import os
 import sqlite3
-import markdown
 from pathlib import Path
+from csv_editor.core.models.lazy_csv_store import LazyCsvStore
+from csv_editor.core.models.sqlite_store import SqliteStore, quote_name
+from csv_editor.core.utils.importers.csv_loader import CsvChunkLoader, ParallelCsvLoader
+from csv_editor.core.utils.importers.excel_loader import ExcelChunkLoader
+from csv_editor.core.utils.importers.excel_reader import iter_sheet_rows
+from csv_editor.core.utils.importers.parallel_csv import parse_csv_parallel, PARALLEL_MIN_SIZE
+from csv_editor.core.utils.exporters.sqlite_exporter import SQLiteExporter
+from csv_editor.core.utils.exporters.excel_writer import write_excel, store_snapshot
+from csv_editor.core.utils.perf import span
+from csv_editor.core.utils import session_cache
 
 class FileIOController:
+    """Чтение и запись файлов для модели таблицы.
+
+    Ошибки (OSError, csv.Error, sqlite3.Error и т.п.) передаются
+    вызывающему: окна сообщений показывает интерфейс.
+    """
     def __init__(self, model):
         self.model = model
         
-    def load_csv(self, filename, delimiter=','):
-        try:
-            with open(filename, newline='', encoding='utf-8') as csvfile:
-                reader = csv.reader(csvfile, delimiter=delimiter)
-                self._load_data(list(reader))
+    def load_csv(self, filename, delimiter=',', workers=None, cache=False):
+        """Загружает CSV целиком; с cache=True таблица берётся из кэша сессии,
+        а после разбора кэш записывается (см. session_cache)"""
+        if cache and self.open_cached_csv(filename, delimiter):
             return True
-        except Exception as e:
-            QMessageBox.critical(None, "Error", f"Failed to load CSV: {str(e)}")
+        size = os.path.getsize(filename)
+        with span("load_csv", bytes=size) as s:
+            if workers != 1 and size >= PARALLEL_MIN_SIZE:
+                # Большой файл разбираем параллельно по диапазонам байт
+                self.model.set_store(parse_csv_parallel(filename, delimiter, workers))
+            else:
+                with open(filename, newline='', encoding='utf-8') as csvfile:
+                    reader = csv.reader(csvfile, delimiter=delimiter)
+                    self._load_data(reader)
+            s.add(rows=self.model.store.row_count())
+        if cache:
+            session_cache.save(filename, delimiter, session_cache.snapshot(self.model.store))
+        return True
+    
+    def open_cached_csv(self, filename, delimiter=','):
+        """Подключает таблицу из кэша сессии; False, если кэша нет или он устарел"""
+        store = session_cache.load(filename, delimiter)
+        if store is None:
             return False
+        self.model.set_store(store)
+        # Готовый индекс прокси забирает при сбросе модели; не забранный
+        # сразу устареет после первой правки
+        store.prebuilt_index = None
+        return True
     
-    def save_csv(self, filename, delimiter=',', include_headers=True):
+    def save_session_cache(self, filename, delimiter=',', search_index=None):
+        """Записывает кэш сессии загруженного CSV в фоновом потоке"""
+        return session_cache.save_async(filename, delimiter, self.model.store, search_index)
+    
+    def start_csv_load(self, filename, delimiter=','):
+        """Запускает фоновую загрузку CSV: строки попадают в модель пачками,
+        а большой файл разбирается в пуле процессов и подключается целиком
+        (ParallelCsvLoader.store) по завершении"""
         try:
+            size = os.path.getsize(filename)
+        except OSError:
+            # Ошибку открытия сообщит сам загрузчик
+            size = 0
+        if size >= PARALLEL_MIN_SIZE:
+            loader = ParallelCsvLoader(filename, delimiter)
+        else:
+            loader = CsvChunkLoader(filename, delimiter)
+        self.model.begin_incremental_load(loader)
+        loader.start()
+        return loader
+    
+    def start_excel_load(self, filename, sheet=None):
+        """Запускает фоновое чтение листа Excel (read_only) пачками строк"""
+        loader = ExcelChunkLoader(filename, sheet)
+        self.model.begin_incremental_load(loader)
+        loader.start()
+        return loader
+    
+    def open_csv_lazy(self, filename, delimiter=','):
+        """Открывает CSV без загрузки в память: mmap + индекс смещений строк"""
+        with span("open_csv_lazy", bytes=os.path.getsize(filename)) as s:
+            self.model.set_store(LazyCsvStore(filename, delimiter))
+            s.add(rows=self.model.store.row_count())
+        return True
+    
+    def open_sqlite(self, db_file, table_name):
+        """Подключает таблицу SQLite без копирования: строки читаются страницами.
+        Таблицы WITHOUT ROWID и представления загружаются в память."""
+        if not SqliteStore.supports(db_file, table_name):
+            return self.import_sqlite(db_file, table_name)
+        with span("open_sqlite") as s:
+            self.model.set_store(SqliteStore(db_file, table_name))
+            s.add(rows=self.model.store.row_count())
+        return True
+    
+    def save_csv(self, filename, delimiter=',', include_headers=True):
+        store = self.model.store
+        with span("save_csv", rows=store.row_count()):
+            if not store.in_memory:
+                # Потоковая запись: копируем нетронутые байты, кодируем только правки
+                headers = list(store.headers) if include_headers else None
+                store.save(filename, delimiter, headers)
+                return True
             with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
                 writer = csv.writer(csvfile, delimiter=delimiter)
                 if include_headers:
-                    headers = [self.model.headerData(i, Qt.Horizontal) for i in range(self.model.columnCount())]
-                    writer.writerow(headers)
-                
-                for row in range(self.model.rowCount()):
-                    row_data = [self.model.data(self.model.index(row, col)) or "" 
-                              for col in range(self.model.columnCount())]
-                    writer.writerow(row_data)
-            return True
-        except Exception as e:
-            QMessageBox.critical(None, "Error", f"Failed to save CSV: {str(e)}")
-            return False
+                    writer.writerow(store.headers)
+                writer.writerows(store.rows())
+        return True
     
     def export_to_excel(self, filename):
-        wb = Workbook()
-        ws = wb.active
-        
-        # Заголовки
-        for col in range(self.model.columnCount()):
-            ws.cell(row=1, column=col+1, value=self.model.headerData(col, Qt.Horizontal))
-        
-        # Данные
-        for row in range(self.model.rowCount()):
-            for col in range(self.model.columnCount()):
-                ws.cell(row=row+2, column=col+1, 
-                       value=self.model.data(self.model.index(row, col)))
-        
-        wb.save(filename)
+        # Книга write_only: строки пишутся целиком прямо из хранилища
+        headers, rows, kinds = store_snapshot(self.model.store)
+        write_excel(filename, headers, rows, kinds)
     
     def export_to_markdown(self, filename):
-        md_content = "| " + " | ".join(
-            str(self.model.headerData(col, Qt.Horizontal)) 
-            for col in range(self.model.columnCount())
-        ) + " |\n"
-        
-        md_content += "| " + " | ".join("---" for _ in range(self.model.columnCount())) + " |\n"
-        
-        for row in range(self.model.rowCount()):
-            md_content += "| " + " | ".join(
-                str(self.model.data(self.model.index(row, col)) or "")
-                for col in range(self.model.columnCount())
-            ) + " |\n"
-        
-        with open(filename, 'w', encoding='utf-8') as f:
-            f.write(md_content)
-    
-    def _load_data(self, data):
-        # Общая функция загрузки данных в модель
-        self.model.removeRows(0, self.model.rowCount())
-        
-        if not data:
-            return
+        store = self.model.store
+        with span("export_markdown", rows=store.row_count()):
+            md_content = "| " + " | ".join(str(header) for header in store.headers) + " |\n"
             
-        # Устанавливаем заголовки
-        self.model.setColumnCount(len(data[0]))
-        for col in range(len(data[0])):
-            self.model.setHeaderData(col, Qt.Horizontal, f"Column {col}")
-        
-        # Добавляем данные
-        for row_data in data:
-            items = [QStandardItem(str(cell)) for cell in row_data]
-            self.model.appendRow(items)
-    def import_excel(self, filename):
-        try:
-            from openpyxl import load_workbook
-            wb = load_workbook(filename)
-            ws = wb.active
+            md_content += "| " + " | ".join("---" for _ in store.headers) + " |\n"
             
-            data = []
-            for row in ws.iter_rows(values_only=True):
-                data.append(list(row))
+            for values in store.rows():
+                md_content += "| " + " | ".join(values) + " |\n"
             
-            self._load_data(data)
-            return True
-        except Exception as e:
-            QMessageBox.critical(None, "Excel Import Error", str(e))
-            return False
+            with open(filename, 'w', encoding='utf-8') as f:
+                f.write(md_content)
+    
+    def export_sqlite(self, db_file, table_name, index_columns=None, progress=None):
+        """Пакетная запись таблицы в SQLite (см. export_store)"""
+        return SQLiteExporter(self.model).export(db_file, table_name, index_columns, progress)
+    
+    def _load_data(self, data, headers=None):
+        # Общая функция загрузки данных в модель: строки уходят прямо
+        # в колоночное хранилище, без промежуточных QStandardItem
+        self.model.load_rows(data, headers)
+
+    def import_excel(self, filename, sheet=None):
+        # Книга read_only: строки листа идут в хранилище потоком
+        with span("import_excel") as s:
+            rows, _ = iter_sheet_rows(filename, sheet)
+            self._load_data(rows)
+            s.add(rows=self.model.store.row_count())
+        return True
     
     def import_sqlite(self, db_file, table_name):
+        conn = sqlite3.connect(db_file)
         try:
-            import sqlite3
-            conn = sqlite3.connect(db_file)
             cursor = conn.cursor()
             
-            cursor.execute(f"SELECT * FROM {table_name}")
-            data = cursor.fetchall()
-            
-            cursor.execute(f"PRAGMA table_info({table_name})")
+            cursor.execute(f"PRAGMA table_info({quote_name(table_name)})")
             columns = [col[1] for col in cursor.fetchall()]
             
-            self.model.setColumnCount(len(columns))
-            for col, name in enumerate(columns):
-                self.model.setHeaderData(col, Qt.Horizontal, name)
-            
-            self._load_data(data)
+            # Курсор отдаёт строки потоком, без промежуточного fetchall()
+            cursor.execute(f"SELECT * FROM {quote_name(table_name)}")
+            with span("import_sqlite") as s:
+                self._load_data(cursor, columns)
+                s.add(rows=self.model.store.row_count())
             return True
-        except Exception as e:
-            QMessageBox.critical(None, "SQLite Import Error", str(e))
-            return False
         finally:
             conn.close()
     
\ No newline at end of file
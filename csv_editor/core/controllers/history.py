@@ -1,63 +1,309 @@
 from datetime import datetime
 import json
+import sys
 from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QStandardItem
+from csv_editor.core.models.column_store import ColumnStore
+from csv_editor.core.utils.perf import span
+
+# Полный образ таблицы сохраняется не реже чем раз в столько снимков
+CHECKPOINT_EVERY = 50
+# Сколько памяти (оценочно) может занимать история
+MEMORY_BUDGET = 256 * 1024 * 1024
+# Оценка размера одной операции и одной ячейки образа (указатель в списке)
+OP_OVERHEAD = 64
+CELL_SIZE = 8
+
+
+def _ops_size(ops):
+    size = 0
+    for op in ops:
+        size += OP_OVERHEAD
+        if op[0] == 'cell':
+            size += sys.getsizeof(op[3])
+        elif op[0] == 'cells':
+            size += len(op[2]) * 2 * CELL_SIZE
+        elif op[0] == 'insert_rows':
+            size += sum(len(values) for values in op[2]) * CELL_SIZE
+        elif op[0] == 'insert_columns':
+            size += sum(len(values) for values in op[3]) * CELL_SIZE
+    return size
+
+
+def apply_ops(image, ops):
+    """Применяет операции дельты к образу таблицы.
+
+    Образ — словарь {'headers': [...], 'columns': [[...], ...], 'rows': n},
+    операции — кортежи:
+      ('cell', строка, столбец, значение)
+      ('cells', столбец, [строки], [значения])
+      ('header', столбец, заголовок)
+      ('insert_rows', строка, [значения строк])
+      ('remove_rows', строка, количество)
+      ('insert_columns', столбец, [заголовки], [значения столбцов])
+      ('remove_columns', столбец, количество)
+    """
+    headers, columns = image['headers'], image['columns']
+    for op in ops:
+        kind = op[0]
+        if kind == 'cell':
+            columns[op[2]][op[1]] = op[3]
+        elif kind == 'cells':
+            column = columns[op[1]]
+            for row, value in zip(op[2], op[3]):
+                column[row] = value
+        elif kind == 'header':
+            headers[op[1]] = op[2]
+        elif kind == 'insert_rows':
+            row, rows = op[1], op[2]
+            for col, column in enumerate(columns):
+                column[row:row] = [r[col] if col < len(r) else "" for r in rows]
+            image['rows'] += len(rows)
+        elif kind == 'remove_rows':
+            row, count = op[1], op[2]
+            for column in columns:
+                del column[row:row + count]
+            image['rows'] -= count
+        elif kind == 'insert_columns':
+            col = op[1]
+            headers[col:col] = op[2]
+            columns[col:col] = [list(values) for values in op[3]]
+        elif kind == 'remove_columns':
+            col, count = op[1], op[2]
+            del headers[col:col + count]
+            del columns[col:col + count]
+    return image
+
+
+def image_to_store(image):
+    """Собирает ColumnStore из образа таблицы"""
+    store = ColumnStore(image['headers'])
+    store.append_columns(image['columns'], image['rows'])
+    return store
+
+
+class ChangeRecorder:
+    """Переводит сигналы модели в операции дельты (формат apply_ops).
+
+    on_op(op) вызывается на каждую операцию, если accept() истинно;
+    on_reset() — после полной перезагрузки модели.
+    """
+    def __init__(self, model, on_op, on_reset, accept=None):
+        self.model = model
+        self.on_op = on_op
+        self.on_reset = on_reset
+        self.accept = accept or (lambda: True)
+        model.dataChanged.connect(self._on_data_changed)
+        model.headerDataChanged.connect(self._on_header_changed)
+        model.rowsInserted.connect(self._on_rows_inserted)
+        model.rowsRemoved.connect(self._on_rows_removed)
+        model.columnsInserted.connect(self._on_columns_inserted)
+        model.columnsRemoved.connect(self._on_columns_removed)
+        model.modelReset.connect(self._on_model_reset)
+
+    def _on_data_changed(self, top_left, bottom_right, roles=()):
+        if not self.accept():
+            return
+        store = self.model.store
+        cells = getattr(self.model, 'changed_cells', None)
+        if cells is not None:
+            # Пакетная правка: одна операция на столбец и только изменённые
+            # ячейки, а не весь охватывающий прямоугольник
+            for col, (rows, values) in cells.items():
+                if store.in_memory:
+                    values = list(map(store.column(col).__getitem__, rows))
+                else:
+                    values = [store.cell(row, col) for row in rows]
+                self.on_op(('cells', col, list(rows), values))
+            return
+        for row in range(top_left.row(), bottom_right.row() + 1):
+            for col in range(top_left.column(), bottom_right.column() + 1):
+                self.on_op(('cell', row, col, store.cell(row, col)))
+
+    def _on_header_changed(self, orientation, first, last):
+        if orientation != Qt.Horizontal or not self.accept():
+            return
+        for col in range(first, last + 1):
+            self.on_op(('header', col, self.model.store.headers[col]))
+
+    def _on_rows_inserted(self, parent, first, last):
+        if self.accept():
+            self.on_op(('insert_rows', first, list(self.model.store.rows(first, last + 1))))
+
+    def _on_rows_removed(self, parent, first, last):
+        if self.accept():
+            self.on_op(('remove_rows', first, last - first + 1))
+
+    def _on_columns_inserted(self, parent, first, last):
+        if self.accept():
+            store = self.model.store
+            cols = range(first, last + 1)
+            self.on_op(('insert_columns', first,
+                        [store.headers[c] for c in cols],
+                        [list(store.column(c)) for c in cols]))
+
+    def _on_columns_removed(self, parent, first, last):
+        if self.accept():
+            self.on_op(('remove_columns', first, last - first + 1))
+
+    def _on_model_reset(self):
+        self.on_reset()
+
 
 class HistoryController:
-    def __init__(self, model, undo_stack):
+    """История снимков таблицы.
+
+    Полная копия таблицы (контрольная точка) делается только для первого
+    снимка, после перезагрузки модели и периодически; остальные снимки
+    хранят дельту — операции, записанные по сигналам модели с прошлого
+    снимка. Снимок восстанавливается проигрыванием дельт от ближайшей
+    контрольной точки. При превышении бюджета памяти старейшие снимки
+    удаляются вместе со своей контрольной точкой.
+    """
+    def __init__(self, model, undo_stack, memory_budget=MEMORY_BUDGET):
         self.model = model
         self.undo_stack = undo_stack
+        self.memory_budget = memory_budget
         self.snapshots = []
         self.current_snapshot = -1
-    
+        # Операции с момента последнего снимка
+        self._pending = []
+        # Модель была перезагружена: следующий снимок — полный образ
+        self._needs_checkpoint = True
+        self._restoring = False
+        self.recorder = ChangeRecorder(model, self._on_op, self._on_model_reset,
+                                       self._recording)
+
+    # --- Запись операций ---
+
+    def _recording(self):
+        return not self._needs_checkpoint and not self._restoring
+
+    def _on_op(self, op):
+        self._pending.append(op)
+
+    def _on_model_reset(self):
+        if not self._restoring:
+            self._pending = []
+            self._needs_checkpoint = True
+
+    # --- Снимки ---
+
     def take_snapshot(self, description):
+        self.snapshots = self.snapshots[:self.current_snapshot + 1]
         snapshot = {
             'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
             'description': description,
-            'data': self._get_model_data()
+            'checkpoint': None,
+            'delta': None,
+            'size': 0
         }
-        self.snapshots = self.snapshots[:self.current_snapshot + 1]
+        if not self.model.store.in_memory:
+            # Файл, открытый без загрузки в память, целиком не копируем;
+            # такой снимок восстановить нельзя
+            self._needs_checkpoint = True
+        elif self._needs_checkpoint or self._checkpoint_due():
+            with span("snapshot", rows=self.model.store.row_count()):
+                snapshot['checkpoint'] = self._make_image()
+                snapshot['size'] = self._image_size(snapshot['checkpoint'])
+            self._needs_checkpoint = False
+        else:
+            snapshot['delta'] = self._pending
+            snapshot['size'] = _ops_size(self._pending)
+        self._pending = []
         self.snapshots.append(snapshot)
         self.current_snapshot = len(self.snapshots) - 1
-    
+        self._evict()
+
+    def _checkpoint_due(self):
+        # Контрольная точка нужна, если цепочка дельт длинная или её
+        # проигрывание дороже копирования образа
+        base = self._checkpoint_index(len(self.snapshots) - 1)
+        if base is None:
+            return True
+        chain = self.snapshots[base + 1:]
+        delta_size = sum(s['size'] for s in chain) + _ops_size(self._pending)
+        return len(chain) + 1 >= CHECKPOINT_EVERY or delta_size > self.snapshots[base]['size']
+
+    def _checkpoint_index(self, index):
+        # Ближайшая контрольная точка не позже index, от которой до index
+        # есть непрерывная цепочка дельт
+        for i in range(index, -1, -1):
+            snapshot = self.snapshots[i]
+            if snapshot['checkpoint'] is not None:
+                return i
+            if snapshot['delta'] is None:
+                return None
+        return None
+
+    def _make_image(self):
+        store = self.model.store
+        return {
+            'headers': list(store.headers),
+            'columns': [list(store.column(c)) for c in range(store.column_count())],
+            'rows': store.row_count()
+        }
+
+    def _image_size(self, image):
+        return (image['rows'] * len(image['columns']) + len(image['headers'])) * CELL_SIZE
+
+    def memory_usage(self):
+        return sum(s['size'] for s in self.snapshots)
+
+    def _evict(self):
+        # Удаляем самые старые сегменты «контрольная точка + её дельты»,
+        # пока история не уложится в бюджет; текущий снимок не трогаем
+        while self.memory_usage() > self.memory_budget:
+            checkpoints = [i for i, s in enumerate(self.snapshots)
+                           if s['checkpoint'] is not None and i > 0]
+            if not checkpoints or checkpoints[0] > self.current_snapshot:
+                break
+            cut = checkpoints[0]
+            del self.snapshots[:cut]
+            self.current_snapshot -= cut
+
     def _get_model_data(self):
         data = {
             'headers': [],
             'rows': []
         }
-        
+
         # Сохраняем заголовки
         for col in range(self.model.columnCount()):
             data['headers'].append(self.model.headerData(col, Qt.Horizontal))
-        
+
         # Сохраняем данные
-        for row in range(self.model.rowCount()):
-            row_data = []
-            for col in range(self.model.columnCount()):
-                row_data.append(self.model.data(self.model.index(row, col)))
-            data['rows'].append(row_data)
-        
+        data['rows'] = list(self.model.store.rows())
+
         return data
-    
+
     def restore_snapshot(self, index):
         if 0 <= index < len(self.snapshots):
-            snapshot = self.snapshots[index]
-            self._load_model_data(snapshot['data'])
+            base = self._checkpoint_index(index)
+            if base is None:
+                return
+            checkpoint = self.snapshots[base]['checkpoint']
+            with span("snapshot_restore", rows=checkpoint['rows']):
+                image = {
+                    'headers': list(checkpoint['headers']),
+                    'columns': [list(column) for column in checkpoint['columns']],
+                    'rows': checkpoint['rows']
+                }
+                for snapshot in self.snapshots[base + 1:index + 1]:
+                    apply_ops(image, snapshot['delta'])
+                self._load_image(image)
             self.current_snapshot = index
-    
-    def _load_model_data(self, data):
-        self.model.removeRows(0, self.model.rowCount())
-        self.model.setColumnCount(len(data['headers']))
-        
-        # Восстанавливаем заголовки
-        for col, header in enumerate(data['headers']):
-            self.model.setHeaderData(col, Qt.Horizontal, header)
-        
-        # Восстанавливаем данные
-        for row_data in data['rows']:
-            items = [QStandardItem(str(cell)) for cell in row_data]
-            self.model.appendRow(items)
-    
+
+    def _load_image(self, image):
+        # Восстанавливаем заголовки и данные одной загрузкой
+        store = image_to_store(image)
+        self._restoring = True
+        try:
+            self.model.set_store(store)
+        finally:
+            self._restoring = False
+        self._pending = []
+        self._needs_checkpoint = False
+
     def get_history(self):
         return [{
             'id': i,
@@ -0,0 +1,419 @@
+import csv
+import hashlib
+import heapq
+import io
+import os
+import sqlite3
+import sys
+import tempfile
+from itertools import islice
+from math import isnan
+from csv_editor.core.controllers.comparison import ComparisonController, CsvSource
+from csv_editor.core.models.column_store import to_text
+from csv_editor.core.models.group_by import (SUM, AVG, COUNT, MIN, MAX, DISTINCT,
+                                             AGGREGATE_TITLES, percentile, percentile_of,
+                                             format_number)
+from csv_editor.core.utils.exporters.excel_writer import write_excel
+from csv_editor.core.utils.exporters.sqlite_exporter import write_table, quote_name
+from csv_editor.core.utils.importers.excel_reader import iter_sheet_rows
+
+# Строк в одной отсортированной части внешней сортировки
+SORT_CHUNK_ROWS = 1000000
+# Таблица SQLite по умолчанию при записи
+DEFAULT_TABLE = "data"
+EXCEL_SUFFIXES = ('.xlsx',)
+SQLITE_SUFFIXES = ('.db', '.sqlite', '.sqlite3')
+STDIO = '-'
+
+
+def table_format(path):
+    """'csv', 'excel' или 'sqlite' по расширению файла"""
+    suffix = os.path.splitext(path)[1].lower()
+    if suffix in EXCEL_SUFFIXES:
+        return 'excel'
+    if suffix in SQLITE_SUFFIXES:
+        return 'sqlite'
+    return 'csv'
+
+
+def default_headers(width):
+    return [f"Column {col}" for col in range(width)]
+
+
+def read_table(path, delimiter=',', has_header=True, sheet=None, table=None):
+    """Открывает таблицу для чтения потоком.
+
+    Возвращает (заголовки, генератор строк); строки — списки строк.
+    Файл закрывается, когда генератор исчерпан или закрыт. path '-' —
+    стандартный ввод (CSV); у книги Excel читается лист sheet, у базы
+    SQLite — таблица table.
+    """
+    kind = table_format(path) if path != STDIO else 'csv'
+    if kind == 'sqlite':
+        return _read_sqlite(path, table)
+    if kind == 'excel':
+        rows = _excel_rows(path, sheet)
+    elif path == STDIO:
+        rows = _csv_rows(io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8', newline=''),
+                         delimiter)
+    else:
+        rows = _csv_rows(open(path, 'r', encoding='utf-8', newline=''), delimiter)
+    first = next(rows, None)
+    if first is None:
+        return [], rows
+    if has_header:
+        return list(first), rows
+    return default_headers(len(first)), _prepend(first, rows)
+
+
+def _csv_rows(handle, delimiter):
+    with handle:
+        yield from csv.reader(handle, delimiter=delimiter)
+
+
+def _excel_rows(path, sheet):
+    rows, _ = iter_sheet_rows(path, sheet)
+    try:
+        for values in rows:
+            yield [to_text(value) for value in values]
+    finally:
+        rows.close()
+
+
+def _prepend(first, rows):
+    yield first
+    yield from rows
+
+
+def _sqlite_connect(path):
+    # Только чтение: сравнение и преобразование не должны менять базу
+    return sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+
+
+def _default_table(conn, path):
+    # Без явного имени: единственная таблица базы или DEFAULT_TABLE
+    names = [row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")]
+    if len(names) == 1:
+        return names[0]
+    if DEFAULT_TABLE in names:
+        return DEFAULT_TABLE
+    raise ValueError(f"Table name is required to read {path}")
+
+
+def _read_sqlite(path, table):
+    conn = _sqlite_connect(path)
+    try:
+        if not table:
+            table = _default_table(conn, path)
+        query = f"SELECT * FROM {quote_name(table)}"
+        headers = [column[0] for column in conn.execute(query + " LIMIT 0").description]
+    finally:
+        conn.close()
+
+    def rows():
+        conn = _sqlite_connect(path)
+        try:
+            for values in conn.execute(query):
+                yield list(map(to_text, values))
+        finally:
+            conn.close()
+    return headers, rows()
+
+
+def write_table_file(path, headers, rows, delimiter=',', table=None):
+    """Записывает поток строк в CSV, книгу Excel или таблицу SQLite
+    (по расширению path; '-' — стандартный вывод). Возвращает число строк."""
+    kind = table_format(path) if path != STDIO else 'csv'
+    counter = _Counter(rows)
+    if kind == 'excel':
+        write_excel(path, headers, counter)
+    elif kind == 'sqlite':
+        write_table(path, table or DEFAULT_TABLE, headers, counter)
+    elif path == STDIO:
+        out = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', newline='')
+        try:
+            _write_csv(out, headers, counter, delimiter)
+        finally:
+            out.detach()
+    else:
+        with open(path, 'w', encoding='utf-8', newline='') as out:
+            _write_csv(out, headers, counter, delimiter)
+    return counter.count
+
+
+def _write_csv(out, headers, rows, delimiter):
+    writer = csv.writer(out, delimiter=delimiter)
+    writer.writerow(headers)
+    writer.writerows(rows)
+    out.flush()
+
+
+class _Counter:
+    # Итератор-обёртка, считающая пройденные строки
+    def __init__(self, rows):
+        self.rows = iter(rows)
+        self.count = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        values = next(self.rows)
+        self.count += 1
+        return values
+
+
+def column_indexes(headers, columns):
+    """Номера столбцов по именам; имя, которого нет среди заголовков,
+    может быть номером столбца (с нуля)"""
+    result = []
+    for column in columns:
+        if isinstance(column, int):
+            col = column
+        elif column in headers:
+            col = headers.index(column)
+        elif column.isdigit():
+            col = int(column)
+        else:
+            raise ValueError(f"Unknown column: {column!r}")
+        if not 0 <= col < len(headers):
+            raise ValueError(f"Unknown column: {column!r}")
+        result.append(col)
+    return result
+
+
+def _take(values, columns):
+    return [values[col] if col < len(values) else "" for col in columns]
+
+
+def filter_rows(rows, rx, columns=None, invert=False):
+    """Строки, в ячейках которых (всех или columns) находится rx;
+    invert оставляет остальные"""
+    search = rx.search
+    for values in rows:
+        cells = values if columns is None else _take(values, columns)
+        if any(map(search, cells)) != invert:
+            yield values
+
+
+def _number_key(value):
+    # Числа раньше текста и пустых ячеек; числа сравниваются как числа
+    try:
+        number = float(value)
+    except ValueError:
+        return (1, 0.0, value)
+    return (1, 0.0, value) if isnan(number) else (0, number, "")
+
+
+def sort_key(columns, numeric=False):
+    if numeric:
+        return lambda values: tuple(_number_key(value) for value in _take(values, columns))
+    return lambda values: _take(values, columns)
+
+
+def sort_rows(rows, columns, numeric=False, reverse=False, chunk_rows=SORT_CHUNK_ROWS,
+              tmp_dir=None):
+    """Устойчивая сортировка потока строк по столбцам columns.
+
+    Поток режется на части по chunk_rows строк; каждая сортируется
+    в памяти и, если частей больше одной, сбрасывается во временный CSV.
+    Затем части сливаются heapq.merge, при котором в памяти лишь по
+    строке из каждой части.
+    """
+    key = sort_key(columns, numeric)
+    rows = iter(rows)
+    chunk = list(islice(rows, chunk_rows))
+    chunk.sort(key=key, reverse=reverse)
+    if len(chunk) < chunk_rows:
+        yield from chunk
+        return
+    with tempfile.TemporaryDirectory(prefix="csv_sort_", dir=tmp_dir) as spill_dir:
+        paths = []
+        while chunk:
+            path = os.path.join(spill_dir, f"run_{len(paths)}.csv")
+            with open(path, 'w', encoding='utf-8', newline='') as f:
+                csv.writer(f).writerows(chunk)
+            paths.append(path)
+            chunk = list(islice(rows, chunk_rows))
+            chunk.sort(key=key, reverse=reverse)
+        yield from heapq.merge(*map(_read_run, paths), key=key, reverse=reverse)
+
+
+def _read_run(path):
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        yield from csv.reader(f)
+
+
+def dedupe_rows(rows, columns=None):
+    """Первые вхождения строк (или ключей columns).
+
+    Помнится только 16-байтный хеш каждого ключа, поэтому память растёт
+    с числом различных ключей, но не с длиной строк.
+    """
+    seen = set()
+    for values in rows:
+        key = values if columns is None else _take(values, columns)
+        digest = hashlib.blake2b(repr(key).encode('utf-8', 'surrogatepass'),
+                                 digest_size=16).digest()
+        if digest not in seen:
+            seen.add(digest)
+            yield values
+
+
+class _Stats:
+    # Накопленные значения одного столбца в одной группе
+    __slots__ = ('count', 'total', 'error', 'low', 'high', 'text_low', 'text_high',
+                 'distinct', 'values')
+
+    def __init__(self, keep_distinct, keep_values):
+        self.count = 0
+        self.total = 0.0
+        self.error = 0.0
+        self.low = self.high = None
+        self.text_low = self.text_high = None
+        self.distinct = set() if keep_distinct else None
+        self.values = [] if keep_values else None
+
+    def add(self, value):
+        if not value:
+            return
+        if self.distinct is not None:
+            self.distinct.add(value)
+        try:
+            number = float(value)
+        except ValueError:
+            number = None
+        if number is None or isnan(number):
+            if self.text_low is None or value < self.text_low:
+                self.text_low = value
+            if self.text_high is None or value > self.text_high:
+                self.text_high = value
+            return
+        self.count += 1
+        # Суммирование Ноймайера: без накопления ошибки округления
+        total = self.total + number
+        if abs(self.total) >= abs(number):
+            self.error += (self.total - total) + number
+        else:
+            self.error += (number - total) + self.total
+        self.total = total
+        if self.low is None or number < self.low:
+            self.low = number
+        if self.high is None or number > self.high:
+            self.high = number
+        if self.values is not None:
+            self.values.append(number)
+
+    def result(self, name):
+        if name == COUNT:
+            return str(self.count)
+        if name == DISTINCT:
+            return str(len(self.distinct))
+        if name in (MIN, MAX) and not self.count:
+            # В группе нет чисел — минимум и максимум текста (даты ISO тоже)
+            return (self.text_low if name == MIN else self.text_high) or ""
+        if not self.count:
+            return ""
+        if name == SUM:
+            return format_number(self.total + self.error)
+        if name == AVG:
+            return format_number((self.total + self.error) / self.count)
+        if name == MIN:
+            return format_number(self.low)
+        if name == MAX:
+            return format_number(self.high)
+        self.values.sort()
+        return format_number(percentile(self.values, percentile_of(name)))
+
+
+def group_headers(headers, key_columns, aggregations):
+    """Заголовки результата group_rows_stream (как у GroupBy.to_store)"""
+    result = [headers[col] for col in key_columns] + ["Rows"]
+    for col, name in aggregations:
+        title = AGGREGATE_TITLES.get(name) or name.upper()
+        result.append(f"{title}({headers[col]})")
+    return result
+
+
+def group_rows_stream(rows, key_columns, aggregations):
+    """Группировка потока строк: строка результата на группу в порядке
+    первого появления, агрегаты как у GroupBy.
+
+    В памяти только накопители групп; исходные значения хранятся лишь
+    для перцентилей (и множества — для числа различных).
+    """
+    # Проверка сразу, до первой строки вывода
+    for col, name in aggregations:
+        if name not in (SUM, AVG, COUNT, MIN, MAX, DISTINCT) and percentile_of(name) is None:
+            raise ValueError(f"Unknown aggregate: {name}")
+    return _group_rows(rows, key_columns, aggregations)
+
+
+def _group_rows(rows, key_columns, aggregations):
+    value_columns = sorted({col for col, name in aggregations})
+    distinct = {col for col, name in aggregations if name == DISTINCT}
+    kept = {col for col, name in aggregations if percentile_of(name) is not None}
+    groups = {}
+    for values in rows:
+        key = tuple(_take(values, key_columns))
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = [0, {col: _Stats(col in distinct, col in kept)
+                                       for col in value_columns}]
+        group[0] += 1
+        for col, stats in group[1].items():
+            stats.add(values[col] if col < len(values) else "")
+    for key, (count, stats) in groups.items():
+        yield list(key) + [str(count)] + [stats[col].result(name) for col, name in aggregations]
+
+
+class TableSource:
+    """Книга Excel или таблица SQLite как источник строк для сравнения"""
+    def __init__(self, path, has_header=True, sheet=None, table=None):
+        self.path = path
+        self.sqlite = table_format(path) == 'sqlite'
+        if self.sqlite and not table:
+            conn = _sqlite_connect(path)
+            try:
+                table = _default_table(conn, path)
+            finally:
+                conn.close()
+        self.options = dict(has_header=has_header, sheet=sheet, table=table)
+        headers, rows = read_table(path, **self.options)
+        rows.close()
+        self.headers = headers if has_header else None
+
+    def row_count(self):
+        return None
+
+    def estimated_row_count(self):
+        # По этой оценке сравнение решает, делить ли таблицы на части
+        if self.sqlite:
+            conn = _sqlite_connect(self.path)
+            try:
+                table = quote_name(self.options['table'])
+                return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            finally:
+                conn.close()
+        rows, total = iter_sheet_rows(self.path, self.options['sheet'])
+        rows.close()
+        return total or 0
+
+    def rows(self, progress=None):
+        return read_table(self.path, **self.options)[1]
+
+
+def open_source(path, delimiter=',', has_header=True, sheet=None, table=None):
+    """Источник строк для ComparisonController.diff (файл читается дважды:
+    заголовок и строки, поэтому стандартный ввод не подходит)"""
+    if path == STDIO:
+        raise ValueError("Comparison needs files, not standard input")
+    if table_format(path) == 'csv':
+        return CsvSource(path, delimiter, has_header)
+    return TableSource(path, has_header, sheet, table)
+
+
+def diff_files(left, right, key_columns=None, report_file=None):
+    """Сравнивает два источника (см. ComparisonController.diff)"""
+    return ComparisonController().diff(left, right, key_columns, report_file)
@@ -0,0 +1,231 @@
+from array import array
+from itertools import islice
+from .column_types import TEXT, MISSING, infer_keys, merge_kinds
+
+# Сколько уникальных значений столбца держим в пуле строк. Для столбцов
+# с высокой кардинальностью пул ничего не экономит, и его выключаем.
+POOL_LIMIT = 1 << 16
+# Размер пачки строк при массовой загрузке (транспонирование через zip)
+LOAD_CHUNK = 10000
+
+
+def to_text(value):
+    """Приводит значение ячейки к строке хранилища"""
+    if value.__class__ is str:
+        return value
+    return "" if value is None else str(value)
+
+
+class ColumnStore:
+    """Колоночное хранилище таблицы без зависимости от Qt.
+
+    Каждый столбец хранится отдельным списком строк; одинаковые значения
+    внутри столбца разделяют один объект str через пул столбца. Тип столбца
+    (int, float, date, text) определяется при загрузке, и для числовых
+    столбцов рядом с текстом хранится массив разобранных ключей сортировки.
+    """
+    resizable = True
+    in_memory = True
+    queryable = False
+    # Правки сразу в хранилище: отложенной записи (flush) нет
+    write_delay = None
+
+    def __init__(self, headers=None):
+        self.headers = list(headers) if headers else []
+        self.columns = [[] for _ in self.headers]
+        self._pools = [{} for _ in self.headers]
+        self.kinds = [None for _ in self.headers]
+        self.keys = [array('d') for _ in self.headers]
+        self._row_count = 0
+        # Готовый поисковый индекс из кэша сессии: (строк, {столбец:
+        # ColumnIndex}); его забирает SearchIndex.rebuild_async
+        self.prebuilt_index = None
+
+    @classmethod
+    def from_rows(cls, rows, headers=None):
+        store = cls(headers)
+        store.append_rows(rows)
+        return store
+
+    def row_count(self):
+        return self._row_count
+
+    def column_count(self):
+        return len(self.columns)
+
+    def cell(self, row, col):
+        return self.columns[col][row]
+
+    def set_cell(self, row, col, value):
+        value = to_text(value)
+        self.columns[col][row] = value
+        self._store_keys(col, row, row + 1, [value])
+
+    def set_cells(self, col, rows, values):
+        """Записывает values в строки rows столбца col.
+
+        Тип столбца проверяется один раз на всю пачку; непрерывный
+        диапазон строк (range) заменяется срезом.
+        """
+        values = list(map(to_text, values))
+        column = self.columns[col]
+        if isinstance(rows, range) and rows.step == 1:
+            column[rows.start:rows.stop] = values
+            self._store_keys(col, rows.start, rows.stop, values)
+            return
+        # map вместо цикла: присваивание идёт без байткода на каждую ячейку
+        list(map(column.__setitem__, rows, values))
+        kind, keys = infer_keys(values, self.kinds[col])
+        kind = merge_kinds(self.kinds[col], kind)
+        self.kinds[col] = kind
+        if kind == TEXT:
+            self.keys[col] = None
+        else:
+            list(map(self.keys[col].__setitem__, rows, keys))
+
+    def column_kind(self, col):
+        return self.kinds[col] or TEXT
+
+    def sort_keys(self, col):
+        """Массив числовых ключей столбца или None для текстового столбца"""
+        return self.keys[col] if self.kinds[col] not in (None, TEXT) else None
+
+    def _store_keys(self, col, start, stop, values, kind=None, keys=None):
+        # Заменяет ключи в диапазоне [start, stop) ключами для values,
+        # при необходимости расширяя тип столбца (int -> float -> text)
+        if keys is None and kind != TEXT:
+            kind, keys = infer_keys(values, self.kinds[col])
+        kind = merge_kinds(self.kinds[col], kind)
+        self.kinds[col] = kind
+        if kind == TEXT:
+            self.keys[col] = None
+        else:
+            self.keys[col][start:stop] = keys
+
+    def row(self, row):
+        return [column[row] for column in self.columns]
+
+    def column(self, col):
+        return self.columns[col]
+
+    def rows(self, start=0, stop=None):
+        """Итератор по строкам таблицы (списки значений)"""
+        stop = self._row_count if stop is None else min(stop, self._row_count)
+        if not self.columns:
+            for _ in range(start, stop):
+                yield []
+            return
+        for values in zip(*(islice(column, start, stop) for column in self.columns)):
+            yield list(values)
+
+    def _default_header(self, col):
+        return f"Column {col}"
+
+    def _grow(self, width):
+        # Новые столбцы дополняются пустыми строками для уже загруженных строк
+        for col in range(len(self.columns), width):
+            self.headers.append(self._default_header(col))
+            self.columns.append([""] * self._row_count)
+            self._pools.append({})
+            self.kinds.append(None)
+            self.keys.append(array('d', [MISSING]) * self._row_count)
+
+    def append_rows(self, rows):
+        """Добавляет строки в конец таблицы, возвращает число добавленных"""
+        rows = iter(rows)
+        added = 0
+        while True:
+            chunk = list(islice(rows, LOAD_CHUNK))
+            if not chunk:
+                break
+            added += self._append_chunk(chunk)
+        return added
+
+    def _append_chunk(self, chunk):
+        width = max(map(len, chunk))
+        if width > len(self.columns):
+            self._grow(width)
+        width = len(self.columns)
+        if any(len(row) != width for row in chunk):
+            chunk = [list(row) + [""] * (width - len(row)) for row in chunk]
+
+        start = self._row_count
+        for col, values in enumerate(zip(*chunk)):
+            values = list(map(to_text, values))
+            pool = self._pools[col]
+            if pool is not None:
+                values = list(map(pool.setdefault, values, values))
+                if len(pool) > POOL_LIMIT:
+                    self._pools[col] = None
+            self.columns[col].extend(values)
+            self._store_keys(col, start, start, values)
+        self._row_count += len(chunk)
+        return len(chunk)
+
+    def append_columns(self, columns, row_count, kinds=None, keys=None):
+        """Добавляет строки, уже разложенные по столбцам (например, готовый
+        диапазон из параллельного разбора вместе с его типами и ключами)"""
+        if len(columns) > len(self.columns):
+            self._grow(len(columns))
+        start = self._row_count
+        for col, column in enumerate(self.columns):
+            values = columns[col] if col < len(columns) else [""] * row_count
+            column.extend(values)
+            if kinds is not None and col < len(columns):
+                self._store_keys(col, start, start, values, kinds[col], keys[col])
+            else:
+                self._store_keys(col, start, start, values)
+        self._row_count += row_count
+
+    def insert_rows(self, row, rows):
+        """Вставляет строки перед позицией row"""
+        rows = [list(r) for r in rows]
+        if not rows:
+            return
+        width = max(map(len, rows))
+        if width > len(self.columns):
+            self._grow(width)
+        for col, column in enumerate(self.columns):
+            values = [to_text(r[col]) if col < len(r) else "" for r in rows]
+            column[row:row] = values
+            self._store_keys(col, row, row, values)
+        self._row_count += len(rows)
+
+    def remove_rows(self, row, count):
+        """Удаляет строки, возвращает их содержимое"""
+        removed = [list(values) for values in zip(*(c[row:row + count] for c in self.columns))]
+        for column in self.columns:
+            del column[row:row + count]
+        for keys in self.keys:
+            if keys is not None:
+                del keys[row:row + count]
+        self._row_count -= min(count, max(self._row_count - row, 0))
+        return removed
+
+    def insert_column(self, col, header=None, values=None):
+        values = [to_text(v) for v in values] if values is not None else []
+        values = values[:self._row_count] + [""] * (self._row_count - len(values))
+        self.headers.insert(col, header if header is not None else self._default_header(col))
+        self.columns.insert(col, values)
+        self._pools.insert(col, None)
+        kind, keys = infer_keys(values)
+        self.kinds.insert(col, kind)
+        self.keys.insert(col, keys)
+
+    def remove_column(self, col):
+        """Удаляет столбец, возвращает (заголовок, значения)"""
+        self._pools.pop(col)
+        self.kinds.pop(col)
+        self.keys.pop(col)
+        return self.headers.pop(col), self.columns.pop(col)
+
+    def close(self):
+        pass
+
+    def clear(self):
+        self.headers = []
+        self.columns = []
+        self._pools = []
+        self.kinds = []
+        self.keys = []
+        self._row_count = 0
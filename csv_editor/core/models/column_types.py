@@ -0,0 +1,115 @@
+import re
+from array import array
+from datetime import datetime
+
+# Типы столбцов; None — тип ещё не определён (пока встречались только пустые ячейки)
+INT = 'int'
+FLOAT = 'float'
+DATE = 'date'
+TEXT = 'text'
+NUMERIC_KINDS = (INT, FLOAT, DATE)
+
+# Ключ сортировки пустой ячейки
+MISSING = float('nan')
+
+DATE_FORMATS = ('%d.%m.%Y', '%d.%m.%Y %H:%M:%S', '%d/%m/%Y')
+# Сколько непустых значений текстового столбца проверяется, прежде чем
+# решить, что числа в нём — большинство
+NUMBER_SAMPLE = 1000
+
+
+# int() и float() принимают ещё "nan", "inf", "1_000", цифры других
+# алфавитов и пробелы по краям; такие ячейки остаются текстом. Среди
+# разобравшихся значений обычная десятичная запись — ровно те, в которых
+# нет других символов, чем эти. Пачка проверяется одним поиском по
+# значениям, склеенным через '\x00' (его не принимают ни int(), ни float())
+NOT_NUMBER = {
+    INT: re.compile(r'[^0-9+\-\x00]'),
+    FLOAT: re.compile(r'[^0-9eE.+\-\x00]'),
+}
+
+
+def _parse_int(value):
+    return float(int(value))
+
+
+def _parse_date(value):
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        for fmt in DATE_FORMATS:
+            try:
+                moment = datetime.strptime(value, fmt)
+                break
+            except ValueError:
+                continue
+        else:
+            raise
+    seconds = moment.hour * 3600 + moment.minute * 60 + moment.second
+    return moment.toordinal() + seconds / 86400
+
+
+PARSERS = {INT: _parse_int, FLOAT: float, DATE: _parse_date}
+# В какие типы можно расширить столбец, не пересчитывая старые ключи
+WIDER = {None: (INT, FLOAT, DATE), INT: (INT, FLOAT), FLOAT: (FLOAT,), DATE: (DATE,)}
+
+
+def parse_keys(values, parser):
+    """Разбирает значения в массив ключей; ValueError, если что-то не разобралось"""
+    try:
+        # Быстрый путь без пустых ячеек: map работает на уровне C
+        return array('d', map(parser, values))
+    except ValueError:
+        return array('d', [parser(v) if v else MISSING for v in values])
+
+
+def infer_keys(values, kind=None):
+    """Определяет тип пачки значений с учётом уже известного типа столбца.
+
+    Возвращает (тип, массив ключей); для текстовых столбцов ключей нет.
+    """
+    if kind == TEXT:
+        return TEXT, None
+    values = values if isinstance(values, list) else list(values)
+    if not any(values):
+        return kind, array('d', [MISSING]) * len(values)
+    for candidate in WIDER[kind]:
+        check = NOT_NUMBER.get(candidate)
+        if check is not None and check.search('\x00'.join(values)) is not None:
+            continue
+        try:
+            return candidate, parse_keys(values, PARSERS[candidate])
+        except (ValueError, OverflowError):
+            continue
+    return TEXT, None
+
+
+def merge_kinds(left, right):
+    """Тип столбца после объединения двух частей с типами left и right"""
+    if left is None or left == right:
+        return right
+    if right is None:
+        return left
+    if {left, right} == {INT, FLOAT}:
+        return FLOAT
+    return TEXT
+
+
+def _number_or_missing(value):
+    if NOT_NUMBER[FLOAT].search(value) is not None:
+        return MISSING
+    try:
+        return float(value)
+    except OverflowError:
+        return MISSING
+
+
+def text_number_keys(values):
+    """Числовые ключи текстового столбца, где числа — большинство (например,
+    под строкой заголовка, загруженной как данные); нечисловые ячейки
+    получают MISSING. None, если в выборке чисел меньше половины."""
+    sample = [value for value in values[:NUMBER_SAMPLE * 4] if value][:NUMBER_SAMPLE]
+    numbers = sum(1 for key in map(_number_or_missing, sample) if key == key)
+    if not sample or numbers * 2 < len(sample):
+        return None
+    return array('d', map(_number_or_missing, values))
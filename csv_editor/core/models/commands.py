@@ -1,10 +1,8 @@
 from PyQt5.QtWidgets import QUndoCommand
 from PyQt5.QtCore import QPersistentModelIndex, Qt
-from PyQt5.QtGui import QStandardItem
-from .base_model import UndoableStandardItemModel # Добавлен импорт
 
 class EditCellCommand(QUndoCommand):
-    def __init__(self, model: UndoableStandardItemModel, index, oldValue, newValue):
+    def __init__(self, model, index, oldValue, newValue):
         super().__init__("Edit Cell")
         self.model = model
         self.pIndex = QPersistentModelIndex(index)
@@ -16,14 +14,45 @@ class EditCellCommand(QUndoCommand):
             row = self.pIndex.row()
             col = self.pIndex.column()
             index = self.model.index(row, col)
-            self.model.setData(index, self.oldValue, Qt.EditRole)  # Упростили вызов
+            with self.model.undo_suspended():
+                self.model.setData(index, self.oldValue, Qt.EditRole)
 
     def redo(self):
         if self.pIndex.isValid():
             row = self.pIndex.row()
             col = self.pIndex.column()
             index = self.model.index(row, col)
-            self.model.setData(index, self.newValue, Qt.EditRole)  # Упростили вызов
+            with self.model.undo_suspended():
+                self.model.setData(index, self.newValue, Qt.EditRole)
+
+class BatchEditCommand(QUndoCommand):
+    """Правка многих ячеек (вставка, заполнение, очистка) одним шагом отмены.
+
+    changes — {столбец: (строки, новые значения)}. Для отмены хранятся
+    только строки и старые значения затронутых ячеек по столбцам;
+    непрерывные строки остаются объектом range.
+    """
+    def __init__(self, model, changes, description="Edit Cells"):
+        super().__init__(description)
+        self.model = model
+        self.changes = {}
+        store = model.store
+        for col, (rows, values) in changes.items():
+            if isinstance(rows, range) and store.in_memory:
+                old = store.column(col)[rows.start:rows.stop]
+            elif store.in_memory:
+                old = list(map(store.column(col).__getitem__, rows))
+            else:
+                old = [store.cell(row, col) for row in rows]
+            self.changes[col] = (rows, old, list(values))
+
+    def undo(self):
+        with self.model.undo_suspended():
+            self.model.set_cells({col: (rows, old) for col, (rows, old, new) in self.changes.items()})
+
+    def redo(self):
+        with self.model.undo_suspended():
+            self.model.set_cells({col: (rows, new) for col, (rows, old, new) in self.changes.items()})
 
 class RemoveColumnCommand(QUndoCommand):
     def __init__(self, model, column, description="Remove Column"):
@@ -34,16 +63,7 @@ class RemoveColumnCommand(QUndoCommand):
         self.header = model.headerData(column, Qt.Horizontal)
 
     def undo(self):
-        self.model.insertColumn(self.column)
-        self.model.setHeaderData(self.column, Qt.Horizontal, self.header)
-        for row, data in enumerate(self.column_data):
-            item = QStandardItem(data)
-            self.model.setItem(row, self.column, item)
+        self.model.insert_column_data(self.column, self.header, self.column_data)
 
     def redo(self):
-        self.column_data.clear()
-        for row in range(self.model.rowCount()):
-            index = self.model.index(row, self.column)
-            data = self.model.data(index)
-            self.column_data.append(data)
-        self.model.removeColumn(self.column)
+        self.header, self.column_data = self.model.take_column(self.column)
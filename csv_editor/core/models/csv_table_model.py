@@ -1,19 +1,262 @@
-from PyQt5.QtGui import QStandardItemModel, QStandardItem
-from PyQt5.QtCore import Qt
-from .base_model import UndoableStandardItemModel
-from .commands import EditCellCommand
+from contextlib import contextmanager
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QTimer
+from .column_store import ColumnStore
+from .commands import EditCellCommand, BatchEditCommand
 
-class UndoableStandardItemModel(QStandardItemModel):
+
+class ColumnarTableModel(QAbstractTableModel):
+    """Табличная модель поверх колоночного хранилища.
+
+    Вместо QStandardItem на каждую ячейку данные лежат в ColumnStore,
+    а data() читает значение прямо из списка столбца.
+    """
     def __init__(self, rows=0, columns=0, parent=None, undo_stack=None):
-        super().__init__(rows, columns, parent)
+        super().__init__(parent)
         self.undo_stack = undo_stack
+        self.store = ColumnStore([f"Column {col}" for col in range(columns)])
+        if rows:
+            self.store.append_rows([[""] * columns for _ in range(rows)])
+        self._undo_suspended = 0
+        # Источник пачек строк при постепенной загрузке (fetchMore)
+        self._source = None
+        # Ячейки пакетной правки на время её сигнала dataChanged
+        self.changed_cells = None
+        # Запись отложенных правок хранилища (store.write_delay), даже
+        # если следующей правки, которая бы их отправила, не будет
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.timeout.connect(self._flush_store)
+
+    # --- Базовый интерфейс модели ---
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.store.row_count()
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.store.column_count()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role in (Qt.DisplayRole, Qt.EditRole) and index.isValid():
+            return self.store.cell(index.row(), index.column())
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsEditable
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role not in (Qt.DisplayRole, Qt.EditRole):
+            return None
+        if orientation == Qt.Horizontal:
+            if 0 <= section < self.store.column_count():
+                return self.store.headers[section]
+            return None
+        return section + 1
+
+    def setHeaderData(self, section, orientation, value, role=Qt.EditRole):
+        if orientation != Qt.Horizontal or not 0 <= section < self.store.column_count():
+            return False
+        self.store.headers[section] = value
+        self.headerDataChanged.emit(orientation, section, section)
+        return True
 
     def setData(self, index, value, role=Qt.EditRole):
-        if role == Qt.EditRole and index.isValid():
-            old_value = self.data(index, role)
-            if old_value != value:
-                if self.undo_stack is not None:
-                    cmd = EditCellCommand(self, index, old_value, value)
-                    self.undo_stack.push(cmd)
-                    return True
-        return super().setData(index, value, role)
+        if role != Qt.EditRole or not index.isValid():
+            return False
+        old_value = self.data(index, role)
+        if old_value == value:
+            return False
+        if self.undo_stack is not None and not self._undo_suspended:
+            # Команда сама вызовет setData в redo() при помещении в стек
+            cmd = EditCellCommand(self, index, old_value, value)
+            self.undo_stack.push(cmd)
+            return True
+        self.store.set_cell(index.row(), index.column(), value)
+        self._schedule_flush()
+        self.dataChanged.emit(index, index, [Qt.DisplayRole, Qt.EditRole])
+        return True
+
+    def set_cells(self, changes, description="Edit Cells"):
+        """Записывает блок ячеек {столбец: (строки, значения)}.
+
+        С undo_stack правка становится одной командой BatchEditCommand.
+        Виды получают один dataChanged по охватывающему прямоугольнику,
+        а точный список ячеек на время сигнала лежит в changed_cells.
+        """
+        changes = {col: (rows, values) for col, (rows, values) in changes.items() if len(rows)}
+        if not changes:
+            return False
+        if self.undo_stack is not None and not self._undo_suspended:
+            self.undo_stack.push(BatchEditCommand(self, changes, description))
+            return True
+        top, bottom = self.store.row_count(), -1
+        for col, (rows, values) in changes.items():
+            self.store.set_cells(col, rows, values)
+            top = min(top, min(rows))
+            bottom = max(bottom, max(rows))
+        self._schedule_flush()
+        self.changed_cells = changes
+        try:
+            self.dataChanged.emit(self.index(top, min(changes)), self.index(bottom, max(changes)),
+                                  [Qt.DisplayRole, Qt.EditRole])
+        finally:
+            self.changed_cells = None
+        return True
+
+    def column_kind(self, column):
+        return self.store.column_kind(column)
+
+    def column_values(self, column):
+        """Все значения столбца (список строк хранилища, только для чтения)"""
+        return self.store.column(column)
+
+    def sort_keys(self, column):
+        """Разобранные при загрузке числовые ключи столбца (или None)"""
+        return self.store.sort_keys(column)
+
+    def apply_query(self, *query):
+        """Передаёт сортировку и фильтр хранилищу, которое выполняет их само
+        (queryable, например SqliteStore); строки модели меняются целиком"""
+        self.beginResetModel()
+        self.store.set_query(*query)
+        self.endResetModel()
+
+    @contextmanager
+    def undo_suspended(self):
+        """Правки внутри блока применяются напрямую, без новых команд"""
+        self._undo_suspended += 1
+        try:
+            yield
+        finally:
+            self._undo_suspended -= 1
+
+    # --- Структурные изменения ---
+
+    def insertRows(self, row, count, parent=QModelIndex()):
+        if not self.store.resizable:
+            return False
+        if parent.isValid() or count <= 0 or not 0 <= row <= self.rowCount():
+            return False
+        width = self.columnCount()
+        self.beginInsertRows(QModelIndex(), row, row + count - 1)
+        self.store.insert_rows(row, [[""] * width for _ in range(count)])
+        self.endInsertRows()
+        return True
+
+    def removeRows(self, row, count, parent=QModelIndex()):
+        if not self.store.resizable:
+            return False
+        if parent.isValid() or count <= 0 or row < 0 or row + count > self.rowCount():
+            return False
+        self.beginRemoveRows(QModelIndex(), row, row + count - 1)
+        self.store.remove_rows(row, count)
+        self.endRemoveRows()
+        return True
+
+    def insertColumns(self, column, count, parent=QModelIndex()):
+        if not self.store.resizable:
+            return False
+        if parent.isValid() or count <= 0 or not 0 <= column <= self.columnCount():
+            return False
+        self.beginInsertColumns(QModelIndex(), column, column + count - 1)
+        for offset in range(count):
+            self.store.insert_column(column + offset)
+        self.endInsertColumns()
+        return True
+
+    def removeColumns(self, column, count, parent=QModelIndex()):
+        if not self.store.resizable:
+            return False
+        if parent.isValid() or count <= 0 or column < 0 or column + count > self.columnCount():
+            return False
+        self.beginRemoveColumns(QModelIndex(), column, column + count - 1)
+        for _ in range(count):
+            self.store.remove_column(column)
+        self.endRemoveColumns()
+        return True
+
+    def setColumnCount(self, columns):
+        current = self.columnCount()
+        if columns > current:
+            self.insertColumns(current, columns - current)
+        elif columns < current:
+            self.removeColumns(columns, current - columns)
+
+    def insert_column_data(self, column, header, values):
+        """Вставляет столбец вместе с данными (используется при отмене удаления)"""
+        self.beginInsertColumns(QModelIndex(), column, column)
+        self.store.insert_column(column, header, values)
+        self.endInsertColumns()
+
+    def take_column(self, column):
+        """Удаляет столбец и возвращает (заголовок, значения)"""
+        self.beginRemoveColumns(QModelIndex(), column, column)
+        header, values = self.store.remove_column(column)
+        self.endRemoveColumns()
+        return header, values
+
+    # --- Массовая загрузка ---
+
+    def load_rows(self, rows, headers=None):
+        """Полностью заменяет содержимое модели строками rows"""
+        self.set_store(ColumnStore.from_rows(rows, headers))
+
+    def _schedule_flush(self):
+        if self.store.write_delay is not None and not self._flush_timer.isActive():
+            self._flush_timer.start(int(self.store.write_delay * 1000))
+
+    def _flush_store(self):
+        if self.store.write_delay is not None:
+            self.store.flush()
+
+    def set_store(self, store):
+        """Подключает готовое хранилище (ColumnStore, LazyCsvStore и т.п.)"""
+        self._flush_timer.stop()
+        self.beginResetModel()
+        self._source = None
+        old_store, self.store = self.store, store
+        self.endResetModel()
+        if old_store is not store:
+            old_store.close()
+
+    # --- Постепенная загрузка (canFetchMore/fetchMore) ---
+
+    def begin_incremental_load(self, source, headers=None):
+        """Очищает модель и подключает источник пачек строк.
+
+        source — объект с методами has_chunks() и take_chunk(), например
+        фоновый CsvChunkLoader; вид догружает пачки через fetchMore().
+        """
+        self.set_store(ColumnStore(headers))
+        self._source = source
+
+    def end_incremental_load(self):
+        self._source = None
+
+    def is_loading(self):
+        return self._source is not None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._source is not None and self._source.has_chunks()
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._source is None:
+            return
+        chunk = self._source.take_chunk()
+        if chunk:
+            self.append_rows(chunk)
+
+    def append_rows(self, rows):
+        """Добавляет пачку строк в конец таблицы"""
+        rows = list(rows)
+        if not rows:
+            return 0
+        start = self.rowCount()
+        width = max(map(len, rows))
+        if width > self.columnCount():
+            self.setColumnCount(width)
+        self.beginInsertRows(QModelIndex(), start, start + len(rows) - 1)
+        self.store.append_rows(rows)
+        self.endInsertRows()
+        return len(rows)
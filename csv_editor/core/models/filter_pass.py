@@ -0,0 +1,147 @@
+from itertools import compress
+from PyQt5.QtCore import QThread, QRegExp, Qt
+from .search_index import scan_rows
+from csv_editor.core.utils.perf import span
+
+# Спецсимволы QRegExp: шаблон без них ищется как обычная подстрока
+REGEXP_SPECIAL = set('\\^$.|?*+()[]{}')
+
+
+class FilterQuery:
+    """Снимок условий фильтра прокси: слова расширенного фильтра или
+    регулярное выражение и столбцы, по которым ищем. Инверсия в запрос
+    не входит — она накладывается на готовое множество строк."""
+    def __init__(self, words, use_and, regexp, columns):
+        self.words = tuple(w.lower() for w in words) if words else ()
+        self.use_and = use_and
+        # Своя копия: indexIn меняет состояние QRegExp, а проход идёт в другом потоке
+        self.regexp = QRegExp(regexp)
+        self.columns = tuple(columns)
+
+    def __eq__(self, other):
+        return isinstance(other, FilterQuery) and self.words == other.words \
+            and self.use_and == other.use_and and self.regexp == other.regexp \
+            and self.columns == other.columns
+
+    def is_active(self):
+        return bool(self.words) or not self.regexp.isEmpty()
+
+    def literal(self):
+        """Шаблон как обычная подстрока или None для настоящего выражения"""
+        rx = self.regexp
+        if rx.patternSyntax() == QRegExp.FixedString:
+            return rx.pattern()
+        if rx.patternSyntax() in (QRegExp.RegExp, QRegExp.RegExp2) \
+                and not REGEXP_SPECIAL & set(rx.pattern()):
+            return rx.pattern()
+        return None
+
+    def refines(self, other):
+        """True, если строки под этим запросом заведомо входят в строки под other"""
+        if other is None or not other.is_active() or self.columns != other.columns:
+            return False
+        if self.words and other.words:
+            if self.use_and and other.use_and:
+                # Каждое старое слово содержится в каком-то новом
+                return all(any(old in new for new in self.words) for old in other.words)
+            if not self.use_and and not other.use_and:
+                # Каждое новое слово содержит какое-то старое
+                return all(any(old in new for old in other.words) for new in self.words)
+            return False
+        if self.words or other.words:
+            return False
+        new, old = self.literal(), other.literal()
+        if new is None or old is None:
+            return False
+        sensitivity = self.regexp.caseSensitivity()
+        if sensitivity != other.regexp.caseSensitivity():
+            return False
+        if sensitivity == Qt.CaseInsensitive:
+            return old.lower() in new.lower()
+        return old in new
+
+    def row_matches(self, values):
+        """Проверка одной строки (значения столбцов запроса)"""
+        if self.words:
+            joined = " ".join(v for v in values if v).lower()
+            if self.use_and:
+                return all(w in joined for w in self.words)
+            return any(w in joined for w in self.words)
+        return any(v and self.regexp.indexIn(v) != -1 for v in values)
+
+    def match_rows(self, store, search_index=None, candidates=None, cancelled=None):
+        """Множество подходящих строк хранилища.
+
+        candidates — строки, среди которых заведомо лежит ответ (результат
+        более широкого запроса); тогда проверяются только они. cancelled —
+        функция, по которой проход прерывается (возвращается None).
+        """
+        cancelled = cancelled or (lambda: False)
+        columns = self.columns
+        if candidates is not None:
+            rows = set()
+            for count, row in enumerate(candidates):
+                if not count % 4096 and cancelled():
+                    return None
+                if self.row_matches([store.cell(row, col) for col in columns]):
+                    rows.add(row)
+            return rows
+
+        def substring_rows(needle):
+            rows = search_index.search(store, needle, columns) if search_index else None
+            return rows if rows is not None else scan_rows(store, needle, columns)
+
+        if self.words:
+            # Слово с пробелом может попасть на стык соседних ячеек
+            if any(' ' in w for w in self.words):
+                return self.match_rows(store, candidates=range(store.row_count()),
+                                       cancelled=cancelled)
+            found = []
+            for word in self.words:
+                if cancelled():
+                    return None
+                found.append(substring_rows(word))
+            return set.intersection(*found) if self.use_and else set().union(*found)
+
+        rx = self.regexp
+        literal = self.literal()
+        if literal is not None:
+            # Кандидаты без учёта регистра берём из индекса и проверяем
+            # самим выражением (учёт регистра)
+            rows = substring_rows(literal.lower())
+            return {row for row in rows
+                    if any(rx.indexIn(store.cell(row, col)) != -1 for col in columns)}
+        # Настоящее выражение проверяем один раз на каждое различное значение
+        rows = set()
+        for col in columns:
+            if cancelled():
+                return None
+            column = store.column(col)
+            hits = {value for value in dict.fromkeys(column)
+                    if value and rx.indexIn(value) != -1}
+            rows.update(compress(range(len(column)), map(hits.__contains__, column)))
+        return rows
+
+
+class FilterPass(QThread):
+    """Проход фильтра в фоновом потоке; результат — атрибут rows"""
+    def __init__(self, store, query, search_index=None, candidates=None, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.query = query
+        self.search_index = search_index
+        self.candidates = candidates
+        self.rows = None
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+        self.requestInterruption()
+
+    def was_cancelled(self):
+        return self._cancelled
+
+    def run(self):
+        with span("filter_background", rows=self.store.row_count()):
+            self.rows = self.query.match_rows(self.store, self.search_index,
+                                              self.candidates, self.was_cancelled)
@@ -0,0 +1,117 @@
+import re
+from array import array
+from functools import partial
+from itertools import compress, filterfalse, repeat
+from operator import is_not, ne
+
+# Строк в одной пачке прохода (между пачками — прогресс и проверка отмены)
+SCAN_CHUNK = 65536
+# Сколько различных значений столбца помним между пачками
+MEMO_LIMIT = 1 << 18
+
+
+def compile_pattern(pattern, regex=False, case_sensitive=False, whole_cell=False):
+    """Выражение для поиска в ячейках; обычный текст экранируется,
+    whole_cell требует совпадения со всей ячейкой (ошибка — re.error)"""
+    if not regex:
+        pattern = re.escape(pattern)
+    if whole_cell:
+        pattern = rf'\A(?:{pattern})\Z'
+    return re.compile(pattern, 0 if case_sensitive else re.IGNORECASE)
+
+
+class ReplaceResult:
+    """Итог прохода: совпавшие ячейки и готовые замены по столбцам
+    {столбец: (строки, новые значения)} в формате model.set_cells"""
+    def __init__(self):
+        self.changes = {}
+        self.matched = 0
+        self.scanned = 0
+        self.complete = False
+
+    def changed(self):
+        """Сколько ячеек изменит замена"""
+        return sum(len(rows) for rows, values in self.changes.values())
+
+
+class CellReplacer:
+    """Поиск и замена по ячейкам хранилища.
+
+    Выражение компилируется один раз. Хранилище просматривается пачками
+    строк, и внутри пачки замена считается один раз на каждое различное
+    значение столбца (повторяющиеся значения, типичные для CSV, не
+    проверяются заново), после чего строки с изменившимся значением
+    выбираются из пачки через compress.
+    """
+    def __init__(self, pattern, replacement="", regex=False, case_sensitive=False,
+                 whole_cell=False):
+        if not regex:
+            # В обычном режиме замена вставляется как есть, без \1 и т.п.
+            replacement = replacement.replace('\\', '\\\\')
+        self.rx = compile_pattern(pattern, regex, case_sensitive, whole_cell)
+        self.replacement = replacement
+
+    def _replace_values(self, values, memo):
+        # Дополняет memo новыми различными значениями пачки: {значение: новое
+        # или None}; сначала search по всем, замена — только для совпавших
+        fresh = list(filterfalse(memo.__contains__, dict.fromkeys(values)))
+        memo.update(dict.fromkeys(fresh))
+        found = list(compress(fresh, map(self.rx.search, fresh)))
+        memo.update(zip(found, map(self.rx.sub, repeat(self.replacement), found)))
+
+    def _replace_chunk(self, values, memo):
+        # (признаки совпадения по ячейкам, старые и новые значения совпавших);
+        # без memo каждая ячейка проверяется напрямую
+        if memo is None:
+            found = list(map(bool, map(self.rx.search, values)))
+            old = list(compress(values, found))
+            return found, old, list(map(self.rx.sub, repeat(self.replacement), old))
+        self._replace_values(values, memo)
+        hits = list(map(memo.__getitem__, values))
+        found = list(map(partial(is_not, None), hits))
+        return found, list(compress(values, found)), list(compress(hits, found))
+
+    def scan(self, store, columns, rows=None, progress=None, cancelled=None):
+        """Ищет совпадения в столбцах columns строк rows (все строки, если None).
+
+        progress(просмотрено ячеек, всего, совпало) вызывается после каждой
+        пачки; cancelled() прерывает проход, тогда complete остаётся False.
+        """
+        result = ReplaceResult()
+        count = store.row_count() if rows is None else len(rows)
+        total = count * len(columns)
+        for col in columns:
+            memo = {}
+            changed_rows = array('l')
+            changed_values = []
+            column = store.column(col) if store.in_memory else None
+            for start in range(0, count, SCAN_CHUNK):
+                if cancelled is not None and cancelled():
+                    return result
+                stop = min(start + SCAN_CHUNK, count)
+                positions = range(start, stop) if rows is None else rows[start:stop]
+                if column is None:
+                    values = [store.cell(row, col) for row in positions]
+                elif rows is None:
+                    values = column[start:stop]
+                else:
+                    values = list(map(column.__getitem__, positions))
+                if memo is not None and len(memo) > MEMO_LIMIT:
+                    memo.clear()
+                known = len(memo) if memo is not None else 0
+                found, old, new = self._replace_chunk(values, memo)
+                if memo is not None and len(memo) - known > len(values) // 2:
+                    # Значения почти не повторяются: memo только тратит время
+                    memo = None
+                result.matched += sum(found)
+                # Совпавшие ячейки, у которых замена действительно что-то меняет
+                keep = list(map(ne, new, old))
+                changed_rows.extend(compress(compress(positions, found), keep))
+                changed_values.extend(compress(new, keep))
+                result.scanned += stop - start
+                if progress is not None:
+                    progress(result.scanned, total, result.matched)
+            if changed_rows:
+                result.changes[col] = (changed_rows, changed_values)
+        result.complete = True
+        return result
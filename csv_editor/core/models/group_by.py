@@ -0,0 +1,208 @@
+from array import array
+from itertools import count, filterfalse
+from math import isnan, floor, fsum
+from operator import itemgetter
+from .column_store import ColumnStore
+from .column_types import TEXT, DATE, parse_keys
+
+SUM = 'sum'
+AVG = 'avg'
+COUNT = 'count'
+MIN = 'min'
+MAX = 'max'
+DISTINCT = 'distinct'
+# Перцентили задаются как 'p50', 'p90', 'p99.9' и т.п.
+AGGREGATES = (SUM, AVG, COUNT, MIN, MAX, DISTINCT)
+AGGREGATE_TITLES = {SUM: "Sum", AVG: "Average", COUNT: "Count", MIN: "Min", MAX: "Max",
+                    DISTINCT: "Distinct", 'p50': "Median"}
+
+
+def percentile_of(name):
+    """Доля для имени вида 'p90' (0.9) или None для прочих агрегатов"""
+    if not name.startswith('p'):
+        return None
+    try:
+        q = float(name[1:]) / 100
+    except ValueError:
+        return None
+    return q if 0 <= q <= 1 else None
+
+
+def percentile(ordered, q):
+    """Перцентиль упорядоченного списка с линейной интерполяцией"""
+    if not ordered:
+        return None
+    pos = (len(ordered) - 1) * q
+    low = floor(pos)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (pos - low)
+
+
+def format_number(value):
+    if value is None:
+        return ""
+    if value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    # 15 значащих цифр убирают хвосты двоичного округления (23.339999999999996)
+    return f"{value:.15g}"
+
+
+def _float_or_nan(value):
+    try:
+        return float(value)
+    except ValueError:
+        return float('nan')
+
+
+def numeric_column(store, col):
+    """Значения столбца как массив чисел (NaN — пусто или не число).
+
+    Для числовых столбцов это готовые ключи хранилища; даты и текст
+    разбираются как числа, нечисловые значения пропускаются агрегатами.
+    """
+    keys = store.sort_keys(col)
+    if keys is not None and store.column_kind(col) != DATE:
+        return keys
+    values = store.column(col)
+    try:
+        return parse_keys(values, float)
+    except ValueError:
+        return array('d', map(_float_or_nan, values))
+
+
+def group_ids(key_columns):
+    """Номера групп строк за один проход по ключевым столбцам.
+
+    Возвращает (номера групп по строкам, первая строка каждой группы);
+    группы нумеруются в порядке первого появления.
+    """
+    keys = key_columns[0] if len(key_columns) == 1 else zip(*key_columns)
+    first = {}
+    # setdefault оставляет за ключом номер строки, где он встретился впервые
+    firsts = list(map(first.setdefault, keys, count()))
+    dense = dict(zip(first.values(), count()))
+    return array('l', map(dense.__getitem__, firsts)), list(first.values())
+
+
+def group_rows(ids, groups):
+    """Списки строк каждой группы"""
+    buckets = [[] for _ in range(groups)]
+    appends = [bucket.append for bucket in buckets]
+    for row, group in enumerate(ids):
+        appends[group](row)
+    return buckets
+
+
+def _take(values, rows):
+    if len(rows) == 1:
+        return [values[rows[0]]]
+    return list(itemgetter(*rows)(values))
+
+
+class GroupBy:
+    """Группировка хранилища по одному или нескольким ключевым столбцам.
+
+    Строки раскладываются по группам одним проходом (словарь ключей
+    и массив номеров групп), дальше каждый агрегат считается по группе
+    целиком встроенными функциями (sum, min, max, sorted, set) над
+    выборкой из массива чисел столбца, без цикла Python по ячейкам.
+    """
+    def __init__(self, store, key_columns):
+        self.store = store
+        self.key_columns = list(key_columns)
+        columns = [store.column(col) for col in self.key_columns]
+        ids, self.first_rows = group_ids(columns) if columns and store.row_count() \
+            else (array('l'), [])
+        self.rows = group_rows(ids, len(self.first_rows))
+        self._numbers = {}
+
+    def group_count(self):
+        return len(self.rows)
+
+    def _numeric(self, col):
+        if col not in self._numbers:
+            self._numbers[col] = numeric_column(self.store, col)
+        return self._numbers[col]
+
+    def aggregate(self, col, name):
+        """Значения агрегата name по столбцу col для всех групп"""
+        if name == DISTINCT:
+            values = self.store.column(col)
+            return [len(set(filter(None, _take(values, rows)))) for rows in self.rows]
+        if self._textual(col, name):
+            return self._text_extreme(col, name)
+        numbers = self._numeric(col)
+        q = percentile_of(name)
+        result = []
+        for rows in self.rows:
+            values = list(filterfalse(isnan, _take(numbers, rows)))
+            if name == COUNT:
+                result.append(len(values))
+            elif not values:
+                result.append(None)
+            elif name == SUM:
+                result.append(fsum(values))
+            elif name == AVG:
+                result.append(fsum(values) / len(values))
+            elif name == MIN:
+                result.append(min(values))
+            elif name == MAX:
+                result.append(max(values))
+            elif q is not None:
+                values.sort()
+                result.append(percentile(values, q))
+            else:
+                raise ValueError(f"Unknown aggregate: {name}")
+        return result
+
+    def _textual(self, col, name):
+        # Минимум и максимум дат и нечислового текста берутся из значений
+        # ячеек; текстовый столбец с числами сравнивается как числа
+        if name not in (MIN, MAX):
+            return False
+        kind = self.store.column_kind(col)
+        return kind == DATE or kind == TEXT and all(map(isnan, self._numeric(col)))
+
+    def _text_extreme(self, col, name):
+        # Даты сравниваются по ключам, текст — как строки; в ответе
+        # исходное значение ячейки
+        values = self.store.column(col)
+        keys = self.store.sort_keys(col)
+        pick = min if name == MIN else max
+        result = []
+        for rows in self.rows:
+            rows = [row for row in rows if values[row]]
+            if not rows:
+                result.append("")
+            elif keys is not None:
+                result.append(values[pick(rows, key=keys.__getitem__)])
+            else:
+                result.append(pick(_take(values, rows)))
+        return result
+
+    def formatted(self, col, name):
+        """Значения агрегата по группам в виде текста ячеек"""
+        if col is None:
+            # Без столбца значений — число строк в группе
+            return [str(len(rows)) for rows in self.rows]
+        values = self.aggregate(col, name)
+        if self._textual(col, name):
+            return values
+        if name in (COUNT, DISTINCT):
+            return list(map(str, values))
+        return list(map(format_number, values))
+
+    def to_store(self, aggregations):
+        """Таблица результата: ключи, число строк и столбцы агрегатов.
+
+        aggregations — список (столбец, имя агрегата).
+        """
+        headers = [self.store.headers[col] for col in self.key_columns] + ["Rows"]
+        columns = [_take(self.store.column(col), self.first_rows) if self.first_rows else []
+                   for col in self.key_columns]
+        columns.append(self.formatted(None, COUNT))
+        for col, name in aggregations:
+            title = AGGREGATE_TITLES.get(name) or name.upper()
+            headers.append(f"{title}({self.store.headers[col]})")
+            columns.append(self.formatted(col, name))
+        return ColumnStore.from_rows(zip(*columns), headers)
@@ -0,0 +1,229 @@
+import csv
+import io
+import mmap
+import os
+from array import array
+from collections import OrderedDict
+from itertools import accumulate, count
+from operator import add
+from .column_types import TEXT
+
+# Размер блока при построении индекса и при потоковом копировании
+INDEX_BLOCK = 16 * 1024 * 1024
+# Сколько разобранных строк держать в кэше для data()
+ROW_CACHE = 4096
+# По скольким первым строкам определяется число столбцов
+SAMPLE_ROWS = 1000
+# Сколько строк разбирать за раз при последовательном чтении
+READ_CHUNK = 10000
+
+
+def _ends_in_quotes(line, in_quotes, delimiter):
+    # Остаётся ли строка файла внутри поля в кавычках (по правилам csv.reader):
+    # кавычка открывает поле только в его начале, внутри поля без кавычек
+    # (5" screen) она обычный символ, "" внутри кавычек — сама кавычка
+    pos = 0
+    while True:
+        quote = line.find(b'"', pos)
+        if quote == -1:
+            return in_quotes
+        if in_quotes:
+            if line.startswith(b'"', quote + 1):
+                pos = quote + 2
+                continue
+            in_quotes = False
+        elif quote == 0 or line.endswith(delimiter, 0, quote):
+            in_quotes = True
+        pos = quote + 1
+
+
+def build_row_index(buf, block_size=INDEX_BLOCK, delimiter=','):
+    """Строит массив смещений начала строк CSV за один проход.
+
+    Последний элемент — смещение конца данных, так что строка i занимает
+    байты offsets[i]:offsets[i + 1]. Переводы строк внутри полей в кавычках
+    границами не считаются.
+    """
+    delimiter = delimiter.encode('utf-8')
+    size = len(buf)
+    offsets = array('Q', [0])
+    in_quotes = False
+    pos = 0
+    while pos < size:
+        end = min(pos + block_size, size)
+        if end < size:
+            # Блок всегда заканчивается переводом строки
+            nl = buf.rfind(b'\n', pos, end)
+            if nl == -1:
+                nl = buf.find(b'\n', end)
+            end = size if nl == -1 else nl + 1
+        block = buf[pos:end]
+        lines = block.split(b'\n')[:-1]
+        if not in_quotes and block.find(b'"') == -1:
+            # Быстрый путь: каждый перевод строки — граница записи
+            offsets.extend(map(add, accumulate(map(len, lines)), count(pos + 1)))
+        else:
+            boundary = pos
+            for line in lines:
+                boundary += len(line) + 1
+                if in_quotes or line.find(b'"') != -1:
+                    in_quotes = _ends_in_quotes(line, in_quotes, delimiter)
+                if not in_quotes:
+                    offsets.append(boundary)
+        pos = end
+    if offsets[-1] != size:
+        offsets.append(size)
+    return offsets
+
+
+class LazyCsvStore:
+    """Хранилище поверх отображённого в память CSV-файла.
+
+    Строки разбираются только при обращении; правки складываются
+    в overlay изменённых строк и не трогают исходный файл до сохранения.
+    Вставка и удаление строк и столбцов в этом режиме не поддерживаются.
+    """
+    resizable = False
+    in_memory = False
+    queryable = False
+    # Правки сразу в хранилище: отложенной записи (flush) нет
+    write_delay = None
+
+    def __init__(self, filename, delimiter=','):
+        self.filename = filename
+        self.delimiter = delimiter
+        self.overlay = {}
+        self._cache = OrderedDict()
+        self._open()
+
+    def _open(self):
+        self._file = open(self.filename, 'rb')
+        if os.path.getsize(self.filename):
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self._mm = b''
+        self.offsets = build_row_index(self._mm, delimiter=self.delimiter)
+        self._cache.clear()
+        # Пока ширина не известна, строки не дополняются пустыми ячейками
+        self.headers = []
+        width = max((len(r) for r in self.rows(0, SAMPLE_ROWS)), default=0)
+        self.headers = [f"Column {col}" for col in range(width)]
+
+    def close(self):
+        if isinstance(self._mm, mmap.mmap):
+            self._mm.close()
+        self._file.close()
+
+    def row_count(self):
+        return len(self.offsets) - 1
+
+    def column_count(self):
+        return len(self.headers)
+
+    def _raw_row(self, row):
+        return self._mm[self.offsets[row]:self.offsets[row + 1]]
+
+    def _parse(self, raw):
+        text = raw.decode('utf-8')
+        return next(csv.reader((text,), delimiter=self.delimiter), [])
+
+    def _pad(self, values):
+        width = len(self.headers)
+        if len(values) < width:
+            values = values + [""] * (width - len(values))
+        return values
+
+    def row(self, row):
+        if row in self.overlay:
+            return list(self.overlay[row])
+        values = self._cache.get(row)
+        if values is None:
+            values = self._pad(self._parse(self._raw_row(row)))
+            self._cache[row] = values
+            if len(self._cache) > ROW_CACHE:
+                self._cache.popitem(last=False)
+        return list(values)
+
+    def cell(self, row, col):
+        values = self.overlay.get(row) or self._cache.get(row)
+        if values is None:
+            values = self.row(row)
+        return values[col] if col < len(values) else ""
+
+    def set_cell(self, row, col, value):
+        values = self.row(row)
+        values[col] = "" if value is None else str(value)
+        self.overlay[row] = values
+
+    def set_cells(self, col, rows, values):
+        for row, value in zip(rows, values):
+            self.set_cell(row, col, value)
+
+    def column(self, col):
+        return [values[col] for values in self.rows()]
+
+    def column_kind(self, col):
+        # Типы не выводим: это потребовало бы полного прохода по файлу
+        return TEXT
+
+    def sort_keys(self, col):
+        return None
+
+    def rows(self, start=0, stop=None):
+        """Последовательно разбирает строки пачками, с учётом правок"""
+        total = self.row_count()
+        stop = total if stop is None else min(stop, total)
+        while start < stop:
+            end = min(start + READ_CHUNK, stop)
+            text = self._mm[self.offsets[start]:self.offsets[end]].decode('utf-8')
+            reader = csv.reader(io.StringIO(text, newline=''), delimiter=self.delimiter)
+            for row, values in zip(range(start, end), reader):
+                if row in self.overlay:
+                    values = self.overlay[row]
+                yield self._pad(list(values))
+            start = end
+
+    def _line_terminator(self, row):
+        raw = self._raw_row(row)
+        if raw.endswith(b'\r\n'):
+            return '\r\n'
+        return '\n' if raw.endswith(b'\n') else ''
+
+    def _encode_row(self, values, delimiter, terminator):
+        out = io.StringIO()
+        csv.writer(out, delimiter=delimiter, lineterminator=terminator).writerow(values)
+        return out.getvalue().encode('utf-8')
+
+    def _copy_range(self, out, start, end):
+        for pos in range(start, end, INDEX_BLOCK):
+            out.write(self._mm[pos:min(pos + INDEX_BLOCK, end)])
+
+    def save(self, filename, delimiter=',', headers=None):
+        """Записывает файл потоком: неизменённые диапазоны байт копируются
+        как есть, заново кодируются только строки из overlay"""
+        tmp_name = f"{filename}.tmp"
+        terminator = self._line_terminator(0) if self.row_count() else '\r\n'
+        with open(tmp_name, 'wb') as out:
+            if headers is not None:
+                out.write(self._encode_row(headers, delimiter, terminator or '\r\n'))
+            if delimiter != self.delimiter:
+                # Другой разделитель: перекодируем все строки
+                for row, values in enumerate(self.rows()):
+                    out.write(self._encode_row(values, delimiter, self._line_terminator(row)))
+            else:
+                pos = 0
+                for row in sorted(self.overlay):
+                    self._copy_range(out, pos, self.offsets[row])
+                    out.write(self._encode_row(self.overlay[row], delimiter,
+                                               self._line_terminator(row)))
+                    pos = self.offsets[row + 1]
+                self._copy_range(out, pos, self.offsets[-1])
+
+        same_file = os.path.exists(filename) and os.path.samefile(filename, self.filename)
+        if same_file:
+            # Отображение нужно закрыть до замены файла
+            self.close()
+        os.replace(tmp_name, filename)
+        if same_file:
+            self.overlay.clear()
+            self._open()
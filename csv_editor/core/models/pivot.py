@@ -0,0 +1,142 @@
+from array import array
+from bisect import bisect_left
+from math import isnan
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
+from .group_by import GroupBy, COUNT, AGGREGATE_TITLES
+
+
+def _label_sort_key(store, columns):
+    # Подписи сортируются по ключам хранилища: числа как числа, пустые в конце
+    keys = [store.sort_keys(col) for col in columns]
+    values = [store.column(col) for col in columns]
+
+    def key(row):
+        result = []
+        for col_keys, col_values in zip(keys, values):
+            if col_keys is None:
+                result.append((col_values[row] == "", col_values[row]))
+            else:
+                number = col_keys[row]
+                result.append((isnan(number), 0.0 if isnan(number) else number))
+        return tuple(result)
+    return key
+
+
+class PivotTable:
+    """Сводная таблица: строки по row_columns, столбцы по column_columns,
+    в ячейках агрегат столбца value_column (без него — число строк).
+
+    Строки таблицы раскладываются по сочетаниям ключей одним проходом
+    (GroupBy по всем ключевым столбцам), так что существуют только
+    непустые ячейки. Они хранятся как CSR: для строки сводной таблицы
+    row_starts даёт диапазон в отсортированных номерах столбцов и значениях.
+    """
+    def __init__(self, store, row_columns, column_columns, value_column=None, aggregate=COUNT):
+        self.row_columns = list(row_columns)
+        self.column_columns = list(column_columns)
+        self.value_column = value_column
+        self.aggregate = aggregate
+        # Хранилище не запоминаем: сводная таблица — снимок на момент построения
+        self.row_headers = [store.headers[col] for col in self.row_columns]
+        self.value_header = store.headers[value_column] if value_column is not None else None
+        groups = GroupBy(store, self.row_columns + self.column_columns)
+        values = groups.formatted(value_column, aggregate)
+
+        width = len(self.row_columns)
+        firsts = groups.first_rows
+        row_of = {}
+        col_of = {}
+        cell_rows = []
+        cell_cols = []
+        row_firsts = []
+        col_firsts = []
+        for first in firsts:
+            full = [store.cell(first, col) for col in self.row_columns + self.column_columns]
+            row_label, col_label = tuple(full[:width]), tuple(full[width:])
+            if row_label not in row_of:
+                row_of[row_label] = len(row_of)
+                row_firsts.append(first)
+            if col_label not in col_of:
+                col_of[col_label] = len(col_of)
+                col_firsts.append(first)
+            cell_rows.append(row_of[row_label])
+            cell_cols.append(col_of[col_label])
+
+        # Перенумеровываем подписи в порядке сортировки
+        row_key = _label_sort_key(store, self.row_columns)
+        col_key = _label_sort_key(store, self.column_columns)
+        row_order = sorted(range(len(row_firsts)), key=lambda i: row_key(row_firsts[i]))
+        col_order = sorted(range(len(col_firsts)), key=lambda i: col_key(col_firsts[i]))
+        row_rank = {old: new for new, old in enumerate(row_order)}
+        col_rank = {old: new for new, old in enumerate(col_order)}
+        self.row_labels = [tuple(store.cell(row_firsts[i], c) for c in self.row_columns)
+                           for i in row_order]
+        self.column_labels = [tuple(store.cell(col_firsts[i], c) for c in self.column_columns)
+                              for i in col_order]
+
+        cell_rows = list(map(row_rank.__getitem__, cell_rows))
+        cell_cols = list(map(col_rank.__getitem__, cell_cols))
+        order = sorted(range(len(cell_rows)), key=lambda i: (cell_rows[i], cell_cols[i]))
+        self.cell_columns = array('l', map(cell_cols.__getitem__, order))
+        self.cell_values = list(map(values.__getitem__, order))
+        self.row_starts = array('l', [0]) * (len(self.row_labels) + 1)
+        for row in cell_rows:
+            self.row_starts[row + 1] += 1
+        for row in range(len(self.row_labels)):
+            self.row_starts[row + 1] += self.row_starts[row]
+
+    def row_count(self):
+        return len(self.row_labels)
+
+    def column_count(self):
+        return len(self.column_labels)
+
+    def cell_count(self):
+        """Число непустых ячеек"""
+        return len(self.cell_values)
+
+    def value(self, row, col):
+        start, stop = self.row_starts[row], self.row_starts[row + 1]
+        pos = bisect_left(self.cell_columns, col, start, stop)
+        if pos < stop and self.cell_columns[pos] == col:
+            return self.cell_values[pos]
+        return ""
+
+    def title(self):
+        if self.value_column is None:
+            return "Rows"
+        name = AGGREGATE_TITLES.get(self.aggregate) or self.aggregate.upper()
+        return f"{name}({self.value_header})"
+
+
+class PivotModel(QAbstractTableModel):
+    """Модель только для чтения поверх PivotTable: ячейки берутся из CSR
+    по запросу вида, пустые ячейки нигде не хранятся"""
+    def __init__(self, pivot, parent=None):
+        super().__init__(parent)
+        self.pivot = pivot
+        self._label_columns = len(pivot.row_columns)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.pivot.row_count()
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._label_columns + self.pivot.column_count()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        row, col = index.row(), index.column()
+        if col < self._label_columns:
+            return self.pivot.row_labels[row][col]
+        return self.pivot.value(row, col - self._label_columns)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Vertical:
+            return section + 1
+        if section < self._label_columns:
+            return self.pivot.row_headers[section]
+        label = self.pivot.column_labels[section - self._label_columns]
+        return " | ".join(label)
@@ -1,43 +1,460 @@
-from PyQt5.QtCore import Qt, QSortFilterProxyModel, QRegExp, QModelIndex
+from array import array
+from itertools import compress, filterfalse
+from operator import ne
+from PyQt5.QtCore import Qt, QAbstractProxyModel, QRegExp, QModelIndex, QTimer
 from PyQt5.QtGui import QColor
+from .column_types import text_number_keys
+from .filter_pass import FilterQuery, FilterPass
+from .search_index import SearchIndex
+from csv_editor.core.utils.perf import span
 import re
 
-class MySortFilterProxyModel(QSortFilterProxyModel):
+# При изменении большего числа строк dataChanged пересылается одним диапазоном
+DATA_CHANGED_MAP_LIMIT = 1000
+# Правку большего числа строк под фильтром перепроверяет фоновый проход,
+# а не filterAcceptsRow в GUI-потоке
+FILTER_RECHECK_LIMIT = 5000
+INVERT_FLAGS = bytes([1, 0]) + bytes(254)
+# Уточнение запроса перепроверяет прошлый результат, только если он не больше
+# этой доли таблицы; иначе быстрее общий проход по столбцам или индексу
+REFINE_RATIO = 8
+# Сколько ячеек держит кэш подсветки, прежде чем сбросить его
+HIGHLIGHT_CACHE_LIMIT = 200000
+HIGHLIGHT_COLOR = QColor("#FFC107").lighter(140)
+
+
+class MySortFilterProxyModel(QAbstractProxyModel):
+    """Прокси сортировки и фильтрации с собственным отображением строк.
+
+    Сортировка не вызывает компаратор для каждой пары строк: перестановка
+    всего столбца считается за один вызов sorted() и сразу становится
+    отображением строк прокси. Перестановки кэшируются по (столбец, режим,
+    порядок) и сбрасываются только правками соответствующего столбца.
+
+    Фильтр проверяет столбцы из filter_columns (None — все столбцы). Поиск
+    подстрок идёт по спискам столбцов хранилища, а при включённом
+    поисковом индексе (enable_search_index) — по индексу. Прокси помнит
+    строки, найденные прошлым запросом: уточнённый запрос (длиннее подстрока,
+    лишнее слово в режиме И) проверяет только их. При filter_delay > 0
+    изменения фильтра откладываются и считаются в фоновом потоке, а новый
+    запрос отменяет ещё не законченный проход.
+
+    Если хранилище источника само умеет сортировать и фильтровать
+    (queryable, например таблица SQLite), условия передаются ему через
+    model.apply_query, а прокси показывает строки источника как есть.
+    """
     def __init__(self, parent=None):
         super().__init__(parent)
         self.search_pattern = ""
         self.highlight_enabled = True
+        # Подсветка: скомпилированный шаблон и кэш совпадений по ячейкам
+        # источника {(строка, столбец): bool}
+        self._highlight_re = None
+        self._highlight_cache = {}
         self.invert_filter = False
         self._filter_words = None
         self._use_and = True
+        self._filter_regexp = QRegExp()
+        self.filter_columns = None
+        self.search_index = None
+        # Строки источника под последним посчитанным запросом (без инверсии)
+        self._last_query = None
+        self._last_matches = None
+        # Отложенная фильтрация: задержка в мс (0 — сразу, в GUI-потоке)
+        self.filter_delay = 0
+        self._filter_timer = QTimer(self)
+        self._filter_timer.setSingleShot(True)
+        self._filter_timer.timeout.connect(self._start_filter_pass)
+        self._filter_pass = None
         # Режим сортировки: "default", "lexicographic", "alphabetical", "length"
         self.sort_mode = "default"
+        # Активная сортировка: список (столбец, порядок), первый — главный ключ
+        self._sort_spec = []
+        self._sort_cache = {}
+        # Строки источника в порядке отображения; None в _accepted — фильтра нет
+        self._rows = range(0)
+        self._accepted = None
+        self._inverse = None
+        self._identity_insert = False
+
+    # --- Подключение источника ---
+
+    def setSourceModel(self, model):
+        old = self.sourceModel()
+        if old is not None:
+            for signal, slot in self._source_connections(old):
+                signal.disconnect(slot)
+        self.beginResetModel()
+        super().setSourceModel(model)
+        for signal, slot in self._source_connections(model):
+            signal.connect(slot)
+        self._reset_state()
+        self.endResetModel()
+
+    def _source_connections(self, model):
+        return [
+            (model.modelAboutToBeReset, self.beginResetModel),
+            (model.modelReset, self._on_source_reset),
+            (model.layoutAboutToBeChanged, self.beginResetModel),
+            (model.layoutChanged, self._on_source_reset),
+            (model.dataChanged, self._on_source_data_changed),
+            (model.headerDataChanged, self.headerDataChanged),
+            (model.rowsAboutToBeInserted, self._on_rows_about_to_be_inserted),
+            (model.rowsInserted, self._on_rows_inserted),
+            (model.rowsAboutToBeRemoved, self._on_rows_about_to_be_removed),
+            (model.rowsRemoved, self._on_rows_removed),
+            (model.columnsAboutToBeInserted, self._on_columns_about_to_be_inserted),
+            (model.columnsInserted, self._on_columns_inserted),
+            (model.columnsAboutToBeRemoved, self._on_columns_about_to_be_removed),
+            (model.columnsRemoved, self._on_columns_removed),
+        ]
+
+    def _reset_state(self):
+        # Сортировка сохраняется, если её столбцы есть в новых данных
+        columns = self.columnCount()
+        self._sort_spec = [(c, o) for c, o in self._sort_spec if c < columns]
+        self._sort_cache.clear()
+        self._highlight_cache.clear()
+        self._cancel_filter_pass()
+        self._restart_search_index()
+        self._forget_matches()
+        self._accepted = self._compute_accepted()
+        self._rebuild()
+        if self._pushdown() and self.sourceModel().store.query != self._store_query():
+            # Новое хранилище ещё не знает условий прокси; сбрасывать
+            # модель внутри обработчика сброса нельзя
+            QTimer.singleShot(0, self._push_query)
+
+    # --- Отображение строк ---
+
+    def _source_row_count(self):
+        model = self.sourceModel()
+        return model.rowCount() if model is not None else 0
+
+    def _is_identity(self):
+        return not self._sort_spec and self._accepted is None
+
+    def _rebuild(self):
+        order = self._sorted_order()
+        if self._accepted is not None:
+            order = list(compress(order, map(self._accepted.__getitem__, order)))
+        self._rows = order
+        self._inverse = None
+
+    def _source_to_proxy(self):
+        # Обратное отображение строится лениво: оно нужно редко
+        # (выделение, постоянные индексы), а стоит O(n)
+        if self._inverse is None:
+            inverse = array('q', [-1]) * self._source_row_count()
+            for proxy_row, source_row in enumerate(self._rows):
+                inverse[source_row] = proxy_row
+            self._inverse = inverse
+        return self._inverse
+
+    def index(self, row, column, parent=QModelIndex()):
+        if parent.isValid() or not 0 <= row < len(self._rows) \
+                or not 0 <= column < self.columnCount():
+            return QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, index=None):
+        if index is None:
+            return super().parent()
+        return QModelIndex()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        model = self.sourceModel()
+        return 0 if parent.isValid() or model is None else model.columnCount()
+
+    def mapToSource(self, proxy_index):
+        if not proxy_index.isValid() or self.sourceModel() is None:
+            return QModelIndex()
+        return self.sourceModel().index(self._rows[proxy_index.row()], proxy_index.column())
+
+    def source_rows(self, first, last):
+        """Строки источника для строк вида first..last (без сортировки
+        и фильтра — range)"""
+        return self._rows[first:last + 1]
+
+    def mapFromSource(self, source_index):
+        if not source_index.isValid():
+            return QModelIndex()
+        if self._is_identity():
+            row = source_index.row()
+        else:
+            row = self._source_to_proxy()[source_index.row()]
+        return self.index(row, source_index.column()) if row >= 0 else QModelIndex()
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        model = self.sourceModel()
+        if model is None:
+            return None
+        if orientation == Qt.Vertical and 0 <= section < len(self._rows):
+            section = self._rows[section]
+        return model.headerData(section, orientation, role)
+
+    def _relayout(self, refilter=False, accepted=None):
+        # Перестановка строк с сохранением постоянных индексов (выделение, редактор)
+        self.layoutAboutToBeChanged.emit()
+        old = self.persistentIndexList()
+        sources = [self.mapToSource(index) for index in old]
+        if refilter:
+            self._accepted = self._compute_accepted()
+        elif accepted is not None:
+            self._accepted = accepted
+        self._rebuild()
+        self.changePersistentIndexList(old, [self.mapFromSource(s) for s in sources])
+        self.layoutChanged.emit()
+
+    # --- Фильтрация ---
 
     def set_extended_filter(self, words, use_and):
         self._filter_words = words
         self._use_and = use_and
-        self.invalidateFilter()
+        self._schedule_filter()
+
+    def set_filter_columns(self, columns):
+        """Столбцы, по которым ищет фильтр; None — все столбцы"""
+        self.filter_columns = sorted(set(columns)) if columns is not None else None
+        self._schedule_filter()
+
+    def _scope_columns(self):
+        count = self.columnCount()
+        if self.filter_columns is None:
+            return list(range(count))
+        return [col for col in self.filter_columns if 0 <= col < count]
+
+    def enable_search_index(self, enabled=True, columns=None):
+        """Включает поисковый индекс по столбцам (None — по всем).
+
+        Индекс строится в фоновом потоке; пока он не готов, фильтр
+        работает прямым проходом по столбцам.
+        """
+        self.search_index = SearchIndex(columns) if enabled else None
+        self._restart_search_index()
+
+    def rebuild_search_index(self):
+        self._restart_search_index()
+
+    def _restart_search_index(self):
+        model = self.sourceModel()
+        if self.search_index is None or model is None:
+            return
+        if model.store.in_memory:
+            self.search_index.rebuild_async(model.store)
+        else:
+            self.search_index.invalidate()
 
     def set_highlight_enabled(self, enabled: bool):
         self.highlight_enabled = enabled
-        self.invalidate()
+        self._repaint()
 
     def set_invert_filter(self, enabled: bool):
         self.invert_filter = enabled
-        self.invalidateFilter()
+        # Отложенный проход сам учтёт инверсию; иначе она накладывается
+        # на запомненные строки без повторной проверки
+        if self._filter_pass is None and not self._filter_timer.isActive():
+            self.invalidateFilter()
 
     def setFilterRegExp(self, regExp):
-        super().setFilterRegExp(regExp)
-        self.search_pattern = regExp.pattern()
+        if isinstance(regExp, str):
+            regExp = QRegExp(regExp)
+        self._filter_regexp = QRegExp(regExp)
+        self._set_highlight_pattern(regExp.pattern())
+        self._schedule_filter()
+
+    def filterRegExp(self):
+        return self._filter_regexp
+
+    def set_filter_delay(self, msec):
+        """Задержка фильтрации после изменения условий (0 — сразу)"""
+        self.filter_delay = msec
+
+    def invalidateFilter(self):
+        self._cancel_filter_pass()
+        if self._pushdown():
+            self._push_query()
+        else:
+            self._relayout(refilter=True)
+
+    def invalidate(self):
+        self._sort_cache.clear()
+        self._forget_matches()
         self.invalidateFilter()
 
+    def _schedule_filter(self):
+        self._cancel_filter_pass()
+        if self.filter_delay > 0:
+            # Быстрый ввод сливается в один проход после паузы
+            self._filter_timer.start(self.filter_delay)
+        else:
+            self.invalidateFilter()
+
+    def _cancel_filter_pass(self):
+        self._filter_timer.stop()
+        if self._filter_pass is not None:
+            self._filter_pass.cancel()
+            self._filter_pass = None
+
+    def stop_filter_passes(self):
+        """Отменяет отложенную фильтрацию и дожидается фоновых проходов,
+        в том числе уже отменённых (перед закрытием окна)"""
+        self._cancel_filter_pass()
+        for filter_pass in self.findChildren(FilterPass):
+            filter_pass.cancel()
+            filter_pass.wait()
+
+    def _restart_filter_pass(self):
+        # Источник изменился во время прохода: его результат устарел
+        if self._filter_pass is not None:
+            self._cancel_filter_pass()
+            self._filter_timer.start(self.filter_delay)
+
+    def _start_filter_pass(self):
+        model = self.sourceModel()
+        query = self._current_query() if model is not None else None
+        if query is None or not query.is_active() or not model.store.in_memory \
+                or self._cached_matches(query) is not None:
+            self.invalidateFilter()
+            return
+        candidates = self._refine_candidates(query)
+        self._filter_pass = FilterPass(model.store, query, self.search_index,
+                                       candidates, self)
+        self._filter_pass.finished.connect(self._on_filter_pass_finished)
+        self._filter_pass.start()
+
+    def _on_filter_pass_finished(self):
+        filter_pass = self.sender()
+        filter_pass.deleteLater()
+        if filter_pass is not self._filter_pass:
+            return
+        self._filter_pass = None
+        if filter_pass.was_cancelled() or filter_pass.rows is None:
+            return
+        self._relayout(accepted=self._accepted_from(filter_pass.query, filter_pass.rows))
+
+    def _filter_active(self):
+        return bool(self._filter_words) or not self._filter_regexp.isEmpty()
+
+    def _current_query(self):
+        return FilterQuery(self._filter_words, self._use_and,
+                           self._filter_regexp, self._scope_columns())
+
+    def _inverted(self):
+        # Инверсия действует только на фильтр по регулярному выражению
+        return self.invert_filter and not self._filter_words
+
+    def _forget_matches(self):
+        self._last_query = None
+        self._last_matches = None
+
+    def _cached_matches(self, query):
+        if self._last_matches is not None and query == self._last_query:
+            return self._last_matches
+        return None
+
+    def _refine_candidates(self, query):
+        # Строки прошлого результата, если новый запрос его уточняет
+        if self._last_matches is None or not query.refines(self._last_query) \
+                or len(self._last_matches) * REFINE_RATIO > self._source_row_count():
+            return None
+        return sorted(self._last_matches)
+
+    def _accepted_from(self, query, rows):
+        self._last_query, self._last_matches = query, rows
+        accepted = bytearray(self._source_row_count())
+        for row in rows:
+            accepted[row] = 1
+        if self._inverted():
+            accepted = accepted.translate(INVERT_FLAGS)
+        return accepted
+
+    def _compute_accepted(self):
+        # Флаги принятых строк источника (bytearray) или None без фильтра
+        if not self._filter_active() or self.sourceModel() is None or self._pushdown():
+            self._forget_matches()
+            return None
+        store = self.sourceModel().store
+        with span("filter", rows=self._source_row_count()):
+            if not store.in_memory:
+                self._forget_matches()
+                parent = QModelIndex()
+                return bytearray(self.filterAcceptsRow(row, parent)
+                                 for row in range(self._source_row_count()))
+            query = self._current_query()
+            rows = self._cached_matches(query)
+            if rows is None:
+                rows = query.match_rows(store, self.search_index, self._refine_candidates(query))
+            return self._accepted_from(query, rows)
+
+    def _pushdown(self):
+        model = self.sourceModel()
+        return model is not None and model.store.queryable
+
+    def _store_query(self):
+        # Условия для хранилища: (фильтр или None, инверсия, [(столбец, по убыванию)], режим)
+        query = self._current_query()
+        active = query.is_active()
+        order = tuple((column, order == Qt.DescendingOrder) for column, order in self._sort_spec)
+        return (query if active else None, active and self._inverted(), order, self.sort_mode)
+
+    def _push_query(self):
+        model = self.sourceModel()
+        if model is None or not model.store.queryable:
+            return
+        query = self._store_query()
+        if model.store.query != query:
+            model.apply_query(*query)
+
+    def _repaint(self, roles=None):
+        if self._rows and self.columnCount():
+            self.dataChanged.emit(self.index(0, 0),
+                                  self.index(len(self._rows) - 1, self.columnCount() - 1),
+                                  roles or [])
+
+    # --- Подсветка ---
+
+    def _set_highlight_pattern(self, pattern):
+        self.search_pattern = pattern
+        self._highlight_cache.clear()
+        if not pattern:
+            self._highlight_re = None
+            return
+        try:
+            self._highlight_re = re.compile(pattern, re.IGNORECASE)
+        except re.error:
+            # Синтаксис QRegExp не всегда совместим с re: ищем как текст
+            self._highlight_re = re.compile(re.escape(pattern), re.IGNORECASE)
+
+    def _is_highlighted(self, source_row, column):
+        key = (source_row, column)
+        hit = self._highlight_cache.get(key)
+        if hit is None:
+            if len(self._highlight_cache) >= HIGHLIGHT_CACHE_LIMIT:
+                self._highlight_cache.clear()
+            model = self.sourceModel()
+            text = model.data(model.index(source_row, column), Qt.DisplayRole)
+            hit = bool(text) and self._highlight_re.search(text) is not None
+            self._highlight_cache[key] = hit
+        return hit
+
+    def _forget_highlight(self, first, last, left, right):
+        # Сбрасывает кэш подсветки только для изменённых ячеек
+        if (last - first + 1) * (right - left + 1) > DATA_CHANGED_MAP_LIMIT:
+            self._highlight_cache.clear()
+            return
+        for row in range(first, last + 1):
+            for column in range(left, right + 1):
+                self._highlight_cache.pop((row, column), None)
+
     def data(self, index, role=Qt.DisplayRole):
-        if role == Qt.BackgroundRole and self.highlight_enabled and self.search_pattern:
-            source_index = self.mapToSource(index)
-            text = self.sourceModel().data(source_index, Qt.DisplayRole)
-            highlight_color = QColor("#FFC107")
-            if text and re.search(self.search_pattern, text, re.IGNORECASE):
-                return highlight_color.lighter(140)
+        if role == Qt.BackgroundRole and self.highlight_enabled \
+                and self._highlight_re is not None and index.isValid():
+            if self._is_highlighted(self._rows[index.row()], index.column()):
+                return HIGHLIGHT_COLOR
         return super().data(index, role)
 
     def filterAcceptsRow(self, sourceRow: int, sourceParent: QModelIndex) -> bool:
@@ -48,7 +465,7 @@ class MySortFilterProxyModel(QSortFilterProxyModel):
                 return True
             model = self.sourceModel()
             found = False
-            for col in [0, 1]:
+            for col in self._scope_columns():
                 index = model.index(sourceRow, col, sourceParent)
                 data = model.data(index, Qt.DisplayRole)
                 if data and self.filterRegExp().indexIn(str(data)) != -1:
@@ -59,7 +476,7 @@ class MySortFilterProxyModel(QSortFilterProxyModel):
     def _extended_filterAcceptsRow(self, sourceRow, sourceParent):
         model = self.sourceModel()
         row_text = []
-        for c in range(model.columnCount()):
+        for c in self._scope_columns():
             idx = model.index(sourceRow, c, sourceParent)
             val = model.data(idx, Qt.DisplayRole)
             if val:
@@ -70,22 +487,229 @@ class MySortFilterProxyModel(QSortFilterProxyModel):
         else:
             return any(w.lower() in row_joined for w in self._filter_words)
 
-    def lessThan(self, left, right):
-        left_data = self.sourceModel().data(left, Qt.DisplayRole)
-        right_data = self.sourceModel().data(right, Qt.DisplayRole)
+    # --- Сортировка ---
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        """Сортирует по одному столбцу; column < 0 возвращает исходный порядок"""
+        self.sort_by_columns([(column, order)] if column >= 0 else [])
+
+    def sort_by_columns(self, spec):
+        """Устойчивая сортировка по нескольким столбцам: [(столбец, порядок), ...]"""
+        self._sort_spec = [(column, Qt.SortOrder(order)) for column, order in spec]
+        if self._pushdown():
+            self._push_query()
+        else:
+            self._relayout()
+
+    def sortColumn(self):
+        return self._sort_spec[0][0] if self._sort_spec else -1
+
+    def sortOrder(self):
+        return self._sort_spec[0][1] if self._sort_spec else Qt.AscendingOrder
+
+    def _sorted_order(self):
+        count = self._source_row_count()
+        if not self._sort_spec or self._pushdown():
+            return range(count)
+        if len(self._sort_spec) == 1:
+            column, order = self._sort_spec[0]
+            key = (column, self.sort_mode, order)
+            if key not in self._sort_cache:
+                with span("sort", rows=count):
+                    self._sort_cache[key] = self._sorted_rows(range(count), column, order)
+            return self._sort_cache[key]
+        # Устойчивая сортировка: от младшего ключа к старшему
+        rows = range(count)
+        with span("sort", rows=count):
+            for column, order in reversed(self._sort_spec):
+                rows = self._sorted_rows(rows, column, order)
+        return rows
+
+    def _sorted_rows(self, rows, column, order):
+        model = self.sourceModel()
+        reverse = order == Qt.DescendingOrder
+        values = None
+        if self.sort_mode == "default":
+            # Числовые столбцы сортируются по ключам, разобранным при загрузке;
+            # текстовый столбец, где числа — большинство, — по числам тоже
+            keys = model.sort_keys(column)
+            if keys is None:
+                values = model.column_values(column)
+                keys = text_number_keys(values)
+            if keys is not None:
+                # Пустые и нечисловые ячейки (NaN) идут после чисел при любом
+                # порядке; нечисловые между собой — как строки
+                missing = list(map(ne, keys, keys))
+                valid = sorted(filterfalse(missing.__getitem__, rows),
+                               key=keys.__getitem__, reverse=reverse)
+                rest = list(filter(missing.__getitem__, rows))
+                if values is not None:
+                    rest.sort(key=values.__getitem__, reverse=reverse)
+                return valid + rest
+        if values is None:
+            values = model.column_values(column)
         # Сортировка по длине строки
         if self.sort_mode == "length":
-            return len(str(left_data)) < len(str(right_data))
+            values = list(map(len, values))
         # Сортировка по алфавиту (без учёта регистра)
         elif self.sort_mode == "alphabetical":
-            return str(left_data).lower() < str(right_data).lower()
-        # Лексикографическая сортировка (с учётом регистра)
-        elif self.sort_mode == "lexicographic":
-            return str(left_data) < str(right_data)
+            values = list(map(str.lower, values))
+        # Лексикографическая сортировка (с учётом регистра); ею же
+        # сортируются текстовые столбцы в режиме по умолчанию
+        return sorted(rows, key=values.__getitem__, reverse=reverse)
+
+    def _drop_sort_cache(self, columns=None):
+        if columns is None:
+            self._sort_cache.clear()
+            return
+        for key in [k for k in self._sort_cache if k[0] in columns]:
+            del self._sort_cache[key]
+
+    # --- Изменения в источнике ---
+
+    def _on_source_reset(self):
+        self._reset_state()
+        self.endResetModel()
+
+    def _on_source_data_changed(self, top_left, bottom_right, roles=()):
+        first, last = top_left.row(), bottom_right.row()
+        self._drop_sort_cache(range(top_left.column(), bottom_right.column() + 1))
+        if self._highlight_cache:
+            self._forget_highlight(first, last, top_left.column(), bottom_right.column())
+        # Пакетная правка перечисляет свои ячейки: строки между ними
+        # (охватывающий прямоугольник сигнала) не менялись
+        cells = self.sourceModel().changed_cells
+        if cells is not None:
+            changed_rows = sorted(set().union(*(rows for rows, values in cells.values())))
+        else:
+            changed_rows = range(first, last + 1)
+        if self.search_index is not None:
+            self.search_index.mark_dirty(changed_rows)
+            if self.search_index.needs_rebuild():
+                self._restart_search_index()
+        self._restart_filter_pass()
+        if self._accepted is not None and len(changed_rows) > FILTER_RECHECK_LIMIT \
+                and self.sourceModel().store.in_memory:
+            # Запомненные строки устарели; до конца прохода остаётся прежний набор
+            self._forget_matches()
+            self._filter_timer.start(self.filter_delay)
+        elif self._accepted is not None:
+            # Правка могла изменить результат фильтра для этих строк
+            parent = QModelIndex()
+            changed = False
+            for row in changed_rows:
+                accepted = self.filterAcceptsRow(row, parent)
+                self._remember_match(row, accepted)
+                if accepted != bool(self._accepted[row]):
+                    self._accepted[row] = accepted
+                    changed = True
+            if changed:
+                self._relayout()
+                return
+        if not self._rows:
+            return
+        if self._is_identity():
+            proxy_rows = [first, last]
+        elif last - first >= DATA_CHANGED_MAP_LIMIT:
+            proxy_rows = [0, len(self._rows) - 1]
         else:
-            try:
-                left_val = float(left_data)
-                right_val = float(right_data)
-                return left_val < right_val
-            except (ValueError, TypeError):
-                return str(left_data) < str(right_data)
+            inverse = self._source_to_proxy()
+            proxy_rows = [inverse[row] for row in range(first, last + 1) if inverse[row] >= 0]
+            if not proxy_rows:
+                return
+        self.dataChanged.emit(self.index(min(proxy_rows), top_left.column()),
+                              self.index(max(proxy_rows), bottom_right.column()),
+                              roles)
+
+    def _remember_match(self, row, accepted):
+        # Пока ждёт отложенный проход, условия фильтра уже не те,
+        # по которым запомнены строки
+        if self._filter_timer.isActive() or self._filter_pass is not None:
+            self._forget_matches()
+        if self._last_matches is None:
+            return
+        if accepted != self._inverted():
+            self._last_matches.add(row)
+        else:
+            self._last_matches.discard(row)
+
+    def _on_rows_about_to_be_inserted(self, parent, first, last):
+        self._identity_insert = self._is_identity()
+        if self._identity_insert:
+            self.beginInsertRows(QModelIndex(), first, last)
+
+    def _on_rows_inserted(self, parent, first, last):
+        self._drop_sort_cache()
+        count = last - first + 1
+        self._restart_filter_pass()
+        # Строки в конце индекс проверяет напрямую, вставка в середину
+        # сдвигает номера строк, и индекс надо строить заново
+        if first < self._source_row_count() - count:
+            self._restart_search_index()
+            self._forget_matches()
+            self._highlight_cache.clear()
+        if self._identity_insert:
+            self._rows = range(self._source_row_count())
+            self.endInsertRows()
+            return
+        # Новые строки добавляются в конец отображения (без пересортировки)
+        if first < self._source_row_count() - count:
+            self._rows = [row + count if row >= first else row for row in self._rows]
+        new_rows = list(range(first, last + 1))
+        if self._accepted is not None:
+            flags = bytearray(self.filterAcceptsRow(row, QModelIndex()) for row in new_rows)
+            for row, accepted in zip(new_rows, flags):
+                self._remember_match(row, accepted)
+            self._accepted[first:first] = flags
+            new_rows = list(compress(new_rows, flags))
+        self._inverse = None
+        if new_rows:
+            start = len(self._rows)
+            self.beginInsertRows(QModelIndex(), start, start + len(new_rows) - 1)
+            self._rows = list(self._rows) + new_rows
+            self.endInsertRows()
+
+    def _on_rows_about_to_be_removed(self, parent, first, last):
+        if self._is_identity():
+            self.beginRemoveRows(QModelIndex(), first, last)
+        else:
+            self.beginResetModel()
+
+    def _on_rows_removed(self, parent, first, last):
+        self._restart_filter_pass()
+        self._forget_matches()
+        self._highlight_cache.clear()
+        if self._is_identity():
+            self._drop_sort_cache()
+            self._restart_search_index()
+            self._rows = range(self._source_row_count())
+            self.endRemoveRows()
+        else:
+            self._on_source_reset()
+
+    def _on_columns_about_to_be_inserted(self, parent, first, last):
+        self.beginInsertColumns(QModelIndex(), first, last)
+
+    def _on_columns_inserted(self, parent, first, last):
+        count = last - first + 1
+        self._sort_spec = [(c + count if c >= first else c, o) for c, o in self._sort_spec]
+        self._drop_sort_cache()
+        self._restart_search_index()
+        self._forget_matches()
+        self._highlight_cache.clear()
+        self._restart_filter_pass()
+        self.endInsertColumns()
+
+    def _on_columns_about_to_be_removed(self, parent, first, last):
+        self.beginRemoveColumns(QModelIndex(), first, last)
+
+    def _on_columns_removed(self, parent, first, last):
+        count = last - first + 1
+        self._sort_spec = [(c - count if c > last else c, o) for c, o in self._sort_spec
+                           if not first <= c <= last]
+        self._drop_sort_cache()
+        self._restart_search_index()
+        self._forget_matches()
+        self._highlight_cache.clear()
+        self._restart_filter_pass()
+        self.endRemoveColumns()
@@ -0,0 +1,189 @@
+import threading
+from array import array
+from bisect import bisect_right
+from collections import Counter
+from itertools import accumulate, compress, count, repeat
+from operator import add
+
+# Разделитель значений в общей строке столбца; подстрока с ним не ищется
+SEPARATOR = '\x00'
+# После стольких правок индекс перестраивается заново
+DIRTY_REBUILD_LIMIT = 10000
+
+
+def scan_rows(store, needle, columns, start=0):
+    """Строки начиная со start, где подстрока needle (в нижнем регистре) есть
+    хотя бы в одном из столбцов columns; прямой проход по спискам без индекса"""
+    result = set()
+    for col in columns:
+        column = store.column(col)
+        values = column[start:] if start else column
+        matches = map(str.__contains__, map(str.lower, values), repeat(needle))
+        result.update(compress(range(start, start + len(values)), matches))
+    return result
+
+
+class ColumnIndex:
+    """Инвертированный индекс одного столбца.
+
+    Различные значения столбца (в нижнем регистре) склеены в одну строку,
+    поэтому поиск подстроки идёт через str.find на уровне C, а не по ячейкам.
+    Строки таблицы для каждого значения хранятся компактно (CSR: перестановка
+    строк, отсортированная по номеру значения, и границы групп).
+    """
+    def __init__(self, values):
+        distinct = list(dict.fromkeys(values))
+        value_ids = {value: vid for vid, value in enumerate(distinct)}
+        row_values = array('i', map(value_ids.__getitem__, values))
+        self.rows = array('i', sorted(range(len(row_values)), key=row_values.__getitem__))
+        counts = Counter(row_values)
+        self.bounds = array('i', accumulate((counts[vid] for vid in range(len(distinct))), initial=0))
+        lowered = list(map(str.lower, distinct))
+        self.starts = array('q', [0])
+        self.starts.extend(map(add, accumulate(map(len, lowered)), count(1)))
+        self.text = SEPARATOR.join(lowered)
+
+    @classmethod
+    def from_parts(cls, rows, bounds, starts, text):
+        """Индекс из готовых частей (например, отображённых из кэша сессии);
+        rows, bounds и starts — любые последовательности целых"""
+        index = cls.__new__(cls)
+        index.rows = rows
+        index.bounds = bounds
+        index.starts = starts
+        index.text = text
+        return index
+
+    def rows_containing(self, needle):
+        """Строки, значение которых содержит needle; None, если индекс не подходит"""
+        if SEPARATOR in needle:
+            return None
+        result = set()
+        pos = self.text.find(needle)
+        while pos != -1:
+            vid = bisect_right(self.starts, pos) - 1
+            result.update(self.rows[self.bounds[vid]:self.bounds[vid + 1]])
+            # Следующее вхождение ищем уже в следующем значении
+            pos = self.text.find(needle, self.starts[vid + 1])
+        return result
+
+
+class SearchIndex:
+    """Набор индексов по столбцам, который строится в фоновом потоке.
+
+    Индекс покрывает первые indexed_rows строк на момент построения.
+    Строки, изменённые после этого (dirty), и догруженный хвост проверяются
+    напрямую, так что результат поиска всегда совпадает с полным проходом.
+    """
+    def __init__(self, columns=None):
+        # None — индексировать все столбцы
+        self.index_columns = columns
+        self.ready = False
+        self.indexed_rows = 0
+        self.dirty = set()
+        self._columns = {}
+        self._version = 0
+        self._building_dirty = None
+        self._store = None
+        self._thread = None
+        # Передача готового индекса из фонового потока и пометки правок
+        # из GUI-потока не должны перемежаться, иначе правка теряется
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        with self._lock:
+            self._version += 1
+            self.ready = False
+            self._columns = {}
+            self._building_dirty = None
+
+    def mark_dirty(self, rows):
+        with self._lock:
+            if self.ready:
+                self.dirty.update(rows)
+            if self._building_dirty is not None:
+                self._building_dirty.update(rows)
+
+    def needs_rebuild(self):
+        return len(self.dirty) > DIRTY_REBUILD_LIMIT
+
+    def rebuild_async(self, store):
+        """Перестраивает индекс в фоне; до готовности поиск идёт без него"""
+        self.invalidate()
+        self._store = store
+        self._thread = None
+        columns = self.index_columns
+        if columns is None:
+            columns = range(store.column_count())
+        rows = store.row_count()
+        # Хранилище из кэша сессии приносит готовый индекс; берём его один раз
+        prebuilt, store.prebuilt_index = store.prebuilt_index, None
+        if prebuilt is not None and prebuilt[0] == rows:
+            built = prebuilt[1]
+            columns = [col for col in columns if col < store.column_count()]
+            if all(col in built for col in columns):
+                self._columns = {col: built[col] for col in columns}
+                self.indexed_rows = rows
+                self.dirty = set()
+                self.ready = True
+                return None
+        # Снимок списков делается в GUI-потоке: всё, что изменится позже,
+        # попадёт в _building_dirty
+        snapshot = {col: store.column(col)[:rows] for col in columns
+                    if col < store.column_count()}
+        version = self._version
+        self._building_dirty = set()
+
+        def build():
+            built = {col: ColumnIndex(values) for col, values in snapshot.items()}
+            with self._lock:
+                if version == self._version:
+                    self._columns = built
+                    self.indexed_rows = rows
+                    self.dirty = self._building_dirty
+                    self._building_dirty = None
+                    self.ready = True
+
+        thread = threading.Thread(target=build, name="search-index", daemon=True)
+        thread.start()
+        self._thread = thread
+        return thread
+
+    def exporter(self, store):
+        """Функция для фонового потока: дожидается текущего построения
+        индекса store и возвращает (строк, {столбец: ColumnIndex}) или None,
+        если индекс с тех пор перестраивался или строки правились"""
+        version, thread = self._version, self._thread
+
+        def export():
+            if thread is not None:
+                thread.join()
+            columns = self._columns
+            if (version != self._version or not self.ready or self._store is not store
+                    or self.dirty or not columns):
+                return None
+            return self.indexed_rows, dict(columns)
+
+        return export
+
+    def search(self, store, needle, columns):
+        """Строки с подстрокой needle в столбцах columns или None без индекса"""
+        if not self.ready or store.row_count() < self.indexed_rows:
+            return None
+        result = set()
+        for col in columns:
+            index = self._columns.get(col)
+            rows = index.rows_containing(needle) if index is not None else None
+            if rows is None:
+                return None
+            result |= rows
+        # Копия: правки из GUI-потока могут менять множество во время поиска
+        dirty = set(self.dirty)
+        result -= dirty
+        # Изменённые после построения и догруженные строки проверяем напрямую
+        for row in dirty:
+            if any(needle in store.cell(row, col).lower() for col in columns):
+                result.add(row)
+        if store.row_count() > self.indexed_rows:
+            result |= scan_rows(store, needle, columns, self.indexed_rows)
+        return result
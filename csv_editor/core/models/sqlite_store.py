@@ -0,0 +1,334 @@
+import csv
+import sqlite3
+import time
+from collections import OrderedDict
+from .column_types import INT, FLOAT, TEXT
+
+# Строк в одной странице, подгружаемой одним запросом
+PAGE_ROWS = 512
+# Сколько страниц держать в памяти (LRU)
+PAGE_CACHE = 64
+# Правки пишутся в базу одной транзакцией, когда их накопится столько
+# или когда с первой неотправленной правки пройдёт WRITE_DELAY секунд
+# (по таймеру модели, см. write_delay, или при следующей правке)
+WRITE_BATCH = 1000
+WRITE_DELAY = 2.0
+# Временная таблица с порядком строк при сортировке или фильтре
+VIEW_TABLE = "temp.csv_editor_view"
+# Сколько значений столбца без объявленного типа смотреть, чтобы решить,
+# числовой ли он
+KIND_SAMPLE = 1000
+
+
+def quote_name(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def affinity_kind(declared):
+    """Тип столбца по объявленному типу SQLite (правила affinity): INT в имени
+    — целые, REAL/FLOA/DOUB — дробные, CHAR/CLOB/TEXT/BLOB — текст, прочие
+    (NUMERIC, DECIMAL, ...) — числа. None для столбца без типа."""
+    declared = declared.upper()
+    if "INT" in declared:
+        return INT
+    if any(part in declared for part in ("CHAR", "CLOB", "TEXT", "BLOB")):
+        return TEXT
+    if not declared:
+        return None
+    return FLOAT
+
+
+def _to_text(value):
+    return "" if value is None else value if value.__class__ is str else str(value)
+
+
+class SqliteStore:
+    """Хранилище поверх таблицы SQLite без копирования её в память.
+
+    Строки читаются страницами по PAGE_ROWS: без сортировки и фильтра —
+    по rowid (ключ страницы запоминается, OFFSET нужен только при прыжке
+    в незнакомое место), а при сортировке или фильтре — по позициям во
+    временной таблице, где SQL один раз раскладывает rowid в нужном
+    порядке. Сортировку и фильтр прокси передаёт сюда через set_query
+    (queryable = True). Правки копятся и записываются пакетами в одной
+    транзакции. Вставка и удаление строк и столбцов не поддерживаются.
+    """
+    resizable = False
+    in_memory = False
+    queryable = True
+    write_delay = WRITE_DELAY
+
+    @staticmethod
+    def supports(db_file, table_name):
+        """Можно ли открыть таблицу без копирования: страницы и правки
+        адресуются по rowid, которого нет у WITHOUT ROWID таблиц и представлений"""
+        conn = sqlite3.connect(db_file)
+        try:
+            found = conn.execute(
+                "SELECT type FROM sqlite_master WHERE name = ? COLLATE NOCASE",
+                (table_name,)).fetchone()
+            if found is None:
+                # Пусть __init__ сообщит, что таблицы нет
+                return True
+            if found[0] != 'table':
+                return False
+            try:
+                conn.execute(f"SELECT rowid FROM {quote_name(table_name)} LIMIT 0")
+            except sqlite3.OperationalError:
+                return False
+            return True
+        finally:
+            conn.close()
+
+    def __init__(self, db_file, table_name):
+        self.db_file = db_file
+        self.table_name = table_name
+        self._table = quote_name(table_name)
+        self.conn = sqlite3.connect(db_file)
+        info = self.conn.execute(f"PRAGMA table_info({self._table})").fetchall()
+        if not info:
+            self.conn.close()
+            raise ValueError(f"Table {table_name!r} not found in {db_file}")
+        self._names = [column[1] for column in info]
+        self._kinds = [affinity_kind(column[2]) for column in info]
+        for col, kind in enumerate(self._kinds):
+            if kind is None:
+                self._kinds[col] = self._sample_kind(self._names[col])
+        self.headers = list(self._names)
+        self.conn.create_function("csv_lower", 1, lambda v: _to_text(v).lower(),
+                                  deterministic=True)
+        self.conn.create_function("csv_match", -1, self._match)
+        self.query = (None, False, (), "default")
+        self._row_filter = None
+        self._view = False
+        self._pages = OrderedDict()
+        # Первый rowid страницы (ключ для перехода без OFFSET)
+        self._anchors = {}
+        self._pending = {}
+        self._pending_since = None
+        self._count_rows()
+
+    def _sample_kind(self, name):
+        # Столбец без типа хранит значения как есть: числовой, если среди
+        # первых непустых значений нет текста
+        name = quote_name(name)
+        types = {row[0] for row in self.conn.execute(
+            f"SELECT DISTINCT typeof(v) FROM (SELECT {name} AS v FROM {self._table} "
+            f"WHERE {name} IS NOT NULL AND {name} != '' LIMIT {KIND_SAMPLE})")}
+        if not types or not types <= {'integer', 'real'}:
+            return TEXT
+        return INT if types == {'integer'} else FLOAT
+
+    def _count_rows(self):
+        if self._view:
+            self._row_count = self.conn.execute(
+                f"SELECT count(*) FROM {VIEW_TABLE}").fetchone()[0]
+            return
+        self._row_count, first, last = self.conn.execute(
+            f"SELECT count(*), min(rowid), max(rowid) FROM {self._table}").fetchone()
+        if self._row_count and last - first + 1 == self._row_count:
+            # rowid без пропусков: ключ любой страницы вычисляется сразу
+            self._dense_start = first
+        else:
+            self._dense_start = None
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+    def row_count(self):
+        return self._row_count
+
+    def column_count(self):
+        return len(self._names)
+
+    def column_kind(self, col):
+        return self._kinds[col]
+
+    def sort_keys(self, col):
+        return None
+
+    # --- Страницы ---
+
+    def _page(self, number):
+        page = self._pages.get(number)
+        if page is not None:
+            self._pages.move_to_end(number)
+            return page
+        start = number * PAGE_ROWS
+        if self._view:
+            cursor = self.conn.execute(
+                f"SELECT t.rowid, t.* FROM {VIEW_TABLE} v JOIN {self._table} t "
+                f"ON t.rowid = v.src WHERE v.pos > ? AND v.pos <= ? ORDER BY v.pos",
+                (start, start + PAGE_ROWS))
+        else:
+            anchor = self._anchors.get(number)
+            if anchor is None and self._dense_start is not None:
+                anchor = self._dense_start + start
+            if anchor is not None:
+                cursor = self.conn.execute(
+                    f"SELECT rowid, * FROM {self._table} WHERE rowid >= ? "
+                    f"ORDER BY rowid LIMIT ?", (anchor, PAGE_ROWS))
+            else:
+                cursor = self.conn.execute(
+                    f"SELECT rowid, * FROM {self._table} ORDER BY rowid LIMIT ? OFFSET ?",
+                    (PAGE_ROWS, start))
+        rowids, rows = [], []
+        for record in cursor:
+            rowids.append(record[0])
+            rows.append([_to_text(v) for v in record[1:]])
+        if rowids and not self._view:
+            self._anchors[number] = rowids[0]
+            self._anchors[number + 1] = rowids[-1] + 1
+        for rowid, row in zip(rowids, rows):
+            # Ещё не записанные правки поверх прочитанного
+            for col, value in self._pending.get(rowid, {}).items():
+                row[col] = value
+        page = (rowids, rows)
+        self._pages[number] = page
+        if len(self._pages) > PAGE_CACHE:
+            self._pages.popitem(last=False)
+        return page
+
+    def row(self, row):
+        return list(self._page(row // PAGE_ROWS)[1][row % PAGE_ROWS])
+
+    def cell(self, row, col):
+        return self._page(row // PAGE_ROWS)[1][row % PAGE_ROWS][col]
+
+    def column(self, col):
+        return [values[col] for values in self.rows()]
+
+    def rows(self, start=0, stop=None):
+        """Последовательно читает строки в текущем порядке"""
+        self.flush()
+        stop = self._row_count if stop is None else min(stop, self._row_count)
+        if start >= stop:
+            return
+        if self._view:
+            cursor = self.conn.cursor().execute(
+                f"SELECT t.* FROM {VIEW_TABLE} v JOIN {self._table} t "
+                f"ON t.rowid = v.src WHERE v.pos > ? AND v.pos <= ? ORDER BY v.pos",
+                (start, stop))
+        else:
+            cursor = self.conn.cursor().execute(
+                f"SELECT * FROM {self._table} ORDER BY rowid LIMIT ? OFFSET ?",
+                (stop - start, start))
+        for record in cursor:
+            yield [_to_text(v) for v in record]
+
+    # --- Правки ---
+
+    def set_cell(self, row, col, value):
+        value = _to_text(value)
+        rowids, rows = self._page(row // PAGE_ROWS)
+        rows[row % PAGE_ROWS][col] = value
+        self._pending.setdefault(rowids[row % PAGE_ROWS], {})[col] = value
+        now = time.monotonic()
+        if self._pending_since is None:
+            self._pending_since = now
+        if len(self._pending) >= WRITE_BATCH or now - self._pending_since >= WRITE_DELAY:
+            self.flush()
+
+    def set_cells(self, col, rows, values):
+        for row, value in zip(rows, values):
+            self.set_cell(row, col, value)
+
+    def flush(self):
+        """Записывает накопленные правки одной транзакцией"""
+        if not self._pending:
+            return
+        by_column = {}
+        for rowid, cells in self._pending.items():
+            for col, value in cells.items():
+                # Пустая ячейка числового столбца — NULL
+                if not value and self._kinds[col] != TEXT:
+                    value = None
+                by_column.setdefault(col, []).append((value, rowid))
+        with self.conn:
+            for col, params in by_column.items():
+                self.conn.executemany(
+                    f"UPDATE {self._table} SET {quote_name(self._names[col])} = ? "
+                    f"WHERE rowid = ?", params)
+        self._pending.clear()
+        self._pending_since = None
+
+    def save(self, filename, delimiter=',', headers=None):
+        """Выгружает таблицу (в текущем порядке) в CSV"""
+        with open(filename, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f, delimiter=delimiter)
+            if headers is not None:
+                writer.writerow(headers)
+            writer.writerows(self.rows())
+
+    # --- Сортировка и фильтр на стороне SQL ---
+
+    def set_query(self, row_filter=None, invert=False, order=(), sort_mode="default"):
+        """Перестраивает порядок строк.
+
+        row_filter — условия фильтра (объект со свойствами words, use_and,
+        columns и методом row_matches, см. FilterQuery) или None; invert —
+        оставить строки, которые фильтр не принимает; order — список
+        (столбец, по убыванию); sort_mode — как у прокси.
+        """
+        self.flush()
+        self.query = (row_filter, invert, tuple(order), sort_mode)
+        self._row_filter = row_filter
+        self._pages.clear()
+        self.conn.execute(f"DROP TABLE IF EXISTS {VIEW_TABLE}")
+        where, params = self._where(row_filter, invert)
+        self._view = bool(where or order)
+        if self._view:
+            order_by = ", ".join(self._order_terms(order, sort_mode) + ["rowid"])
+            self.conn.execute(f"CREATE TABLE {VIEW_TABLE} (pos INTEGER PRIMARY KEY, src INTEGER)")
+            with self.conn:
+                self.conn.execute(
+                    f"INSERT INTO {VIEW_TABLE} (src) SELECT rowid FROM {self._table} "
+                    f"{where} ORDER BY {order_by}", params)
+        self._count_rows()
+
+    def _where(self, row_filter, invert):
+        if row_filter is None:
+            return "", []
+        columns = [quote_name(self._names[c]) for c in row_filter.columns
+                   if c < len(self._names)]
+        if not columns:
+            return ("", []) if invert else ("WHERE 0", [])
+        words = row_filter.words
+        if words and all(w.isascii() and ' ' not in w for w in words):
+            # Слова без пробелов: LIKE по каждому столбцу целиком в SQL
+            params = []
+            terms = []
+            for word in words:
+                pattern = "%" + word.replace("\\", "\\\\").replace("%", "\\%") \
+                    .replace("_", "\\_") + "%"
+                terms.append("(" + " OR ".join(f"{c} LIKE ? ESCAPE '\\'" for c in columns) + ")")
+                params.extend([pattern] * len(columns))
+            condition = (" AND " if row_filter.use_and else " OR ").join(terms)
+        else:
+            # Регулярное выражение и прочие случаи — та же проверка, что в прокси
+            condition = f"csv_match({', '.join(columns)})"
+            params = []
+        if invert:
+            return f"WHERE NOT coalesce(({condition}), 0)", params
+        return f"WHERE {condition}", params
+
+    def _match(self, *values):
+        return bool(self._row_filter.row_matches([_to_text(v) for v in values]))
+
+    def _order_terms(self, order, sort_mode):
+        terms = []
+        for col, descending in order:
+            name = quote_name(self._names[col])
+            direction = " DESC" if descending else ""
+            if sort_mode == "length":
+                terms.append(f"length(coalesce({name}, '')){direction}")
+            elif sort_mode == "alphabetical":
+                terms.append(f"csv_lower({name}){direction}")
+            elif sort_mode == "default" and self._kinds[col] != TEXT:
+                # Пустые ячейки числового столбца — в конце при любом порядке
+                terms.append(f"{name} IS NULL")
+                terms.append(f"{name}{direction}")
+            else:
+                terms.append(f"CAST({name} AS TEXT){direction}")
+        return terms
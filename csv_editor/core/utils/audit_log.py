@@ -1,18 +1,153 @@
+import atexit
 import json
-from datetime import datetime
+import os
+import sqlite3
+import sys
+import threading
+from datetime import datetime, timedelta
 from pathlib import Path
 
+# Ротация: текущий файл закрывается, когда превысит размер или возраст
+MAX_BYTES = 10 * 1024 * 1024
+MAX_AGE_DAYS = 30
+BACKUP_COUNT = 5
+# Буфер записей сбрасывается на диск раз в столько секунд или при заполнении
+FLUSH_INTERVAL = 1.0
+FLUSH_ENTRIES = 100
+# Сегмент индекса для текущего (ещё не ротированного) файла
+CURRENT_SEGMENT = 0
+
+
 class AuditLogger:
-    def __init__(self, log_file="audit.log"):
+    """Журнал действий пользователя в формате JSON-строк.
+
+    Записи копятся в буфере и дописываются в конец файла фоновым потоком,
+    поэтому log() не зависит от размера журнала. Старые файлы ротируются
+    в audit.log.1, audit.log.2, ... (номер растёт, старейшие удаляются).
+    Необязательный индекс SQLite хранит время, действие и смещение каждой
+    записи, и get_logs читает с диска только подходящие строки.
+    """
+    def __init__(self, log_file="audit.log", use_index=True, max_bytes=MAX_BYTES,
+                 max_age_days=MAX_AGE_DAYS, backup_count=BACKUP_COUNT,
+                 flush_interval=FLUSH_INTERVAL):
         self.log_file = Path(log_file)
-        self.entries = []
-        
+        self.max_bytes = max_bytes
+        self.max_age = timedelta(days=max_age_days)
+        self.backup_count = backup_count
+        self.flush_interval = flush_interval
+        self._buffer = []
+        self._lock = threading.RLock()
+        self._started = None
+
         if self.log_file.exists():
-            self._load_entries()
+            self._migrate()
+            self._started = self._first_timestamp(self.log_file)
+        self._index = self._open_index() if use_index else None
+
+        self._wake = threading.Event()
+        self._closed = False
+        # Последняя запись на диск не удалась (сообщение — одно на серию ошибок)
+        self._failing = False
+        self._thread = threading.Thread(target=self._flush_loop, name="audit-log", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    # --- Файлы ---
+
+    def _segment_path(self, segment):
+        return self.log_file.with_name(f"{self.log_file.name}.{segment}")
 
-    def _load_entries(self):
+    def _segments(self):
+        # Номера ротированных файлов по возрастанию (от старых к новым)
+        prefix = self.log_file.name + "."
+        segments = []
+        for path in self.log_file.parent.glob(prefix + "*"):
+            suffix = path.name[len(prefix):]
+            if suffix.isdigit():
+                segments.append(int(suffix))
+        return sorted(segments)
+
+    def _path_for(self, segment):
+        return self.log_file if segment == CURRENT_SEGMENT else self._segment_path(segment)
+
+    def _migrate(self):
+        # Старый формат — JSON-массив целиком; переводим в JSON-строки
+        with open(self.log_file, 'r', encoding='utf-8') as f:
+            head = f.read(64).lstrip()
+        if not head.startswith('['):
+            return
         with open(self.log_file, 'r', encoding='utf-8') as f:
-            self.entries = json.load(f)
+            entries = json.load(f)
+        tmp = self.log_file.with_name(self.log_file.name + ".tmp")
+        with open(tmp, 'w', encoding='utf-8', newline='\n') as f:
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        os.replace(tmp, self.log_file)
+
+    def _first_timestamp(self, path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.loads(f.readline())['timestamp']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _read_lines(self, path, start=0):
+        # Итератор по (смещение, запись) начиная с байта start
+        with open(path, 'rb') as f:
+            f.seek(start)
+            offset = start
+            for line in f:
+                if line.strip():
+                    try:
+                        yield offset, json.loads(line)
+                    except ValueError:
+                        pass
+                offset += len(line)
+
+    # --- Индекс ---
+
+    def _open_index(self):
+        path = self.log_file.with_name(self.log_file.name + ".idx")
+        created = not path.exists()
+        try:
+            index = sqlite3.connect(str(path), check_same_thread=False)
+            index.executescript("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    timestamp TEXT, action TEXT, segment INTEGER, offset INTEGER);
+                CREATE INDEX IF NOT EXISTS entries_action ON entries(action, timestamp);
+                CREATE INDEX IF NOT EXISTS entries_time ON entries(timestamp);
+                CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER);
+            """)
+        except sqlite3.Error as e:
+            print(f"Audit log index disabled: {e}", file=sys.stderr)
+            return None
+        with index:
+            if created:
+                for segment in self._segments():
+                    self._index_file(index, segment, 0)
+            # Дописываем в индекс то, что попало в файл после последней индексации
+            row = index.execute("SELECT value FROM meta WHERE key = 'indexed_bytes'").fetchone()
+            indexed = row[0] if row else 0
+            size = self.log_file.stat().st_size if self.log_file.exists() else 0
+            if indexed > size:
+                index.execute("DELETE FROM entries WHERE segment = ?", (CURRENT_SEGMENT,))
+                indexed = 0
+            if self.log_file.exists() and indexed < size:
+                self._index_file(index, CURRENT_SEGMENT, indexed)
+            self._set_indexed_bytes(index, size)
+        return index
+
+    def _index_file(self, index, segment, start):
+        index.executemany(
+            "INSERT INTO entries VALUES (?, ?, ?, ?)",
+            ((entry.get('timestamp'), entry.get('action'), segment, offset)
+             for offset, entry in self._read_lines(self._path_for(segment), start))
+        )
+
+    def _set_indexed_bytes(self, index, size):
+        index.execute("INSERT OR REPLACE INTO meta VALUES ('indexed_bytes', ?)", (size,))
+
+    # --- Запись ---
 
     def log(self, action, details=None):
         entry = {
@@ -20,14 +155,159 @@ class AuditLogger:
             'action': action,
             'details': details or {}
         }
-        self.entries.append(entry)
-        self._save()
+        with self._lock:
+            self._buffer.append(entry)
+            if len(self._buffer) >= FLUSH_ENTRIES:
+                self._wake.set()
+
+    def _flush_loop(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self._try_flush()
+
+    def _try_flush(self):
+        # Ошибка диска не останавливает фоновый поток: записи остаются
+        # в буфере до следующей попытки
+        try:
+            self.flush()
+        except (OSError, sqlite3.Error) as e:
+            if not self._failing:
+                print(f"Audit log write failed: {e}", file=sys.stderr)
+            self._failing = True
+        else:
+            self._failing = False
+
+    def flush(self):
+        """Дописывает буфер в файл (и в индекс)"""
+        with self._lock:
+            entries, self._buffer = self._buffer, []
+            if not entries:
+                return
+            data = [json.dumps(e, ensure_ascii=False).encode('utf-8') + b'\n' for e in entries]
+            try:
+                if self._should_rotate(sum(map(len, data))):
+                    self._rotate()
+                with open(self.log_file, 'ab') as f:
+                    offset = f.tell()
+                    f.write(b''.join(data))
+                    size = f.tell()
+            except OSError:
+                self._buffer[:0] = entries
+                raise
+            if self._started is None:
+                self._started = entries[0]['timestamp']
+            if self._index is not None:
+                offsets = []
+                for line in data:
+                    offsets.append(offset)
+                    offset += len(line)
+                with self._index:
+                    self._index.executemany(
+                        "INSERT INTO entries VALUES (?, ?, ?, ?)",
+                        ((e['timestamp'], e['action'], CURRENT_SEGMENT, o)
+                         for e, o in zip(entries, offsets))
+                    )
+                    self._set_indexed_bytes(self._index, size)
+
+    def _should_rotate(self, incoming):
+        if not self.log_file.exists():
+            return False
+        size = self.log_file.stat().st_size
+        if size and size + incoming > self.max_bytes:
+            return True
+        if self._started:
+            try:
+                started = datetime.fromisoformat(self._started)
+            except ValueError:
+                return False
+            return datetime.now() - started > self.max_age
+        return False
+
+    def _rotate(self):
+        segments = self._segments()
+        segment = (segments[-1] if segments else 0) + 1
+        os.replace(self.log_file, self._segment_path(segment))
+        segments.append(segment)
+        expired = segments[:-self.backup_count] if self.backup_count else segments
+        for old in expired:
+            try:
+                self._segment_path(old).unlink()
+            except FileNotFoundError:
+                pass
+        if self._index is not None:
+            with self._index:
+                self._index.execute("UPDATE entries SET segment = ? WHERE segment = ?",
+                                    (segment, CURRENT_SEGMENT))
+                self._index.executemany("DELETE FROM entries WHERE segment = ?",
+                                        [(old,) for old in expired])
+                self._set_indexed_bytes(self._index, 0)
+        self._started = None
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._thread.join()
+        self._try_flush()
+        if self._index is not None:
+            self._index.close()
+            self._index = None
+
+    # --- Чтение ---
+
+    def get_logs(self, filter_action=None, since=None, until=None):
+        """Записи журнала (по возрастанию времени).
+
+        filter_action — только это действие; since/until — границы времени
+        (datetime или строка ISO), включительно.
+        """
+        since = since.isoformat() if isinstance(since, datetime) else since
+        until = until.isoformat() if isinstance(until, datetime) else until
+        with self._lock:
+            self.flush()
+            if self._index is not None:
+                return self._query_index(filter_action, since, until)
+            return [entry for entry in self._scan()
+                    if (not filter_action or entry.get('action') == filter_action)
+                    and (since is None or entry.get('timestamp', '') >= since)
+                    and (until is None or entry.get('timestamp', '') <= until)]
 
-    def _save(self):
-        with open(self.log_file, 'w', encoding='utf-8') as f:
-            json.dump(self.entries, f, indent=2)
+    def _scan(self):
+        for segment in self._segments() + [CURRENT_SEGMENT]:
+            path = self._path_for(segment)
+            if path.exists():
+                for _, entry in self._read_lines(path):
+                    yield entry
 
-    def get_logs(self, filter_action=None):
+    def _query_index(self, filter_action, since, until):
+        conditions, params = [], []
         if filter_action:
-            return [e for e in self.entries if e['action'] == filter_action]
-        return self.entries
+            conditions.append("action = ?")
+            params.append(filter_action)
+        if since is not None:
+            conditions.append("timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("timestamp <= ?")
+            params.append(until)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        # Текущий файл (сегмент 0) — самый новый
+        rows = self._index.execute(
+            f"SELECT segment, offset FROM entries {where} "
+            f"ORDER BY segment = {CURRENT_SEGMENT}, segment, offset", params
+        ).fetchall()
+        entries = []
+        handles = {}
+        try:
+            for segment, offset in rows:
+                f = handles.get(segment)
+                if f is None:
+                    f = handles[segment] = open(self._path_for(segment), 'rb')
+                f.seek(offset)
+                entries.append(json.loads(f.readline()))
+        finally:
+            for f in handles.values():
+                f.close()
+        return entries
@@ -1,29 +1,32 @@
-from openpyxl import Workbook
-from PyQt5.QtWidgets import QMessageBox
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import QThread, pyqtSignal
+from .excel_writer import write_excel, store_snapshot
+
+
+class ExcelExportWorker(QThread):
+    """Экспорт в Excel в фоновом потоке (по снимку хранилища в памяти)"""
+    progress = pyqtSignal(int, int)
+    failed = pyqtSignal(str)
+
+    def __init__(self, store, filename, parent=None):
+        super().__init__(parent)
+        self.filename = filename
+        self.total = store.row_count()
+        self.headers, self.rows, self.kinds = store_snapshot(store)
+        self.completed = False
+
+    def run(self):
+        try:
+            self.completed = write_excel(self.filename, self.headers, self.rows, self.kinds,
+                                         self.total, self.progress.emit,
+                                         self.isInterruptionRequested)
+        except Exception as e:
+            self.failed.emit(str(e))
+
 
 class ExcelExporter:
     def __init__(self, model):
         self.model = model
 
     def export(self, filename):
-        try:
-            wb = Workbook()
-            ws = wb.active
-            
-            # Заголовки
-            for col in range(self.model.columnCount()):
-                ws.cell(row=1, column=col+1, 
-                       value=self.model.headerData(col, Qt.Horizontal))
-            
-            # Данные
-            for row in range(self.model.rowCount()):
-                for col in range(self.model.columnCount()):
-                    ws.cell(row=row+2, column=col+1, 
-                           value=self.model.data(self.model.index(row, col)))
-            
-            wb.save(filename)
-            return True
-        except Exception as e:
-            QMessageBox.critical(None, "Excel Export Error", str(e))
-            return False
+        headers, rows, kinds = store_snapshot(self.model.store)
+        return write_excel(filename, headers, rows, kinds)
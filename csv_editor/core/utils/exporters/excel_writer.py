@@ -0,0 +1,85 @@
+from math import isfinite
+from csv_editor.core.models.column_types import INT, FLOAT
+from csv_editor.core.utils.perf import span
+
+# progress вызывается раз в столько строк
+PROGRESS_EVERY = 10000
+
+
+def _to_int(value):
+    if not value:
+        return None
+    try:
+        number = int(value)
+    except ValueError:
+        return value
+    # "007" и "+5" остаются текстом, чтобы не потерять запись значения
+    return number if str(number) == value else value
+
+
+def _to_float(value):
+    if not value:
+        return None
+    try:
+        number = float(value)
+    except ValueError:
+        return value
+    if not isfinite(number):
+        # "nan" и "inf" ячейка Excel числом не хранит
+        return value
+    if str(number) == value:
+        return number
+    # Целое ("2") пишется числом, "1.50" и "1e3" — текстом, как у _to_int
+    return _to_int(value)
+
+
+CONVERTERS = {INT: _to_int, FLOAT: _to_float}
+
+
+def write_excel(filename, headers, rows, kinds=None, total=None, progress=None, cancelled=None):
+    """Пишет строки в книгу в режиме write_only: строки добавляются целиком
+    и сразу сбрасываются в файл, без дерева ячеек в памяти.
+
+    kinds — типы столбцов: числовые пишутся числами, остальные текстом.
+    progress(записано, total) вызывается раз в PROGRESS_EVERY строк;
+    cancelled() прерывает запись, тогда возвращается False.
+    """
+    # openpyxl нужен только при экспорте (см. excel_reader)
+    from openpyxl import Workbook
+    with span("export_excel") as s:
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet()
+        ws.append(headers)
+        converters = [CONVERTERS.get(kind) for kind in (kinds or [])]
+        convert = any(converters)
+        number = 0
+        for number, values in enumerate(rows, 1):
+            if convert:
+                values = [converter(value) if converter else value
+                          for converter, value in zip(converters, values)]
+            ws.append(values)
+            if not number % PROGRESS_EVERY:
+                if cancelled is not None and cancelled():
+                    return False
+                if progress is not None:
+                    progress(number, total or number)
+        s.add(rows=number)
+        wb.save(filename)
+        return True
+
+
+def store_snapshot(store):
+    """Заголовки, строки и типы хранилища для записи write_excel.
+
+    Хранилище в памяти копируется по столбцам (копии списков, а не строк),
+    чтобы запись в другом потоке не видела правок; остальные читаются
+    потоком через rows().
+    """
+    headers = list(store.headers)
+    kinds = [store.column_kind(col) for col in range(store.column_count())]
+    if store.in_memory:
+        columns = [list(store.column(col)) for col in range(store.column_count())]
+        rows = zip(*columns)
+    else:
+        rows = store.rows()
+    return headers, rows, kinds
@@ -1,40 +1,122 @@
 import sqlite3
-from PyQt5.QtWidgets import QMessageBox
-from PyQt5.QtCore import Qt
+from itertools import islice
+from csv_editor.core.models.column_types import INT, FLOAT, TEXT
+from csv_editor.core.models.sqlite_store import quote_name
+from csv_editor.core.utils.perf import span
+
+# Тип столбца хранилища -> тип (affinity) столбца SQLite; даты остаются
+# текстом в исходном формате
+AFFINITIES = {INT: "INTEGER", FLOAT: "REAL"}
+# Сколько строк отдаётся в executemany за раз (между вызовами progress)
+INSERT_CHUNK = 50000
+# Настройки соединения на время загрузки: журнал в памяти, без fsync,
+# кэш страниц ~200 МБ (отрицательное значение — в килобайтах)
+LOAD_PRAGMAS = (
+    "PRAGMA journal_mode = MEMORY",
+    "PRAGMA synchronous = OFF",
+    "PRAGMA cache_size = -200000",
+    "PRAGMA temp_store = MEMORY",
+)
+
+
+def _round_trips(kind, value):
+    # Вернёт ли SQLite значение тем же текстом: "007" и "+5" в столбце
+    # INTEGER стали бы 7 и 5, а "1.50", "1e3" и "2" в столбце REAL —
+    # 1.5, 1000.0 и 2.0. Нечисловой текст хранится как есть.
+    try:
+        number = int(value) if kind == INT else float(value)
+    except ValueError:
+        return True
+    return str(number) == value
+
+
+def export_store(store, db_file, table_name, index_columns=None, progress=None):
+    """Записывает хранилище таблицы в базу SQLite одной транзакцией.
+
+    Таблица table_name пересоздаётся; типы столбцов берутся из типов,
+    определённых при загрузке. index_columns — имена или номера столбцов,
+    по которым после загрузки строятся индексы. progress(записано, всего)
+    вызывается после каждой пачки строк. Возвращает число строк.
+    """
+    width = store.column_count()
+    kinds = [store.column_kind(col) for col in range(width)]
+    if store.in_memory:
+        columns = []
+        for col in range(width):
+            column = store.column(col)
+            if kinds[col] in AFFINITIES and \
+                    not all(_round_trips(kinds[col], value) for value in column if value):
+                # Столбец пишется текстом, чтобы не потерять запись значений
+                kinds[col] = TEXT
+            if kinds[col] in AFFINITIES and "" in column:
+                # Пустая ячейка числового столбца — NULL, а не пустая строка
+                column = [value or None for value in column]
+            columns.append(column)
+        rows = zip(*columns)
+    else:
+        rows = store.rows()
+    return write_table(db_file, table_name, store.headers, rows, kinds, index_columns,
+                       progress, store.row_count())
+
+
+def write_table(db_file, table_name, headers, rows, kinds=None, index_columns=None,
+                progress=None, total=None):
+    """Записывает поток строк в таблицу SQLite (см. export_store).
+
+    Строки читаются пачками по INSERT_CHUNK, поэтому поток любой длины
+    пишется в постоянной памяти. Без kinds все столбцы текстовые.
+    """
+    headers = [header or f"col_{col}" for col, header in enumerate(headers)]
+    width = len(headers)
+    kinds = kinds or [None] * width
+    table = quote_name(table_name)
+    indexed = []
+    for column in index_columns or ():
+        col = column if isinstance(column, int) else \
+            headers.index(column) if column in headers else -1
+        if not 0 <= col < width:
+            raise ValueError(f"Unknown column for index: {column!r}")
+        indexed.append(headers[col])
+    rows = iter(rows)
+
+    with span("export_sqlite") as s:
+        conn = sqlite3.connect(db_file)
+        try:
+            for pragma in LOAD_PRAGMAS:
+                conn.execute(pragma)
+            definitions = ", ".join(f"{quote_name(header)} {AFFINITIES.get(kind, 'TEXT')}"
+                                    for header, kind in zip(headers, kinds))
+            insert = f"INSERT INTO {table} VALUES ({', '.join(['?'] * width)})"
+            with conn:
+                conn.execute(f"DROP TABLE IF EXISTS {table}")
+                conn.execute(f"CREATE TABLE {table} ({definitions})")
+                written = 0
+                while total is None or written < total:
+                    chunk = list(islice(rows, INSERT_CHUNK))
+                    if not chunk:
+                        break
+                    if any(len(values) != width for values in chunk):
+                        chunk = [(list(values) + [""] * width)[:width] for values in chunk]
+                    conn.executemany(insert, chunk)
+                    written += len(chunk)
+                    if progress is not None:
+                        progress(written, total or written)
+                # Индексы строятся по готовым данным: это быстрее, чем
+                # обновлять их при каждой вставке
+                for header in indexed:
+                    index_name = quote_name(f"{table_name}_{header}_idx")
+                    conn.execute(f"CREATE INDEX {index_name} ON {table} ({quote_name(header)})")
+            s.add(rows=written)
+            return written
+        finally:
+            conn.close()
+
 
 class SQLiteExporter:
     def __init__(self, model):
         self.model = model
 
-    def export(self, db_file, table_name):
-        try:
-            conn = sqlite3.connect(db_file)
-            cursor = conn.cursor()
-            
-            # Создаем таблицу
-            columns = [self.model.headerData(col, Qt.Horizontal) or f"col_{col}" 
-                      for col in range(self.model.columnCount())]
-            
-            # Экранируем имена столбцов
-            safe_columns = [f'"{col}" TEXT' for col in columns]
-            create_sql = f"CREATE TABLE IF NOT EXISTS {table_name} ({', '.join(safe_columns)})"
-            cursor.execute(create_sql)
-            
-            # Очищаем существующие данные
-            cursor.execute(f"DELETE FROM {table_name}")
-            
-            # Вставляем данные
-            for row in range(self.model.rowCount()):
-                values = [self.model.data(self.model.index(row, col)) 
-                         for col in range(self.model.columnCount())]
-                placeholders = ", ".join(["?"] * len(values))
-                cursor.execute(f"INSERT INTO {table_name} VALUES ({placeholders})", values)
-            
-            conn.commit()
-            return True
-        except Exception as e:
-            QMessageBox.critical(None, "SQLite Export Error", str(e))
-            return False
-        finally:
-            if 'conn' in locals():
-                conn.close()
+    def export(self, db_file, table_name, index_columns=None, progress=None):
+        """Пишет таблицу модели в SQLite; ошибки передаются вызывающему"""
+        export_store(self.model.store, db_file, table_name, index_columns, progress)
+        return True
@@ -0,0 +1,117 @@
+import csv
+import io
+import os
+import queue
+from itertools import islice
+from PyQt5.QtCore import QThread, pyqtSignal
+from csv_editor.core.utils.perf import span
+from .parallel_csv import parse_csv_parallel
+
+# Первая пачка маленькая, чтобы первый экран появился сразу
+FIRST_CHUNK_ROWS = 500
+CHUNK_ROWS = 20000
+# Сколько разобранных пачек может ждать GUI-поток; разбор не убегает
+# вперёд отображения и не держит в памяти вторую копию файла
+MAX_PENDING_CHUNKS = 4
+
+
+class CsvChunkLoader(QThread):
+    """Разбирает CSV в фоновом потоке и складывает строки пачками в очередь.
+
+    GUI-поток забирает пачки через take_chunk() (модель делает это
+    в fetchMore); прерывание (cancel) проверяется между пачками.
+    """
+    progress = pyqtSignal(int, int)  # прочитано байт, размер файла
+    failed = pyqtSignal(str)
+
+    def __init__(self, filename, delimiter=',', chunk_rows=CHUNK_ROWS, parent=None):
+        super().__init__(parent)
+        self.filename = filename
+        self.delimiter = delimiter
+        self.chunk_rows = chunk_rows
+        self.rows_loaded = 0
+        # Текст ошибки, если разбор оборвался
+        self.error = None
+        # Готовое хранилище, если загрузчик разбирает файл целиком
+        # (ParallelCsvLoader), а не отдаёт пачки строк
+        self.store = None
+        self._cancelled = False
+        self._chunks = queue.Queue(MAX_PENDING_CHUNKS)
+
+    def cancel(self):
+        self._cancelled = True
+        self.requestInterruption()
+        self.discard_chunks()
+
+    def was_cancelled(self):
+        # isInterruptionRequested() сбрасывается после завершения потока
+        return self._cancelled
+
+    def has_chunks(self):
+        return not self._chunks.empty()
+
+    def take_chunk(self):
+        try:
+            return self._chunks.get_nowait()
+        except queue.Empty:
+            return None
+
+    def discard_chunks(self):
+        while self.take_chunk() is not None:
+            pass
+
+    def run(self):
+        try:
+            total = os.path.getsize(self.filename)
+            with span("load_csv_background") as s, open(self.filename, 'rb') as raw:
+                text = io.TextIOWrapper(raw, encoding='utf-8', newline='')
+                reader = csv.reader(text, delimiter=self.delimiter)
+                size = FIRST_CHUNK_ROWS
+                while not self.isInterruptionRequested():
+                    chunk = list(islice(reader, size))
+                    if not chunk or not self._put(chunk):
+                        break
+                    self.rows_loaded += len(chunk)
+                    self.progress.emit(raw.tell(), total)
+                    size = self.chunk_rows
+                s.add(rows=self.rows_loaded, bytes=raw.tell())
+        except Exception as e:
+            self.error = str(e)
+            self.failed.emit(self.error)
+
+    def _put(self, chunk):
+        # Ждём места в очереди, но продолжаем реагировать на отмену
+        while not self.isInterruptionRequested():
+            try:
+                self._chunks.put(chunk, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+
+class ParallelCsvLoader(CsvChunkLoader):
+    """Разбирает большой CSV в пуле процессов (parse_csv_parallel).
+
+    Пачек в очереди нет: после завершения потока GUI-поток забирает
+    готовое хранилище из store. Прогресс и отмена — между склеенными
+    диапазонами файла; при отмене в store остаются уже склеенные строки.
+    """
+    def __init__(self, filename, delimiter=',', workers=None, parent=None):
+        super().__init__(filename, delimiter, parent=parent)
+        self.workers = workers
+
+    def run(self):
+        try:
+            with span("load_csv_parallel", bytes=os.path.getsize(self.filename)) as s:
+                store = parse_csv_parallel(self.filename, self.delimiter, self.workers,
+                                           self._on_progress, self.isInterruptionRequested)
+                s.add(rows=store.row_count())
+            self.rows_loaded = store.row_count()
+            self.store = store
+        except Exception as e:
+            self.error = str(e)
+            self.failed.emit(self.error)
+
+    def _on_progress(self, done, total):
+        self.progress.emit(done, total)
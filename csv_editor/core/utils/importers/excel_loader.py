@@ -0,0 +1,36 @@
+from itertools import islice
+from .csv_loader import CsvChunkLoader, CHUNK_ROWS, FIRST_CHUNK_ROWS
+from .excel_reader import iter_sheet_rows
+from csv_editor.core.utils.perf import span
+
+
+class ExcelChunkLoader(CsvChunkLoader):
+    """Читает лист Excel в фоновом потоке пачками строк.
+
+    Та же очередь пачек, что у CsvChunkLoader; книга открывается
+    в режиме read_only, поэтому в памяти нет дерева ячеек всего листа.
+    progress получает (прочитано строк, строк на листе по его размерам).
+    """
+    def __init__(self, filename, sheet=None, chunk_rows=CHUNK_ROWS, parent=None):
+        super().__init__(filename, chunk_rows=chunk_rows, parent=parent)
+        self.sheet = sheet
+
+    def run(self):
+        try:
+            rows, total = iter_sheet_rows(self.filename, self.sheet)
+            size = FIRST_CHUNK_ROWS
+            try:
+                with span("load_excel_background") as s:
+                    while not self.isInterruptionRequested():
+                        chunk = list(islice(rows, size))
+                        if not chunk or not self._put(chunk):
+                            break
+                        self.rows_loaded += len(chunk)
+                        self.progress.emit(self.rows_loaded, max(total or 0, self.rows_loaded))
+                        size = self.chunk_rows
+                    s.add(rows=self.rows_loaded)
+            finally:
+                rows.close()
+        except Exception as e:
+            self.error = str(e)
+            self.failed.emit(self.error)
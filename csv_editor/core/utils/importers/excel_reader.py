@@ -0,0 +1,31 @@
+# openpyxl импортируется при первом обращении к книге: его загрузка
+# заметно удлиняет запуск редактора, а Excel открывают не всегда
+
+
+def sheet_names(filename):
+    """Имена листов книги (книга открывается только для чтения)"""
+    from openpyxl import load_workbook
+    wb = load_workbook(filename, read_only=True)
+    try:
+        return wb.sheetnames
+    finally:
+        wb.close()
+
+
+def iter_sheet_rows(filename, sheet=None):
+    """Строки листа (кортежи значений) потоком из книги в режиме read_only.
+
+    Возвращает (итератор строк, оценка числа строк или None). Книга
+    закрывается, когда итератор исчерпан или удалён.
+    """
+    from openpyxl import load_workbook
+    wb = load_workbook(filename, read_only=True, data_only=True)
+    ws = wb[sheet] if sheet else wb.active
+    total = ws.max_row
+
+    def rows():
+        try:
+            yield from ws.iter_rows(values_only=True)
+        finally:
+            wb.close()
+    return rows(), total
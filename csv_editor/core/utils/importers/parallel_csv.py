@@ -0,0 +1,128 @@
+import csv
+import io
+import mmap
+import os
+from csv_editor.core.models.column_store import ColumnStore
+
+# Файлы меньше этого размера быстрее разобрать в одном процессе
+PARALLEL_MIN_SIZE = 32 * 1024 * 1024
+# Диапазонов больше, чем процессов, чтобы процессы загружались равномерно
+RANGES_PER_WORKER = 4
+MIN_RANGE_SIZE = 1024 * 1024
+COUNT_BLOCK = 16 * 1024 * 1024
+
+
+def _count_quotes(buf, start, end):
+    # У mmap нет count(), поэтому считаем по блокам через срезы
+    return sum(buf[pos:min(pos + COUNT_BLOCK, end)].count(b'"')
+               for pos in range(start, end, COUNT_BLOCK))
+
+
+def split_ranges(buf, parts):
+    """Делит буфер на диапазоны байт по границам строк CSV.
+
+    Граница ставится после перевода строки, перед которым встретилось
+    чётное число кавычек, поэтому поля с переводами строк внутри кавычек
+    не разрезаются. Кавычка внутри поля без кавычек (5" screen) сбивает
+    чётность, поэтому граница лишь предполагаемая: _parse_range проверяет,
+    что диапазон кончается вне кавычек. Возвращает список пар (начало, конец).
+    """
+    size = len(buf)
+    bounds = [0]
+    quotes = 0  # число кавычек в buf[0:bounds[-1]]
+    for part in range(1, parts):
+        start = bounds[-1]
+        pos = size * part // parts
+        if pos <= start:
+            continue
+        quotes += _count_quotes(buf, start, pos)
+        while True:
+            nl = buf.find(b'\n', pos)
+            if nl == -1:
+                pos = size
+                break
+            quotes += _count_quotes(buf, pos, nl)
+            pos = nl + 1
+            if not quotes & 1:
+                break
+        if pos >= size:
+            break
+        bounds.append(pos)
+    bounds.append(size)
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+
+
+def _parse_range(task):
+    # Выполняется в дочернем процессе: разбирает свой диапазон байт
+    # и возвращает готовые столбцы с типами и ключами сортировки
+    # (дубликаты строк внутри диапазона остаются общими объектами)
+    # и признак того, что диапазон кончился на границе записи
+    filename, start, end, delimiter, check = task
+    with open(filename, 'rb') as f:
+        f.seek(start)
+        text = f.read(end - start).decode('utf-8')
+    if check:
+        # Лишняя пустая строка: вне кавычек она даёт пустую запись, а внутри
+        # незакрытого поля становится частью его значения
+        text += '\n'
+    reader = csv.reader(io.StringIO(text, newline=''), delimiter=delimiter)
+    store = ColumnStore.from_rows(reader)
+    clean = True
+    if check:
+        last = store.row_count() - 1
+        clean = last >= 0 and not any(store.row(last))
+        if clean:
+            store.remove_rows(last, 1)
+    return (store.columns, store.row_count(), store.kinds, store.keys), clean
+
+
+def parse_csv_parallel(filename, delimiter=',', workers=None, progress=None, cancelled=None):
+    """Разбирает CSV в пуле процессов и собирает результат в ColumnStore.
+
+    progress(разобрано байт, размер файла) вызывается после каждого
+    склеенного диапазона; если cancelled() вернул True, возвращаются
+    строки, склеенные к этому моменту.
+    """
+    workers = workers or os.cpu_count() or 1
+    size = os.path.getsize(filename)
+    store = ColumnStore()
+    if not size:
+        return store
+
+    parts = max(1, min(workers * RANGES_PER_WORKER, size // MIN_RANGE_SIZE))
+    with open(filename, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            ranges = split_ranges(buf, parts)
+    tasks = [(filename, start, end, delimiter, end < size) for start, end in ranges]
+
+    if workers == 1 or len(tasks) == 1:
+        _merge(store, tasks, map(_parse_range, tasks), progress, cancelled)
+        return store
+
+    # Пул процессов (и multiprocessing) загружается, только когда нужен
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_parse_range, task) for task in tasks]
+        _merge(store, tasks, (future.result() for future in futures), progress, cancelled)
+        # После отмены или разбора остатка целиком ещё не начатые диапазоны не нужны
+        for future in futures:
+            future.cancel()
+    return store
+
+
+def _merge(store, tasks, results, progress=None, cancelled=None):
+    # Диапазоны склеиваются по порядку. Если диапазон кончился внутри поля
+    # в кавычках, следующая граница неверна (и, скорее всего, все дальше:
+    # чётность кавычек сбита), поэтому остаток файла разбирается одним куском
+    size = tasks[-1][2]
+    for (filename, start, end, delimiter, _), (result, clean) in zip(tasks, results):
+        if cancelled is not None and cancelled():
+            return
+        if not clean:
+            result, _ = _parse_range((filename, start, size, delimiter, False))
+            end = size
+        store.append_columns(*result)
+        if progress is not None:
+            progress(end, size)
+        if end == size:
+            return
@@ -0,0 +1,253 @@
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from csv_editor.core.controllers.history import ChangeRecorder, apply_ops
+from csv_editor.core.utils.perf import span
+
+JOURNAL_FILE = "autosave.journal"
+CHECKPOINT_FILE = "autosave.checkpoint"
+# После стольких операций журнал сворачивается в новую контрольную точку
+COMPACT_EVERY = 10000
+# Сколько строк контрольной точки кодируется за раз
+CHECKPOINT_CHUNK = 10000
+# Результат записи контрольной точки, если таблица изменилась во время неё
+STALE = 'stale'
+
+
+class EditJournal:
+    """Журнал правок для автосохранения и восстановления после сбоя.
+
+    Операции (в формате дельт истории, см. apply_ops) дописываются строками
+    JSON в журнал; запись, сброс на диск и контрольные точки выполняет
+    фоновый поток, поэтому интерфейс не ждёт диска. Контрольная точка —
+    полная копия таблицы (тоже JSON-строки) со своим номером поколения;
+    журнал начинается с того же номера и проигрывается только поверх
+    «своей» контрольной точки. Когда стек отмены становится чистым
+    (файл сохранён), журнал удаляется.
+    """
+    def __init__(self, model, undo_stack, journal_path=JOURNAL_FILE,
+                 checkpoint_path=CHECKPOINT_FILE):
+        self.model = model
+        self.undo_stack = undo_stack
+        self.journal_path = journal_path
+        self.checkpoint_path = checkpoint_path
+        # Пока нет контрольной точки, операции писать не к чему
+        self._needs_checkpoint = True
+        self._checkpoint_pending = False
+        self._ops_since_checkpoint = 0
+        # Счётчик структурных изменений: контрольная точка, во время записи
+        # которой сдвинулись строки или столбцы, отбрасывается
+        self._structure_version = 0
+        # Ошибка записи на диск: журнал отключается до следующего запуска
+        self.failed = False
+        self._queue = queue.Queue()
+        self._thread = None
+        self.recorder = ChangeRecorder(model, self._on_op, self._on_reset, self._accept)
+        undo_stack.cleanChanged.connect(self._on_clean_changed)
+
+    # --- Восстановление ---
+
+    def has_recovery(self):
+        return os.path.exists(self.checkpoint_path)
+
+    def recover(self):
+        """Читает контрольную точку и проигрывает поверх неё журнал.
+
+        Возвращает образ таблицы (см. apply_ops) или None, если контрольная
+        точка повреждена.
+        """
+        try:
+            with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+                meta = json.loads(f.readline())
+                rows = [json.loads(line) for line in f]
+        except (OSError, ValueError):
+            return None
+        headers = meta['headers']
+        columns = [list(column) for column in zip(*rows)] if rows else []
+        columns += [[""] * meta['rows'] for _ in range(len(headers) - len(columns))]
+        image = {'headers': headers, 'columns': columns, 'rows': meta['rows']}
+        try:
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                if json.loads(f.readline()).get('generation') != meta['generation']:
+                    return image
+                for line in f:
+                    try:
+                        op = json.loads(line)
+                    except ValueError:
+                        # Последняя строка могла не дописаться при сбое
+                        break
+                    apply_ops(image, [op])
+        except (OSError, ValueError):
+            pass
+        return image
+
+    def discard(self):
+        """Удаляет журнал и контрольную точку"""
+        if self._thread is not None:
+            self._needs_checkpoint = True
+            self._queue.put(('discard',))
+            return
+        self._remove_files()
+
+    def _remove_files(self):
+        for path in (self.journal_path, self.checkpoint_path):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    # --- Запись операций ---
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="edit-journal", daemon=True)
+            self._thread.start()
+
+    def close(self):
+        """Дописывает очередь и останавливает фоновый поток"""
+        if self._thread is not None:
+            self._queue.put(('stop',))
+            self._thread.join()
+            self._thread = None
+
+    def _accept(self):
+        # Файл, открытый без загрузки в память, и идущая загрузка не журналируются
+        return self._thread is not None and not self.failed \
+            and self.model.store.in_memory and not self.model.is_loading()
+
+    def _on_op(self, op):
+        if op[0] not in ('cell', 'cells', 'header'):
+            self._structure_version += 1
+        # Во время записи контрольной точки операция тоже идёт в журнал:
+        # точка могла прочитать ячейку раньше правки, а повтор правки безвреден
+        if not self._needs_checkpoint or self._checkpoint_pending:
+            self._queue.put(('op', op))
+            # Пакетная правка весит столько, сколько ячеек меняет
+            self._ops_since_checkpoint += len(op[2]) if op[0] == 'cells' else 1
+        if (self._needs_checkpoint or self._ops_since_checkpoint >= COMPACT_EVERY) \
+                and not self._checkpoint_pending:
+            # Контрольная точка уже содержит эту операцию
+            self.checkpoint()
+
+    def _on_reset(self):
+        self._structure_version += 1
+        self._needs_checkpoint = True
+
+    def _on_clean_changed(self, clean):
+        if clean:
+            self.discard()
+
+    def checkpoint(self):
+        """Ставит в очередь запись полной копии таблицы"""
+        self._checkpoint_pending = True
+        self._ops_since_checkpoint = 0
+        self._queue.put(('checkpoint', self.model.store, self._structure_version))
+
+    # --- Фоновый поток ---
+
+    def _fail(self, error):
+        # Сообщаем один раз и больше не пишем: повтор упирался бы в ту же ошибку
+        if not self.failed:
+            self.failed = True
+            print(f"Journal disabled after write failure: {error}", file=sys.stderr)
+
+    def _run(self):
+        journal = None
+        while True:
+            items = [self._queue.get()]
+            try:
+                while True:
+                    items.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+            for item in items:
+                kind = item[0]
+                if kind == 'op':
+                    if journal is not None:
+                        try:
+                            journal.write(json.dumps(item[1], ensure_ascii=False) + '\n')
+                        except OSError as e:
+                            self._fail(e)
+                            journal = self._close_quietly(journal)
+                elif kind == 'checkpoint':
+                    if self.failed:
+                        self._checkpoint_pending = False
+                        continue
+                    with span("autosave_checkpoint", rows=item[1].row_count()):
+                        new_journal = self._write_checkpoint(item[1], item[2])
+                    if new_journal is STALE:
+                        if self._accept():
+                            # Структура таблицы менялась во время записи: повторяем
+                            self._queue.put(('checkpoint', self.model.store,
+                                             self._structure_version))
+                        else:
+                            self._checkpoint_pending = False
+                    elif new_journal is None:
+                        journal = self._close_quietly(journal)
+                        self._checkpoint_pending = False
+                    else:
+                        if journal is not None:
+                            journal.close()
+                        journal = new_journal
+                        self._needs_checkpoint = False
+                        self._checkpoint_pending = False
+                elif kind == 'discard':
+                    if journal is not None:
+                        journal.close()
+                        journal = None
+                    self._remove_files()
+                    self._needs_checkpoint = True
+                elif kind == 'stop':
+                    if journal is not None:
+                        journal.close()
+                    return
+            if journal is not None:
+                with span("autosave", ops=len(items)):
+                    try:
+                        journal.flush()
+                        os.fsync(journal.fileno())
+                    except OSError as e:
+                        self._fail(e)
+                        journal = self._close_quietly(journal)
+
+    def _close_quietly(self, journal):
+        if journal is not None:
+            try:
+                journal.close()
+            except OSError:
+                pass
+        return None
+
+    def _write_checkpoint(self, store, version):
+        # Пишет контрольную точку во временный файл и подменяет старую;
+        # возвращает открытый журнал нового поколения, STALE, если таблица
+        # изменилась во время записи, или None при ошибке записи
+        generation = time.time_ns()
+        tmp_path = self.checkpoint_path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+                rows = store.row_count()
+                meta = {'generation': generation, 'headers': list(store.headers), 'rows': rows}
+                f.write(json.dumps(meta, ensure_ascii=False) + '\n')
+                columns = [store.column(c) for c in range(store.column_count())]
+                for start in range(0, rows, CHECKPOINT_CHUNK):
+                    if version != self._structure_version:
+                        break
+                    chunk = zip(*(column[start:start + CHECKPOINT_CHUNK] for column in columns))
+                    f.write(''.join(json.dumps(values, ensure_ascii=False) + '\n'
+                                    for values in chunk))
+                f.flush()
+                os.fsync(f.fileno())
+            if version != self._structure_version or store is not self.model.store:
+                os.remove(tmp_path)
+                return STALE
+            os.replace(tmp_path, self.checkpoint_path)
+            journal = open(self.journal_path, 'w', encoding='utf-8', newline='')
+            journal.write(json.dumps({'generation': generation}) + '\n')
+            return journal
+        except OSError as e:
+            self._fail(e)
+            return None
@@ -0,0 +1,225 @@
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+# Сколько последних интервалов хранится для панели производительности
+RECENT_SPANS = 500
+# Операция дольше этого (секунды) считается медленной для профилировщика
+SLOW_SECONDS = 1.0
+# Период опроса стеков профилировщиком (секунды) и сколько отсчётов помнить
+SAMPLE_INTERVAL = 0.01
+MAX_SAMPLES = 100000
+MAX_STACK_DEPTH = 64
+PROFILE_FILE = "last_slow_operation.folded"
+
+
+class Span:
+    """Замер одной операции: имя, длительность и счётчики (rows, bytes, ...)"""
+    __slots__ = ('name', 'counters', 'started_at', 'start', 'seconds', 'thread', 'depth')
+
+    def __init__(self, name, counters, depth):
+        self.name = name
+        self.counters = counters
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.seconds = None
+        self.thread = threading.current_thread().name
+        self.depth = depth
+
+    def add(self, **counters):
+        """Прибавляет к счётчикам, например span.add(rows=len(chunk))"""
+        for key, value in counters.items():
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def to_dict(self):
+        return {
+            'time': datetime.fromtimestamp(self.started_at).isoformat(timespec='milliseconds'),
+            'name': self.name,
+            'seconds': round(self.seconds, 6) if self.seconds is not None else None,
+            'thread': self.thread,
+            **self.counters,
+        }
+
+
+class StackSampler:
+    """Профилировщик по отсчётам: фоновый поток раз в interval снимает стеки
+    всех потоков (sys._current_frames) в кольцевой буфер. Накладные расходы
+    не зависят от числа вызовов функций, в отличие от cProfile."""
+    def __init__(self, interval=SAMPLE_INTERVAL, max_samples=MAX_SAMPLES):
+        self.interval = interval
+        self.samples = deque(maxlen=max_samples)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="perf-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            for ident, frame in sys._current_frames().items():
+                if ident != own:
+                    self.samples.append((now, ident, _stack(frame)))
+
+    def folded(self, ident, start, end):
+        """Стеки потока ident за [start, end] в свёрнутом формате
+        (строка 'внешний;...;внутренний число' — для flamegraph.pl, speedscope)"""
+        counts = {}
+        for moment, thread, stack in list(self.samples):
+            if thread == ident and start <= moment <= end:
+                counts[stack] = counts.get(stack, 0) + 1
+        return [f"{';'.join(stack)} {count}"
+                for stack, count in sorted(counts.items(), key=lambda item: -item[1])]
+
+
+def _stack(frame):
+    stack = []
+    while frame is not None and len(stack) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    stack.reverse()
+    return tuple(stack)
+
+
+class PerfMonitor:
+    """Лёгкие замеры горячих путей: интервалы (span) со счётчиками.
+
+    Интервалы копятся в кольцевом буфере и сводке по именам, передаются
+    подписчикам (панель и строка состояния) и, если задан файл метрик,
+    дописываются в него строками JSON. Подписчики вызываются в том
+    потоке, где закончилась операция. С включённым профилированием
+    внешняя операция дольше slow_seconds сохраняет стеки своего потока
+    в profile_dir/PROFILE_FILE.
+    """
+    def __init__(self, keep=RECENT_SPANS):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._recent = deque(maxlen=keep)
+        self._summary = {}
+        self._listeners = []
+        self._metrics = None
+        self.metrics_file = None
+        self._sampler = None
+        self.slow_seconds = SLOW_SECONDS
+        self.profile_dir = None
+        self.last_profile = None
+
+    @contextmanager
+    def span(self, name, **counters):
+        """with monitor.span("sort", rows=n) as span: ... — замер операции"""
+        depth = getattr(self._local, 'depth', 0)
+        span = Span(name, counters, depth)
+        self._local.depth = depth + 1
+        try:
+            yield span
+        finally:
+            self._local.depth = depth
+            span.seconds = time.perf_counter() - span.start
+            self._finish(span)
+
+    def _finish(self, span):
+        with self._lock:
+            self._recent.append(span)
+            count, total, longest = self._summary.get(span.name, (0, 0.0, 0.0))
+            self._summary[span.name] = (count + 1, total + span.seconds,
+                                        max(longest, span.seconds))
+            if self._metrics is not None:
+                try:
+                    self._metrics.write(json.dumps(span.to_dict(), ensure_ascii=False) + '\n')
+                    self._metrics.flush()
+                except (OSError, ValueError) as e:
+                    print(f"Metrics file write failed: {e}", file=sys.stderr)
+                    self._metrics = None
+            listeners = list(self._listeners)
+        sampler = self._sampler
+        if sampler is not None and span.depth == 0 and span.seconds >= self.slow_seconds:
+            self._dump_profile(sampler, span)
+        for listener in listeners:
+            listener(span)
+
+    # --- Данные для панели ---
+
+    def recent(self):
+        """Последние интервалы, от старых к новым"""
+        with self._lock:
+            return list(self._recent)
+
+    def summary(self):
+        """{имя: (число, суммарно секунд, максимум секунд)}"""
+        with self._lock:
+            return dict(self._summary)
+
+    def clear(self):
+        with self._lock:
+            self._recent.clear()
+            self._summary.clear()
+
+    def add_listener(self, listener):
+        with self._lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    # --- Файл метрик ---
+
+    def set_metrics_file(self, path):
+        """Дописывать интервалы в path (JSON-строки); None — перестать"""
+        with self._lock:
+            if self._metrics is not None:
+                self._metrics.close()
+                self._metrics = None
+            if path:
+                self._metrics = open(path, 'a', encoding='utf-8')
+            self.metrics_file = path or None
+
+    # --- Профилирование ---
+
+    def profiling(self):
+        return self._sampler is not None
+
+    def set_profiling(self, enabled, slow_seconds=None, profile_dir=None):
+        """Включает профилировщик по отсчётам для медленных операций"""
+        if slow_seconds is not None:
+            self.slow_seconds = slow_seconds
+        if profile_dir is not None:
+            self.profile_dir = profile_dir
+        if enabled and self._sampler is None:
+            self._sampler = StackSampler()
+        elif not enabled and self._sampler is not None:
+            sampler, self._sampler = self._sampler, None
+            sampler.stop()
+
+    def _dump_profile(self, sampler, span):
+        ident = threading.get_ident()
+        lines = sampler.folded(ident, span.start, span.start + span.seconds)
+        path = os.path.join(self.profile_dir or os.getcwd(), PROFILE_FILE)
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(''.join(line + '\n' for line in lines))
+        except OSError as e:
+            print(f"Profile write failed: {e}", file=sys.stderr)
+            return
+        self.last_profile = {'name': span.name, 'seconds': span.seconds, 'path': path,
+                             'samples': sum(int(line.rsplit(' ', 1)[1]) for line in lines)}
+
+    def close(self):
+        self.set_profiling(False)
+        self.set_metrics_file(None)
+
+
+# Общий монитор приложения: замеры ставятся в модулях ядра без передачи
+# объекта по цепочке вызовов
+monitor = PerfMonitor()
+span = monitor.span
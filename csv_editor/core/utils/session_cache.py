@@ -0,0 +1,296 @@
+"""Кэш сессии: уже разобранная таблица CSV в двоичном файле рядом с исходным.
+
+При первом открытии большого CSV столбцы, их типы, ключи сортировки
+и поисковый индекс записываются в .<имя>.csvcache; при повторном открытии
+файл кэша отображается в память (mmap) и таблица собирается из него без
+разбора CSV. Кэш действителен, пока у исходного файла тот же путь,
+размер, время изменения и выборочный хэш содержимого.
+
+Формат: MAGIC, секции (выровнены по 8 байт), метаданные JSON и в конце
+TRAILER (смещение и длина метаданных, MAGIC). Секции — сырые массивы
+(array) в порядке байт машины и текст UTF-8, значения разделены '\\x00'.
+Столбец с малым числом различных значений хранится словарём: различные
+значения и массив их номеров по строкам.
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+from array import array
+from csv_editor.core.models.column_store import ColumnStore, POOL_LIMIT
+from csv_editor.core.models.search_index import ColumnIndex, SEPARATOR
+from csv_editor.core.utils.perf import span
+
+MAGIC = b'CSVEC\x00\x00\x01'
+TRAILER = struct.Struct('<QQ8s')
+ALIGN = 8
+CACHE_SUFFIX = '.csvcache'
+# Файлы меньше этого разбираются быстрее, чем проверяется кэш
+CACHE_MIN_SIZE = 1 << 22
+# Хэш содержимого: начало, конец и равномерно расположенные блоки файла;
+# файл, который целиком меньше выборки, хэшируется полностью
+HASH_BLOCK = 1 << 16
+HASH_SAMPLES = 64
+
+
+def content_hash(filename, size):
+    """Выборочный хэш содержимого: ловит правки, не меняющие размер и время"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(filename, 'rb') as f:
+        if size <= HASH_BLOCK * (HASH_SAMPLES + 2):
+            digest.update(f.read())
+        else:
+            for i in range(HASH_SAMPLES + 2):
+                f.seek((size - HASH_BLOCK) * i // (HASH_SAMPLES + 1))
+                digest.update(f.read(HASH_BLOCK))
+    return digest.hexdigest()
+
+
+def source_key(filename, delimiter):
+    """Ключ исходного файла, с которым сверяется кэш"""
+    stat = os.stat(filename)
+    return {
+        'path': os.path.abspath(filename),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'hash': content_hash(filename, stat.st_size),
+        'delimiter': delimiter,
+        'byteorder': sys.byteorder,
+    }
+
+
+def user_cache_dir():
+    base = os.environ.get('XDG_CACHE_HOME')
+    if not base and os.name == 'nt':
+        base = os.environ.get('LOCALAPPDATA')
+    if not base:
+        base = os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'csv_editor', 'sessions')
+
+
+def cache_paths(filename):
+    """Файл кэша рядом с исходным и запасной в каталоге кэша пользователя
+    (если каталог исходного файла недоступен для записи)"""
+    path = os.path.abspath(filename)
+    folder, name = os.path.split(path)
+    digest = hashlib.sha1(path.encode('utf-8', 'surrogatepass')).hexdigest()
+    return [os.path.join(folder, f".{name}{CACHE_SUFFIX}"),
+            os.path.join(user_cache_dir(), digest + CACHE_SUFFIX)]
+
+
+# --- Чтение ---
+
+def load(filename, delimiter=','):
+    """ColumnStore из кэша или None, если кэша нет, он устарел или повреждён.
+
+    Номера значений и поисковый индекс читаются прямо из отображения
+    файла; отображение живёт, пока на него ссылается индекс.
+    """
+    if os.path.getsize(filename) < CACHE_MIN_SIZE:
+        return None
+    key = None
+    for path in cache_paths(filename):
+        try:
+            with open(path, 'rb') as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            continue
+        with span("session_cache_load", bytes=len(mapped)) as s:
+            try:
+                meta = _read_meta(mapped)
+                if key is None:
+                    key = source_key(filename, delimiter)
+                if meta['source'] == key:
+                    store = _restore(mapped, meta)
+                    s.add(rows=store.row_count())
+                    return store
+            except (ValueError, KeyError, TypeError, IndexError, struct.error) as e:
+                print(f"Session cache {path} ignored: {e}", file=sys.stderr)
+        try:
+            mapped.close()
+        except BufferError:
+            # На отображение ещё ссылается недособранный индекс
+            pass
+    return None
+
+
+def _read_meta(mapped):
+    if len(mapped) < len(MAGIC) + TRAILER.size or mapped[:len(MAGIC)] != MAGIC:
+        raise ValueError("not a session cache")
+    offset, length, magic = TRAILER.unpack(mapped[-TRAILER.size:])
+    if magic != MAGIC:
+        raise ValueError("truncated session cache")
+    return json.loads(mapped[offset:offset + length].decode('utf-8'))
+
+
+def _section(view, section, typecode=None):
+    offset, length = section
+    part = view[offset:offset + length]
+    return part.cast(typecode) if typecode else part
+
+
+def _split(view, section, count):
+    text = str(_section(view, section), 'utf-8')
+    values = text.split(SEPARATOR) if count else []
+    if len(values) != count:
+        raise ValueError("broken column section")
+    return values
+
+
+def _restore(mapped, meta):
+    view = memoryview(mapped)
+    rows = meta['rows']
+    columns, kinds, keys = [], [], []
+    for info in meta['columns']:
+        codes = info.get('codes')
+        if codes is not None:
+            distinct = _split(view, info['values'], info['distinct'])
+            column = list(map(distinct.__getitem__, _section(view, codes, info['typecode'])))
+        else:
+            column = _split(view, info['values'], rows)
+        if len(column) != rows:
+            raise ValueError("broken column section")
+        columns.append(column)
+        kinds.append(info['kind'])
+        # Ключи правятся вместе с ячейками, поэтому копируются в array
+        column_keys = None
+        if info['keys'] is not None:
+            column_keys = array('d')
+            column_keys.frombytes(_section(view, info['keys']))
+        keys.append(column_keys)
+    store = ColumnStore(meta['headers'])
+    store.append_columns(columns, rows, kinds, keys)
+
+    index = meta.get('index')
+    if index is not None:
+        built = {}
+        for col, parts in index['columns']:
+            built[col] = ColumnIndex.from_parts(
+                _section(view, parts['rows'], 'i'),
+                _section(view, parts['bounds'], 'i'),
+                _section(view, parts['starts'], 'q'),
+                str(_section(view, parts['text']), 'utf-8'),
+            )
+        store.prebuilt_index = (index['rows'], built)
+    return store
+
+
+# --- Запись ---
+
+class _SectionWriter:
+    def __init__(self, f):
+        self.f = f
+        self.pos = f.write(MAGIC)
+
+    def add(self, data):
+        """Пишет секцию (bytes или array), возвращает [смещение, длина]"""
+        padding = -self.pos % ALIGN
+        if padding:
+            self.pos += self.f.write(b'\x00' * padding)
+        length = memoryview(data).nbytes
+        self.f.write(data)
+        offset, self.pos = self.pos, self.pos + length
+        return [offset, length]
+
+
+def _joined(values):
+    # None, если значение само содержит разделитель
+    text = SEPARATOR.join(values)
+    if values and text.count(SEPARATOR) != len(values) - 1:
+        return None
+    return text.encode('utf-8')
+
+
+def snapshot(store):
+    """Копия таблицы для записи в фоне; снимается в GUI-потоке"""
+    rows = store.row_count()
+    return {
+        'headers': list(store.headers),
+        'rows': rows,
+        'columns': [column[:rows] for column in store.columns],
+        'kinds': list(store.kinds),
+        'keys': [keys[:rows] if keys is not None else None for keys in store.keys],
+    }
+
+
+def save(filename, delimiter, table, index=None):
+    """Записывает снимок таблицы (snapshot) и готовый индекс (SearchIndex.exporter)
+    в кэш. Возвращает путь к кэшу или None, если таблицу не закэшировать."""
+    key = source_key(filename, delimiter)
+    if key['size'] < CACHE_MIN_SIZE:
+        return None
+    for path in cache_paths(filename):
+        temp = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with span("session_cache_save", rows=table['rows']) as s:
+                with open(temp, 'wb') as f:
+                    written = _write(f, key, table, index)
+                    s.add(bytes=f.tell())
+                if not written:
+                    os.remove(temp)
+                    return None
+                os.replace(temp, path)
+            return path
+        except OSError as e:
+            print(f"Session cache write to {path} failed: {e}", file=sys.stderr)
+            try:
+                os.remove(temp)
+            except OSError:
+                pass
+    return None
+
+
+def _write(f, key, table, index):
+    writer = _SectionWriter(f)
+    columns = []
+    for values, kind, keys in zip(table['columns'], table['kinds'], table['keys']):
+        info = {'kind': kind, 'keys': writer.add(keys) if keys is not None else None}
+        distinct = list(dict.fromkeys(values))
+        if len(distinct) <= POOL_LIMIT:
+            ids = {value: number for number, value in enumerate(distinct)}
+            typecode = 'B' if len(distinct) <= 256 else 'H'
+            data = _joined(distinct)
+            if data is None:
+                return False
+            info.update(values=writer.add(data), distinct=len(distinct), typecode=typecode,
+                        codes=writer.add(array(typecode, map(ids.__getitem__, values))))
+        else:
+            data = _joined(values)
+            if data is None:
+                return False
+            info['values'] = writer.add(data)
+        columns.append(info)
+    meta = {'source': key, 'headers': table['headers'], 'rows': table['rows'],
+            'columns': columns, 'index': None}
+    if index is not None and index[0] == table['rows']:
+        built = []
+        for col, column_index in sorted(index[1].items()):
+            built.append([col, {
+                'rows': writer.add(column_index.rows),
+                'bounds': writer.add(column_index.bounds),
+                'starts': writer.add(column_index.starts),
+                'text': writer.add(column_index.text.encode('utf-8')),
+            }])
+        meta['index'] = {'rows': index[0], 'columns': built}
+    data = json.dumps(meta, ensure_ascii=False).encode('utf-8')
+    offset = writer.add(data)[0]
+    f.write(TRAILER.pack(offset, len(data), MAGIC))
+    return True
+
+
+def save_async(filename, delimiter, store, search_index=None):
+    """Записывает кэш в фоновом потоке: снимок таблицы берётся сейчас,
+    поисковый индекс — когда он достроится (если правок после не было)"""
+    table = snapshot(store)
+    export = search_index.exporter(store) if search_index is not None else None
+
+    def write():
+        save(filename, delimiter, table, export() if export is not None else None)
+
+    thread = threading.Thread(target=write, name="session-cache", daemon=True)
+    thread.start()
+    return thread
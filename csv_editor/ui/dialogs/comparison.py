@@ -1,5 +1,40 @@
-from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QTextEdit, 
-                            QDialogButtonBox, QPushButton, QFileDialog)
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QTextEdit,
+                            QDialogButtonBox, QPushButton, QFileDialog, QListWidget,
+                            QListWidgetItem, QCheckBox, QLabel, QProgressBar, QMessageBox)
+from PyQt5.QtCore import Qt, QThread, pyqtSignal
+from csv_editor.core.controllers.comparison import (ComparisonController, StoreSource,
+                                                    ADDED, REMOVED, CHANGED)
+
+# Сколько примеров каждого вида различий показывать в окне
+SHOWN_DETAILS = 200
+
+
+class ComparisonWorker(QThread):
+    """Сравнение таблиц в фоновом потоке"""
+    progress = pyqtSignal(int, int)
+    failed = pyqtSignal(str)
+
+    def __init__(self, controller, left, filename, key_columns, has_header, report_file,
+                 parent=None):
+        super().__init__(parent)
+        self.controller = controller
+        self.left = left
+        self.filename = filename
+        self.key_columns = key_columns
+        self.has_header = has_header
+        self.report_file = report_file
+        self.result = None
+
+    def run(self):
+        try:
+            self.result = self.controller.compare_with_file(
+                self.filename, self.key_columns, has_header=self.has_header,
+                report_file=self.report_file, progress=self.progress.emit,
+                cancelled=self.isInterruptionRequested, left=self.left
+            )
+        except Exception as e:
+            self.failed.emit(str(e))
+
 
 class TableComparisonDialog(QDialog):
     def __init__(self, main_model, parent=None):
@@ -7,31 +42,138 @@ class TableComparisonDialog(QDialog):
         self.setWindowTitle("Compare Tables")
         self.resize(800, 600)
         self.main_model = main_model
+        self.controller = ComparisonController(main_model)
+        self.worker = None
         self.init_ui()
-    
+
     def init_ui(self):
         layout = QVBoxLayout()
-        
+
+        # Ключевые столбцы: по ним сопоставляются строки двух таблиц
+        self.key_list = QListWidget()
+        self.key_list.setMaximumHeight(120)
+        for col in range(self.main_model.columnCount()):
+            item = QListWidgetItem(str(self.main_model.headerData(col, Qt.Horizontal)))
+            item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
+            item.setCheckState(Qt.Unchecked)
+            self.key_list.addItem(item)
+
+        self.header_check = QCheckBox("Second table has a header row")
+        # Как и в текущей таблице, первая строка файла по умолчанию — данные
+        self.header_check.setChecked(False)
+        self.report_check = QCheckBox("Save the full list of differences to a CSV file")
+
+        btn_layout = QHBoxLayout()
+        self.load_btn = QPushButton("Load Second Table")
+        self.load_btn.clicked.connect(self.load_second_table)
+        self.cancel_btn = QPushButton("Cancel Comparison")
+        self.cancel_btn.setEnabled(False)
+        self.cancel_btn.clicked.connect(self.cancel_comparison)
+        btn_layout.addWidget(self.load_btn)
+        btn_layout.addWidget(self.cancel_btn)
+
+        self.progress_bar = QProgressBar()
+        self.progress_bar.hide()
+
         self.text_edit = QTextEdit()
         self.text_edit.setReadOnly(True)
-        
-        load_btn = QPushButton("Load Second Table")
-        load_btn.clicked.connect(self.load_second_table)
-        
+
         buttons = QDialogButtonBox(QDialogButtonBox.Close)
         buttons.rejected.connect(self.reject)
-        
-        layout.addWidget(load_btn)
+
+        layout.addWidget(QLabel("Key columns (none checked: compare whole rows):"))
+        layout.addWidget(self.key_list)
+        layout.addWidget(self.header_check)
+        layout.addWidget(self.report_check)
+        layout.addLayout(btn_layout)
+        layout.addWidget(self.progress_bar)
         layout.addWidget(self.text_edit)
         layout.addWidget(buttons)
-        
+
         self.setLayout(layout)
-    
+
+    def key_columns(self):
+        return [row for row in range(self.key_list.count())
+                if self.key_list.item(row).checkState() == Qt.Checked]
+
     def load_second_table(self):
         filename, _ = QFileDialog.getOpenFileName(
             self, "Open Second Table", "", "CSV Files (*.csv);;All Files (*)"
         )
-        if filename:
-            # Здесь должна быть загрузка второй таблицы и сравнение
-            # Это упрощенный пример
-            self.text_edit.setPlainText(f"Comparison with {filename}\n\nNot implemented yet")
+        if not filename:
+            return
+        report_file = None
+        if self.report_check.isChecked():
+            report_file, _ = QFileDialog.getSaveFileName(
+                self, "Save Differences", "", "CSV Files (*.csv);;All Files (*)"
+            )
+            if not report_file:
+                return
+        self.compare_with_file(filename, report_file)
+
+    def compare_with_file(self, filename, report_file=None):
+        self.filename = filename
+        # Снимок текущей таблицы берётся здесь, в GUI-потоке
+        left = StoreSource(self.main_model.store)
+        self.worker = ComparisonWorker(self.controller, left, filename, self.key_columns(),
+                                       self.header_check.isChecked(), report_file, self)
+        self.worker.progress.connect(self.on_progress)
+        self.worker.failed.connect(self.on_failed)
+        self.worker.finished.connect(self.on_finished)
+        self.load_btn.setEnabled(False)
+        self.cancel_btn.setEnabled(True)
+        self.progress_bar.setValue(0)
+        self.progress_bar.show()
+        self.text_edit.setPlainText(f"Comparing with {filename}...")
+        self.worker.start()
+
+    def cancel_comparison(self):
+        if self.worker is not None:
+            self.worker.requestInterruption()
+
+    def on_progress(self, done, total):
+        if total:
+            self.progress_bar.setValue(int(done * 100 / total))
+
+    def on_failed(self, message):
+        QMessageBox.critical(self, "Error", f"Failed to compare tables: {message}")
+
+    def on_finished(self):
+        self.load_btn.setEnabled(True)
+        self.cancel_btn.setEnabled(False)
+        self.progress_bar.hide()
+        result = self.worker.result
+        if result is None:
+            self.text_edit.setPlainText(f"Comparison with {self.filename} was not completed")
+            return
+        self.text_edit.setPlainText(self.format_result(result))
+
+    def format_result(self, result):
+        lines = [f"Comparison with {self.filename}", "", result.summary()]
+        if result.is_equal():
+            lines += ["", "The tables are identical"]
+        for status, title in ((CHANGED, "Changed rows"), (ADDED, "Added rows"),
+                              (REMOVED, "Removed rows")):
+            details = result.details[status][:SHOWN_DETAILS]
+            if not details:
+                continue
+            lines += ["", f"{title} (first {len(details)} of {result.counts[status]}):"]
+            for detail in details:
+                key = " | ".join(detail['key'])
+                if status == CHANGED:
+                    cells = "; ".join(f"{name}: '{old}' -> '{new}'"
+                                      for name, old, new in detail['cells'])
+                    lines.append(f"  row {detail['left_row']} -> {detail['right_row']} "
+                                 f"[{key}]: {cells}")
+                elif status == ADDED:
+                    lines.append(f"  + row {detail['right_row']}: {' | '.join(detail['values'])}")
+                else:
+                    lines.append(f"  - row {detail['left_row']}: {' | '.join(detail['values'])}")
+        return "\n".join(lines)
+
+    def reject(self):
+        # Окно не закрывается, пока фоновое сравнение не остановлено
+        if self.worker is not None and self.worker.isRunning():
+            self.worker.requestInterruption()
+            self.worker.wait()
+        super().reject()
@@ -0,0 +1,185 @@
+import re
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QFormLayout, QLineEdit,
+                            QCheckBox, QRadioButton, QPushButton, QLabel, QProgressBar,
+                            QDialogButtonBox, QMessageBox)
+from PyQt5.QtCore import QThread, pyqtSignal
+from csv_editor.core.models.find_replace import CellReplacer
+
+
+class FindReplaceWorker(QThread):
+    """Проход поиска и замены в фоновом потоке; результат — атрибут result"""
+    progress = pyqtSignal(int, int, int)
+    failed = pyqtSignal(str)
+
+    def __init__(self, replacer, store, columns, rows, parent=None):
+        super().__init__(parent)
+        self.replacer = replacer
+        self.store = store
+        self.columns = columns
+        self.rows = rows
+        self.result = None
+
+    def run(self):
+        try:
+            self.result = self.replacer.scan(self.store, self.columns, self.rows,
+                                             self.progress.emit, self.isInterruptionRequested)
+        except Exception as e:
+            self.failed.emit(str(e))
+
+
+class FindReplaceDialog(QDialog):
+    """Поиск и замена по всей таблице.
+
+    Проход по хранилищу в памяти идёт в фоновом потоке (счётчик совпадений
+    обновляется по ходу, проход можно отменить); остальные хранилища
+    просматриваются сразу. Все замены применяются функцией apply(changes)
+    одним шагом отмены.
+    """
+    def __init__(self, store, headers, selected_columns, visible_rows, apply, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Find and Replace")
+        self.store = store
+        self.headers = headers
+        self.selected_columns = selected_columns
+        # visible_rows() — строки источника, прошедшие фильтр вида
+        self.visible_rows = visible_rows
+        self.apply = apply
+        self.worker = None
+        self.replace_after_scan = False
+        self.init_ui()
+
+    def init_ui(self):
+        layout = QVBoxLayout()
+
+        form = QFormLayout()
+        self.find_edit = QLineEdit()
+        self.replace_edit = QLineEdit()
+        form.addRow("Find:", self.find_edit)
+        form.addRow("Replace with:", self.replace_edit)
+        layout.addLayout(form)
+
+        self.regex_check = QCheckBox("Regular expression")
+        self.case_check = QCheckBox("Match case")
+        self.whole_check = QCheckBox("Whole cell")
+        for check in (self.regex_check, self.case_check, self.whole_check):
+            layout.addWidget(check)
+
+        # Область поиска
+        self.all_columns_radio = QRadioButton("All columns")
+        self.selected_columns_radio = QRadioButton(
+            f"Selected columns ({len(self.selected_columns)})"
+        )
+        self.all_columns_radio.setChecked(True)
+        self.selected_columns_radio.setEnabled(bool(self.selected_columns))
+        self.filtered_check = QCheckBox("Only rows shown by the filter")
+        layout.addWidget(self.all_columns_radio)
+        layout.addWidget(self.selected_columns_radio)
+        layout.addWidget(self.filtered_check)
+
+        btn_layout = QHBoxLayout()
+        self.find_btn = QPushButton("Count Matches")
+        self.find_btn.clicked.connect(lambda: self.start_scan(False))
+        self.replace_btn = QPushButton("Replace All")
+        self.replace_btn.clicked.connect(lambda: self.start_scan(True))
+        self.cancel_btn = QPushButton("Stop")
+        self.cancel_btn.setEnabled(False)
+        self.cancel_btn.clicked.connect(self.cancel_scan)
+        btn_layout.addWidget(self.find_btn)
+        btn_layout.addWidget(self.replace_btn)
+        btn_layout.addWidget(self.cancel_btn)
+        layout.addLayout(btn_layout)
+
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.hide()
+        layout.addWidget(self.progress_bar)
+        self.status_label = QLabel()
+        layout.addWidget(self.status_label)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.Close)
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
+
+        self.setLayout(layout)
+
+    def scope(self):
+        """Столбцы и строки (None — все) для прохода"""
+        if self.selected_columns_radio.isChecked():
+            columns = list(self.selected_columns)
+        else:
+            columns = list(range(len(self.headers)))
+        rows = self.visible_rows() if self.filtered_check.isChecked() else None
+        return columns, rows
+
+    def start_scan(self, replace):
+        if self.worker is not None or not self.find_edit.text():
+            return
+        try:
+            replacer = CellReplacer(self.find_edit.text(), self.replace_edit.text(),
+                                    regex=self.regex_check.isChecked(),
+                                    case_sensitive=self.case_check.isChecked(),
+                                    whole_cell=self.whole_check.isChecked())
+        except re.error as e:
+            QMessageBox.warning(self, "Find and Replace", f"Invalid pattern: {e}")
+            return
+        columns, rows = self.scope()
+        self.replace_after_scan = replace
+        if not self.store.in_memory:
+            # Страничные хранилища читаются только из своего потока
+            try:
+                result = replacer.scan(self.store, columns, rows)
+            except Exception as e:
+                self.on_scan_failed(str(e))
+                return
+            self.finish_scan(result)
+            return
+        self.worker = FindReplaceWorker(replacer, self.store, columns, rows, self)
+        self.worker.progress.connect(self.on_scan_progress)
+        self.worker.failed.connect(self.on_scan_failed)
+        self.worker.finished.connect(self.on_scan_finished)
+        self.set_running(True)
+        self.worker.start()
+
+    def set_running(self, running):
+        self.find_btn.setEnabled(not running)
+        self.replace_btn.setEnabled(not running)
+        self.cancel_btn.setEnabled(running)
+        self.progress_bar.setValue(0)
+        self.progress_bar.setVisible(running)
+
+    def cancel_scan(self):
+        if self.worker is not None:
+            self.worker.requestInterruption()
+
+    def on_scan_progress(self, scanned, total, matched):
+        if total:
+            self.progress_bar.setValue(int(scanned * 100 / total))
+        self.status_label.setText(f"{matched} matching cells so far")
+
+    def on_scan_failed(self, message):
+        QMessageBox.critical(self, "Find and Replace Error", message)
+
+    def on_scan_finished(self):
+        worker, self.worker = self.worker, None
+        self.set_running(False)
+        worker.deleteLater()
+        if worker.result is not None:
+            self.finish_scan(worker.result)
+
+    def finish_scan(self, result):
+        if not result.complete:
+            self.status_label.setText(f"Stopped: {result.matched} matching cells so far")
+            return
+        if not self.replace_after_scan:
+            self.status_label.setText(f"{result.matched} matching cells")
+            return
+        changed = result.changed()
+        if changed:
+            self.apply(result.changes)
+        self.status_label.setText(f"Replaced in {changed} cells")
+
+    def reject(self):
+        if self.worker is not None:
+            self.worker.requestInterruption()
+            self.worker.wait()
+        super().reject()
@@ -1,5 +1,28 @@
-from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QComboBox, 
-                            QCheckBox, QDialogButtonBox, QLabel)
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QListWidget, QListWidgetItem,
+                            QCheckBox, QDialogButtonBox, QLabel, QSpinBox, QTableView)
+from PyQt5.QtCore import Qt
+from csv_editor.core.models.csv_table_model import ColumnarTableModel
+from csv_editor.core.models.proxy_model import MySortFilterProxyModel
+from csv_editor.core.models.group_by import SUM, AVG, COUNT, MIN, MAX, DISTINCT
+
+AGGREGATE_CHOICES = [("Sum", SUM), ("Average", AVG), ("Count", COUNT), ("Min", MIN),
+                     ("Max", MAX), ("Distinct count", DISTINCT), ("Median", 'p50')]
+
+
+def checkable_list(headers, checked=()):
+    widget = QListWidget()
+    for col, header in enumerate(headers):
+        item = QListWidgetItem(header)
+        item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
+        item.setCheckState(Qt.Checked if col in checked else Qt.Unchecked)
+        widget.addItem(item)
+    return widget
+
+
+def checked_rows(widget):
+    return [row for row in range(widget.count())
+            if widget.item(row).checkState() == Qt.Checked]
+
 
 class GroupDialog(QDialog):
     def __init__(self, headers, parent=None):
@@ -10,32 +33,82 @@ class GroupDialog(QDialog):
 
     def init_ui(self):
         layout = QVBoxLayout()
-        
-        # Выбор столбца для группировки
-        layout.addWidget(QLabel("Group by column:"))
-        self.group_combo = QComboBox()
-        self.group_combo.addItems(self.headers)
-        layout.addWidget(self.group_combo)
-        
+
+        # Выбор столбцов для группировки (ключ — все отмеченные)
+        columns_layout = QHBoxLayout()
+        group_layout = QVBoxLayout()
+        group_layout.addWidget(QLabel("Group by columns:"))
+        self.group_list = checkable_list(self.headers, checked=(0,))
+        group_layout.addWidget(self.group_list)
+        columns_layout.addLayout(group_layout)
+
+        # Столбцы, по которым считаются агрегаты
+        value_layout = QVBoxLayout()
+        value_layout.addWidget(QLabel("Aggregate columns:"))
+        self.value_list = checkable_list(self.headers)
+        value_layout.addWidget(self.value_list)
+        columns_layout.addLayout(value_layout)
+        layout.addLayout(columns_layout)
+
         # Выбор агрегатных функций
         layout.addWidget(QLabel("Aggregate functions:"))
         self.agg_checkboxes = {}
-        
-        for func in ['Sum', 'Average', 'Count', 'Min', 'Max']:
-            cb = QCheckBox(func)
-            self.agg_checkboxes[func] = cb
+
+        for title, name in AGGREGATE_CHOICES:
+            cb = QCheckBox(title)
+            self.agg_checkboxes[name] = cb
             layout.addWidget(cb)
-        
+
+        percentile_layout = QHBoxLayout()
+        self.percentile_check = QCheckBox("Percentile")
+        self.percentile_spin = QSpinBox()
+        self.percentile_spin.setRange(1, 99)
+        self.percentile_spin.setValue(90)
+        percentile_layout.addWidget(self.percentile_check)
+        percentile_layout.addWidget(self.percentile_spin)
+        percentile_layout.addStretch()
+        layout.addLayout(percentile_layout)
+
         # Кнопки
         buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
         buttons.accepted.connect(self.accept)
         buttons.rejected.connect(self.reject)
         layout.addWidget(buttons)
-        
+
         self.setLayout(layout)
 
     def get_selections(self):
+        functions = [name for name, cb in self.agg_checkboxes.items() if cb.isChecked()]
+        if self.percentile_check.isChecked():
+            functions.append(f"p{self.percentile_spin.value()}")
         return {
-            'group_column': self.group_combo.currentText(),
-            'aggregations': [func for func, cb in self.agg_checkboxes.items() if cb.isChecked()]
+            'group_columns': checked_rows(self.group_list),
+            'aggregations': [(col, name) for col in checked_rows(self.value_list)
+                             for name in functions]
         }
+
+
+class GroupResultDialog(QDialog):
+    """Результат группировки в отдельном окне (своя модель, сортировка по клику)"""
+    def __init__(self, store, title, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(title)
+        self.resize(700, 500)
+        self.model = ColumnarTableModel(parent=self)
+        self.model.set_store(store)
+        self.proxy_model = MySortFilterProxyModel(self)
+        self.proxy_model.setSourceModel(self.model)
+
+        view = QTableView()
+        view.setModel(self.proxy_model)
+        view.setSortingEnabled(True)
+        view.setEditTriggers(QTableView.NoEditTriggers)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.Close)
+        buttons.rejected.connect(self.reject)
+
+        layout = QVBoxLayout()
+        layout.addWidget(QLabel(f"{store.row_count()} groups"))
+        layout.addWidget(view)
+        layout.addWidget(buttons)
+        self.setLayout(layout)
@@ -0,0 +1,151 @@
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QTableWidget,
+                            QTableWidgetItem, QHeaderView, QCheckBox, QDoubleSpinBox,
+                            QLabel, QPushButton, QDialogButtonBox, QFileDialog, QMessageBox)
+from PyQt5.QtCore import QTimer
+
+# Панель обновляется раз в столько миллисекунд, пока открыта
+REFRESH_MS = 1000
+
+
+def format_count(value):
+    return f"{value:,}" if value else ""
+
+
+def format_bytes(value):
+    if not value:
+        return ""
+    for unit in ("B", "KB", "MB", "GB"):
+        if value < 1024 or unit == "GB":
+            return f"{value:.0f} {unit}" if unit == "B" else f"{value:.1f} {unit}"
+        value /= 1024
+
+
+class PerformanceDialog(QDialog):
+    """Панель производительности: последние операции, сводка по именам,
+    файл метрик и профилировщик медленных операций"""
+    def __init__(self, monitor, parent=None):
+        super().__init__(parent)
+        self.monitor = monitor
+        self.setWindowTitle("Performance")
+        self.resize(760, 560)
+        self.init_ui()
+        self.refresh()
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(REFRESH_MS)
+
+    def init_ui(self):
+        layout = QVBoxLayout()
+
+        layout.addWidget(QLabel("Recent operations:"))
+        self.recent_table = self.make_table(["Time", "Operation", "Seconds", "Rows",
+                                             "Bytes", "Thread"])
+        layout.addWidget(self.recent_table, 2)
+
+        layout.addWidget(QLabel("Totals:"))
+        self.summary_table = self.make_table(["Operation", "Count", "Total s", "Max s"])
+        layout.addWidget(self.summary_table, 1)
+
+        metrics_layout = QHBoxLayout()
+        self.metrics_check = QCheckBox("Write metrics to file")
+        self.metrics_check.setChecked(self.monitor.metrics_file is not None)
+        self.metrics_check.toggled.connect(self.on_metrics_toggled)
+        self.metrics_label = QLabel(self.monitor.metrics_file or "")
+        metrics_layout.addWidget(self.metrics_check)
+        metrics_layout.addWidget(self.metrics_label, 1)
+        layout.addLayout(metrics_layout)
+
+        profile_layout = QHBoxLayout()
+        self.profile_check = QCheckBox("Profile operations slower than")
+        self.profile_check.setChecked(self.monitor.profiling())
+        self.profile_check.toggled.connect(self.on_profile_toggled)
+        self.threshold_spin = QDoubleSpinBox()
+        self.threshold_spin.setRange(0.05, 600)
+        self.threshold_spin.setSuffix(" s")
+        self.threshold_spin.setValue(self.monitor.slow_seconds)
+        self.threshold_spin.valueChanged.connect(self.on_threshold_changed)
+        profile_layout.addWidget(self.profile_check)
+        profile_layout.addWidget(self.threshold_spin)
+        profile_layout.addStretch()
+        layout.addLayout(profile_layout)
+        self.profile_label = QLabel()
+        layout.addWidget(self.profile_label)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.Close)
+        clear_btn = QPushButton("Clear")
+        clear_btn.clicked.connect(self.clear)
+        buttons.addButton(clear_btn, QDialogButtonBox.ResetRole)
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
+
+        self.setLayout(layout)
+
+    def make_table(self, headers):
+        table = QTableWidget(0, len(headers))
+        table.setHorizontalHeaderLabels(headers)
+        table.setEditTriggers(QTableWidget.NoEditTriggers)
+        table.verticalHeader().hide()
+        table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        table.horizontalHeader().setStretchLastSection(True)
+        return table
+
+    def fill_table(self, table, rows):
+        table.setRowCount(len(rows))
+        for row, values in enumerate(rows):
+            for col, value in enumerate(values):
+                table.setItem(row, col, QTableWidgetItem(value))
+
+    def refresh(self):
+        # Новые операции сверху
+        self.fill_table(self.recent_table, [
+            (span.to_dict()['time'][11:], span.name, f"{span.seconds:.3f}",
+             format_count(span.counters.get('rows')),
+             format_bytes(span.counters.get('bytes')), span.thread)
+            for span in reversed(self.monitor.recent())
+        ])
+        summary = sorted(self.monitor.summary().items(), key=lambda item: -item[1][1])
+        self.fill_table(self.summary_table, [
+            (name, str(count), f"{total:.3f}", f"{longest:.3f}")
+            for name, (count, total, longest) in summary
+        ])
+        profile = self.monitor.last_profile
+        if profile is not None:
+            self.profile_label.setText(
+                f"Last slow operation: {profile['name']} ({profile['seconds']:.2f} s, "
+                f"{profile['samples']} samples) saved to {profile['path']}"
+            )
+        elif self.monitor.profiling():
+            self.profile_label.setText("No slow operations profiled yet")
+        else:
+            self.profile_label.setText("")
+
+    def on_metrics_toggled(self, checked):
+        if not checked:
+            self.monitor.set_metrics_file(None)
+            self.metrics_label.setText("")
+            return
+        filename, _ = QFileDialog.getSaveFileName(
+            self, "Metrics File", "metrics.jsonl", "JSON Lines (*.jsonl);;All Files (*)"
+        )
+        if filename:
+            try:
+                self.monitor.set_metrics_file(filename)
+                self.metrics_label.setText(filename)
+                return
+            except OSError as e:
+                QMessageBox.critical(self, "Metrics File Error", str(e))
+        # Файл не выбран или не открылся: флажок снимается без повторного вызова
+        self.metrics_check.blockSignals(True)
+        self.metrics_check.setChecked(False)
+        self.metrics_check.blockSignals(False)
+
+    def on_profile_toggled(self, checked):
+        self.monitor.set_profiling(checked, self.threshold_spin.value())
+        self.refresh()
+
+    def on_threshold_changed(self, value):
+        self.monitor.slow_seconds = value
+
+    def clear(self):
+        self.monitor.clear()
+        self.refresh()
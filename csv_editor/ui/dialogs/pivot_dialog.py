@@ -0,0 +1,81 @@
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QComboBox,
+                            QDialogButtonBox, QLabel, QTableView)
+from csv_editor.core.models.pivot import PivotModel
+from csv_editor.core.models.group_by import COUNT
+from .group_dialog import AGGREGATE_CHOICES, checkable_list, checked_rows
+
+
+class PivotDialog(QDialog):
+    def __init__(self, headers, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Pivot Table")
+        self.headers = headers
+        self.init_ui()
+
+    def init_ui(self):
+        layout = QVBoxLayout()
+
+        # Столбцы, значения которых становятся строками и столбцами сводной таблицы
+        keys_layout = QHBoxLayout()
+        rows_layout = QVBoxLayout()
+        rows_layout.addWidget(QLabel("Rows:"))
+        self.row_list = checkable_list(self.headers, checked=(0,))
+        rows_layout.addWidget(self.row_list)
+        keys_layout.addLayout(rows_layout)
+
+        columns_layout = QVBoxLayout()
+        columns_layout.addWidget(QLabel("Columns:"))
+        self.column_list = checkable_list(self.headers, checked=(1,) if len(self.headers) > 1 else ())
+        columns_layout.addWidget(self.column_list)
+        keys_layout.addLayout(columns_layout)
+        layout.addLayout(keys_layout)
+
+        # Значение ячейки: число строк или агрегат выбранного столбца
+        layout.addWidget(QLabel("Values:"))
+        self.value_combo = QComboBox()
+        self.value_combo.addItem("(number of rows)")
+        self.value_combo.addItems(self.headers)
+        layout.addWidget(self.value_combo)
+
+        self.aggregate_combo = QComboBox()
+        for title, name in AGGREGATE_CHOICES:
+            self.aggregate_combo.addItem(title, name)
+        layout.addWidget(self.aggregate_combo)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
+
+        self.setLayout(layout)
+
+    def get_selections(self):
+        value = self.value_combo.currentIndex() - 1
+        return {
+            'row_columns': checked_rows(self.row_list),
+            'column_columns': checked_rows(self.column_list),
+            'value_column': value if value >= 0 else None,
+            'aggregate': self.aggregate_combo.currentData() if value >= 0 else COUNT
+        }
+
+
+class PivotResultDialog(QDialog):
+    """Сводная таблица в отдельном окне; ячейки модель читает по запросу"""
+    def __init__(self, pivot, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(f"Pivot: {pivot.title()}")
+        self.resize(800, 500)
+        self.model = PivotModel(pivot, self)
+
+        view = QTableView()
+        view.setModel(self.model)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.Close)
+        buttons.rejected.connect(self.reject)
+
+        layout = QVBoxLayout()
+        layout.addWidget(QLabel(f"{pivot.row_count()} rows x {pivot.column_count()} columns, "
+                                f"{pivot.cell_count()} non-empty cells"))
+        layout.addWidget(view)
+        layout.addWidget(buttons)
+        self.setLayout(layout)
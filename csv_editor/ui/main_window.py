@@ -1,31 +1,41 @@
-import json
 import sys
+import csv
+import io
 
 # Импорты PyQt5
 from PyQt5.QtWidgets import (QMainWindow, QTableView, QToolBar, QAction, 
                             QStatusBar, QMenuBar, QFileDialog, QMessageBox,
-                            QInputDialog, QUndoStack)
-from PyQt5.QtGui import QIcon, QStandardItem
-from PyQt5.QtCore import Qt, QTimer
+                            QInputDialog, QUndoStack, QProgressBar, QLineEdit,
+                            QApplication, QLabel)
+from PyQt5.QtGui import QIcon, QKeySequence
+from PyQt5.QtCore import Qt, QTimer, pyqtSignal
 
 # Абсолютные импорты из вашего пакета csv_editor
-from csv_editor.core.models.csv_table_model import UndoableStandardItemModel
+from csv_editor.core.models.csv_table_model import ColumnarTableModel
 from csv_editor.core.models.proxy_model import MySortFilterProxyModel
 from csv_editor.core.controllers.file_io import FileIOController
-from csv_editor.core.controllers.history import HistoryController
+from csv_editor.core.controllers.history import HistoryController, image_to_store
 from csv_editor.core.controllers.data_operations import DataOperationsController
 from csv_editor.core.utils.audit_log import AuditLogger
-from csv_editor.core.utils.exporters.excel import ExcelExporter
+from csv_editor.core.utils.journal import EditJournal
+from csv_editor.core.utils.perf import monitor
+from csv_editor.core.utils.exporters.excel import ExcelExporter, ExcelExportWorker
+from csv_editor.core.utils.importers.excel_reader import sheet_names
 
-# Импорты UI-компонентов
-from csv_editor.ui.dialogs.settings import SettingsDialog
-from csv_editor.ui.dialogs.history_browser import HistoryBrowserDialog
-from csv_editor.ui.dialogs.comparison import TableComparisonDialog
-from csv_editor.ui.dialogs.group_dialog import GroupDialog
+# Импорты UI-компонентов. Диалоги импортируются в методах, которые их
+# открывают: при запуске окна они не нужны (см. benchmarks/bench_startup.py)
 from csv_editor.ui.delegates import MultiLineDelegate
 
+# Пауза после ввода в поле фильтра, после которой запускается фильтрация (мс)
+FILTER_DELAY_MS = 250
+# Операции короче этого (секунды) не показываются в строке состояния
+STATUS_SPAN_SECONDS = 0.05
+
 
 class MainWindow(QMainWindow):
+    # Замер операции из любого потока; в GUI-поток доставляется очередью
+    span_finished = pyqtSignal(object)
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Advanced CSV Editor")
@@ -40,22 +50,34 @@ class MainWindow(QMainWindow):
         # Загрузка настроек
         self.load_settings()
         
-        # Таймер автосохранения
-        self.autosave_timer = QTimer(self)
-        self.autosave_timer.timeout.connect(self.autosave)
-        self.autosave_timer.start(300000)  # 5 минут
+        # Автосохранение: журнал правок пишется в фоне после каждой правки
+        self.recover_journal()
+        self.journal.start()
+        
+        # Фоновая загрузка CSV: пачки из очереди загрузчика догружаются
+        # в модель по одной за итерацию цикла событий, не блокируя интерфейс
+        self.loader = None
+        self.fetch_timer = QTimer(self)
+        self.fetch_timer.setInterval(0)
+        self.fetch_timer.timeout.connect(self.fetch_pending_rows)
+        self.export_worker = None
+        # Фоновая запись кэша сессии после загрузки CSV (см. session_cache)
+        self.cache_writer = None
     
     def init_models(self):
         self.undo_stack = QUndoStack(self)
-        self.model = UndoableStandardItemModel(0, 0, self, self.undo_stack)
+        self.model = ColumnarTableModel(0, 0, self, self.undo_stack)
         self.proxy_model = MySortFilterProxyModel(self)
         self.proxy_model.setSourceModel(self.model)
+        self.proxy_model.enable_search_index()
+        self.proxy_model.set_filter_delay(FILTER_DELAY_MS)
     
     def init_controllers(self):
         self.file_io = FileIOController(self.model)
         self.history = HistoryController(self.model, self.undo_stack)  # Передаем model
         self.data_ops = DataOperationsController(self.model, self.undo_stack)
         self.audit_log = AuditLogger()
+        self.journal = EditJournal(self.model, self.undo_stack)
         self.excel_exporter = ExcelExporter(self.model)  # Инициализация экспортера
     
     def init_ui(self):
@@ -69,6 +91,14 @@ class MainWindow(QMainWindow):
         self.create_toolbars()
         self.status_bar = QStatusBar()
         self.setStatusBar(self.status_bar)
+        self.load_progress = QProgressBar()
+        self.load_progress.setMaximumWidth(200)
+        self.load_progress.setRange(0, 100)
+        self.load_progress.hide()
+        self.status_bar.addPermanentWidget(self.load_progress)
+        # Длительность последней заметной операции (см. core.utils.perf)
+        self.perf_label = QLabel()
+        self.status_bar.addPermanentWidget(self.perf_label)
         
         # Настройка делегатов
         self.setup_delegates()
@@ -84,10 +114,19 @@ class MainWindow(QMainWindow):
         open_action.triggered.connect(self.open_file)
         file_menu.addAction(open_action)
         
+        open_lazy_action = QAction("Open Large File (Lazy)", self)
+        open_lazy_action.triggered.connect(self.open_large_file)
+        file_menu.addAction(open_lazy_action)
+        
         save_action = QAction("Save", self)
         save_action.triggered.connect(self.save_file)
         file_menu.addAction(save_action)
         
+        self.cancel_load_action = QAction("Cancel Loading", self)
+        self.cancel_load_action.setEnabled(False)
+        self.cancel_load_action.triggered.connect(self.cancel_loading)
+        file_menu.addAction(self.cancel_load_action)
+        
         # Подменю Import
         import_menu = file_menu.addMenu("Import")
         
@@ -133,6 +172,35 @@ class MainWindow(QMainWindow):
         redo_action.triggered.connect(self.undo_stack.redo)
         edit_menu.addAction(redo_action)
         
+        edit_menu.addSeparator()
+        
+        copy_action = QAction("Copy", self)
+        copy_action.setShortcut(QKeySequence.Copy)
+        copy_action.triggered.connect(self.copy_selection)
+        edit_menu.addAction(copy_action)
+        
+        paste_action = QAction("Paste", self)
+        paste_action.setShortcut(QKeySequence.Paste)
+        paste_action.triggered.connect(self.paste_clipboard)
+        edit_menu.addAction(paste_action)
+        
+        fill_down_action = QAction("Fill Down", self)
+        fill_down_action.setShortcut(QKeySequence("Ctrl+D"))
+        fill_down_action.triggered.connect(self.fill_down)
+        edit_menu.addAction(fill_down_action)
+        
+        clear_action = QAction("Clear Contents", self)
+        clear_action.setShortcut(QKeySequence.Delete)
+        clear_action.triggered.connect(self.clear_selection)
+        edit_menu.addAction(clear_action)
+        
+        edit_menu.addSeparator()
+        
+        replace_action = QAction("Find and Replace...", self)
+        replace_action.setShortcut(QKeySequence.Replace)
+        replace_action.triggered.connect(self.show_find_replace)
+        edit_menu.addAction(replace_action)
+        
         # Меню Data
         data_menu = menubar.addMenu("Data")
         
@@ -140,6 +208,10 @@ class MainWindow(QMainWindow):
         group_action.triggered.connect(self.show_group_dialog)
         data_menu.addAction(group_action)
         
+        pivot_action = QAction("Pivot Table", self)
+        pivot_action.triggered.connect(self.show_pivot_dialog)
+        data_menu.addAction(pivot_action)
+        
         # Меню History
         history_menu = menubar.addMenu("History")
         show_history = QAction("Show History", self)
@@ -151,6 +223,10 @@ class MainWindow(QMainWindow):
         compare_tables = QAction("Compare Tables", self)
         compare_tables.triggered.connect(self.compare_tables)
         tools_menu.addAction(compare_tables)
+        
+        performance_action = QAction("Performance...", self)
+        performance_action.triggered.connect(self.show_performance)
+        tools_menu.addAction(performance_action)
     
     def create_toolbars(self):
         toolbar = QToolBar("Main Toolbar")
@@ -164,6 +240,20 @@ class MainWindow(QMainWindow):
         save_action = QAction(QIcon.fromTheme("document-save"), "Save", self)
         save_action.triggered.connect(self.save_file)
         toolbar.addAction(save_action)
+        
+        toolbar.addAction(self.cancel_load_action)
+        
+        toolbar.addSeparator()
+        self.filter_edit = QLineEdit()
+        self.filter_edit.setPlaceholderText("Filter rows...")
+        self.filter_edit.setClearButtonEnabled(True)
+        self.filter_edit.setMaximumWidth(250)
+        self.filter_edit.textChanged.connect(self.on_filter_text_changed)
+        toolbar.addWidget(self.filter_edit)
+    
+    def on_filter_text_changed(self, text):
+        # Все слова должны встречаться в строке; фильтрация отложенная
+        self.proxy_model.set_extended_filter(text.split(), True)
     
     def setup_delegates(self):
         self.multi_line_delegate = MultiLineDelegate()
@@ -175,39 +265,206 @@ class MainWindow(QMainWindow):
                 self, "Open CSV File", "", "CSV Files (*.csv);;All Files (*)"
             )
             if filename:
-                self.file_io.load_csv(filename)
-                self.history.take_snapshot(f"Opened file: {filename}")
+                self.start_loading(filename)
+    
+    def open_large_file(self):
+        filename, _ = QFileDialog.getOpenFileName(
+            self, "Open Large CSV File", "", "CSV Files (*.csv);;All Files (*)"
+        )
+        if filename:
+            try:
+                self.file_io.open_csv_lazy(filename)
+            except Exception as e:
+                QMessageBox.critical(self, "Error", f"Failed to open CSV: {e}")
+                return
+            self.status_bar.showMessage(
+                f"Opened {filename} lazily: {self.model.rowCount()} rows"
+            )
+    
+    def start_loading(self, filename, sheet=None):
+        """Фоновая загрузка CSV, а при указанном листе — книги Excel"""
+        if self.loader is not None:
+            self.loader.progress.disconnect(self.on_load_progress)
+            self.loader.failed.disconnect(self.on_load_failed)
+            self.loader.cancel()
+            self.loader.wait()
+        self.loading_file = filename
+        if sheet is None and self.open_cached(filename):
+            return
+        # Правки во время загрузки видны по стеку отмены (см. on_load_finished)
+        self.load_undo_state = (self.undo_stack.index(), self.undo_stack.count())
+        if sheet is None:
+            self.loader = self.file_io.start_csv_load(filename)
+        else:
+            self.loader = self.file_io.start_excel_load(filename, sheet)
+        self.loader.progress.connect(self.on_load_progress)
+        self.loader.failed.connect(self.on_load_failed)
+        self.loading_csv = sheet is None
+        self.load_progress.setValue(0)
+        self.load_progress.show()
+        self.cancel_load_action.setEnabled(True)
+        self.status_bar.showMessage(f"Loading {filename}...")
+        self.fetch_timer.start()
+    
+    def open_cached(self, filename):
+        """Открывает CSV из кэша сессии без разбора; False, если кэша нет"""
+        try:
+            if not self.file_io.open_cached_csv(filename):
+                return False
+        except OSError:
+            # Ошибку чтения файла покажет обычная загрузка
+            return False
+        self.fetch_timer.stop()
+        self.load_progress.hide()
+        self.cancel_load_action.setEnabled(False)
+        self.status_bar.showMessage(f"Loaded {self.model.rowCount()} rows from cache")
+        self.history.take_snapshot(f"Opened file: {filename}")
+        return True
+    
+    def is_loading(self):
+        return self.fetch_timer.isActive()
+    
+    def cancel_loading(self):
+        if self.is_loading():
+            self.loader.cancel()
+        if self.export_worker is not None and self.export_worker.isRunning():
+            self.export_worker.requestInterruption()
+    
+    def fetch_pending_rows(self):
+        if self.model.canFetchMore():
+            self.model.fetchMore()
+        elif self.loader.isFinished():
+            self.on_load_finished()
+    
+    def on_load_progress(self, done, total):
+        if total:
+            self.load_progress.setValue(int(done * 100 / total))
+        # Параллельный разбор узнаёт число строк только в конце
+        if self.loader.rows_loaded or not total:
+            self.status_bar.showMessage(
+                f"Loading {self.loading_file}: {self.loader.rows_loaded} rows"
+            )
+        else:
+            self.status_bar.showMessage(
+                f"Loading {self.loading_file}: {done * 100 // total}%"
+            )
+    
+    def on_load_failed(self, message):
+        QMessageBox.critical(self, "Error", f"Failed to load {self.loading_file}: {message}")
+    
+    def on_load_finished(self):
+        self.model.end_incremental_load()
+        # Параллельный разбор отдаёт таблицу целиком, а не пачками
+        if self.loader.store is not None:
+            self.model.set_store(self.loader.store)
+        self.fetch_timer.stop()
+        self.load_progress.hide()
+        self.cancel_load_action.setEnabled(False)
+        rows = self.model.rowCount()
+        if self.loader.was_cancelled():
+            self.status_bar.showMessage(f"Loading cancelled: {rows} rows loaded")
+        else:
+            self.status_bar.showMessage(f"Loaded {rows} rows")
+        # Во время загрузки строки дописывались в конец; индекс строим по всему файлу
+        self.proxy_model.rebuild_search_index()
+        self.history.take_snapshot(f"Opened file: {self.loading_file}")
+        # Кэш сессии — только для целиком загруженного CSV без правок
+        unchanged = self.load_undo_state == (self.undo_stack.index(), self.undo_stack.count())
+        if (self.loading_csv and unchanged and not self.loader.was_cancelled()
+                and self.loader.error is None):
+            self.cache_writer = self.file_io.save_session_cache(
+                self.loading_file, search_index=self.proxy_model.search_index
+            )
     
     def save_file(self, file_type='csv'):
+        if self.is_loading():
+            self.status_bar.showMessage("Wait for the file to finish loading")
+            return
         if file_type == 'csv':
             filename, _ = QFileDialog.getSaveFileName(
                 self, "Save CSV File", "", "CSV Files (*.csv);;All Files (*)"
             )
-            if filename:
+            if not filename:
+                return
+            try:
                 self.file_io.save_csv(filename)
+            except Exception as e:
+                QMessageBox.critical(self, "Error", f"Failed to save CSV: {e}")
+                return
+            # Сохранённые правки восстанавливать не нужно: журнал удаляется
+            self.undo_stack.setClean()
     
     def import_excel(self):
         filename, _ = QFileDialog.getOpenFileName(
             self, "Import Excel", "", "Excel Files (*.xlsx)"
         )
-        if filename:
-            if self.file_io.import_excel(filename):
-                self.history.take_snapshot(f"Imported from Excel: {filename}")
-                self.audit_log.log(
-                    "import_excel", 
-                    {"file": filename}
-                )
+        if not filename:
+            return
+        try:
+            sheets = sheet_names(filename)
+        except Exception as e:
+            QMessageBox.critical(self, "Excel Import Error", str(e))
+            return
+        sheet = sheets[0]
+        if len(sheets) > 1:
+            sheet, ok = QInputDialog.getItem(self, "Select Sheet", "Sheet:", sheets, 0, False)
+            if not ok:
+                return
+        # Лист читается в фоне пачками, как CSV; снимок истории — по окончании
+        self.start_loading(filename, sheet)
+        self.audit_log.log(
+            "import_excel", 
+            {"file": filename, "sheet": sheet}
+        )
     
     def export_to_excel(self):
+        if self.is_loading() or (self.export_worker is not None and self.export_worker.isRunning()):
+            self.status_bar.showMessage("Wait for the current operation to finish")
+            return
         filename, _ = QFileDialog.getSaveFileName(
             self, "Export Excel", "", "Excel Files (*.xlsx)"
         )
-        if filename:
-            if self.excel_exporter.export(filename):
-                self.audit_log.log(
-                    "export_excel", 
-                    {"file": filename}
-                )
+        if not filename:
+            return
+        if not self.model.store.in_memory:
+            # Отображённый файл и таблица SQLite читаются только из GUI-потока
+            try:
+                self.excel_exporter.export(filename)
+            except Exception as e:
+                QMessageBox.critical(self, "Excel Export Error", str(e))
+                return
+            self.audit_log.log("export_excel", {"file": filename})
+            return
+        self.export_worker = ExcelExportWorker(self.model.store, filename, self)
+        self.export_worker.progress.connect(self.on_export_progress)
+        self.export_worker.failed.connect(self.on_export_failed)
+        self.export_worker.finished.connect(self.on_export_finished)
+        self.load_progress.setValue(0)
+        self.load_progress.show()
+        self.cancel_load_action.setEnabled(True)
+        self.status_bar.showMessage(f"Exporting to {filename}...")
+        self.export_worker.start()
+    
+    def on_export_progress(self, done, total):
+        if total:
+            self.load_progress.setValue(int(done * 100 / total))
+        self.status_bar.showMessage(f"Exporting: {done} of {total} rows")
+    
+    def on_export_failed(self, message):
+        QMessageBox.critical(self, "Excel Export Error", message)
+    
+    def on_export_finished(self):
+        self.load_progress.hide()
+        self.cancel_load_action.setEnabled(False)
+        worker = self.export_worker
+        if worker.completed:
+            self.status_bar.showMessage(f"Exported {worker.total} rows to {worker.filename}")
+            self.audit_log.log(
+                "export_excel", 
+                {"file": worker.filename}
+            )
+        else:
+            self.status_bar.showMessage("Export to Excel was not completed")
     
     def export_markdown(self):
         filename, _ = QFileDialog.getSaveFileName(
@@ -226,8 +483,15 @@ class MainWindow(QMainWindow):
                 self, "Select Table", "Enter table name:"
             )
             if ok and table_name:
-                if self.file_io.import_sqlite(filename, table_name):
-                    self.history.take_snapshot(f"Imported from SQLite: {table_name}")
+                try:
+                    self.file_io.open_sqlite(filename, table_name)
+                except Exception as e:
+                    QMessageBox.critical(self, "SQLite Import Error", str(e))
+                    return
+                self.history.take_snapshot(f"Opened SQLite table: {table_name}")
+                self.status_bar.showMessage(
+                    f"Opened {table_name}: {self.model.rowCount()} rows"
+                )
     
     def export_sqlite(self):
         filename, _ = QFileDialog.getSaveFileName(
@@ -237,55 +501,202 @@ class MainWindow(QMainWindow):
             table_name, ok = QInputDialog.getText(
                 self, "Table Name", "Enter table name for export:"
             )
-            if ok and table_name:
-                if self.file_io.export_sqlite(filename, table_name):
-                    self.audit_log.log(
-                        "export_sqlite", 
-                        {"file": filename, "table": table_name}
-                    )
+            if not ok or not table_name:
+                return
+            columns, ok = QInputDialog.getText(
+                self, "Indexes", "Columns to index (comma-separated, optional):"
+            )
+            if not ok:
+                return
+            index_columns = [name.strip() for name in columns.split(",") if name.strip()]
+            try:
+                self.file_io.export_sqlite(filename, table_name, index_columns)
+            except Exception as e:
+                QMessageBox.critical(self, "SQLite Export Error", str(e))
+                return
+            self.audit_log.log(
+                "export_sqlite", 
+                {"file": filename, "table": table_name, "indexes": index_columns}
+            )
+    
+    def selected_blocks(self):
+        """Выделение вида как список блоков (строки источника, столбцы)"""
+        blocks = []
+        for part in self.view.selectionModel().selection():
+            rows = self.proxy_model.source_rows(part.top(), part.bottom())
+            blocks.append((rows, range(part.left(), part.right() + 1)))
+        return blocks
+    
+    def copy_selection(self):
+        # Копируется охватывающий прямоугольник выделения, значения через табуляцию
+        selection = self.view.selectionModel().selection()
+        if selection.isEmpty():
+            return
+        rows = self.proxy_model.source_rows(min(part.top() for part in selection),
+                                            max(part.bottom() for part in selection))
+        columns = range(min(part.left() for part in selection),
+                        max(part.right() for part in selection) + 1)
+        store = self.model.store
+        text = io.StringIO()
+        writer = csv.writer(text, delimiter='\t', lineterminator='\n')
+        writer.writerows([store.cell(row, col) for col in columns] for row in rows)
+        QApplication.clipboard().setText(text.getvalue())
+    
+    def paste_clipboard(self):
+        text = QApplication.clipboard().text()
+        block = list(csv.reader(io.StringIO(text), delimiter='\t'))
+        if not block:
+            return
+        # Блок вставляется от левого верхнего угла выделения (или текущей ячейки)
+        selection = self.view.selectionModel().selection()
+        if not selection.isEmpty():
+            top = min(part.top() for part in selection)
+            left = min(part.left() for part in selection)
+        else:
+            index = self.view.currentIndex()
+            if not index.isValid():
+                return
+            top, left = index.row(), index.column()
+        rows = self.proxy_model.source_rows(top, top + len(block) - 1)
+        columns = range(left, min(left + max(map(len, block)), self.model.columnCount()))
+        if self.data_ops.paste_block(rows, columns, block):
+            self.status_bar.showMessage(
+                f"Pasted {min(len(rows), len(block))} rows x {len(columns)} columns"
+            )
+    
+    def fill_down(self):
+        self.data_ops.fill_down(self.selected_blocks())
+    
+    def clear_selection(self):
+        self.data_ops.clear_cells(self.selected_blocks())
+    
+    def show_find_replace(self):
+        from csv_editor.ui.dialogs.find_replace import FindReplaceDialog
+        headers = [self.model.headerData(col, Qt.Horizontal) or f"Column {col}"
+                  for col in range(self.model.columnCount())]
+        selected = sorted({col for rows, columns in self.selected_blocks() for col in columns})
+        proxy = self.proxy_model
+        dialog = FindReplaceDialog(
+            self.model.store, headers, selected,
+            lambda: proxy.source_rows(0, proxy.rowCount() - 1),
+            self.data_ops.replace_cells, self
+        )
+        dialog.exec_()
     
     def show_group_dialog(self):
+        from csv_editor.ui.dialogs.group_dialog import GroupDialog, GroupResultDialog
         headers = [self.model.headerData(col, Qt.Horizontal) or f"Column {col}" 
                   for col in range(self.model.columnCount())]
         dialog = GroupDialog(headers, self)
         if dialog.exec_():
             selections = dialog.get_selections()
+            if not selections['group_columns']:
+                QMessageBox.warning(self, "Group Data", "Select at least one column to group by")
+                return
             # Применяем группировку
             result = self.data_ops.group_data(
-                selections['group_column'],
+                selections['group_columns'],
                 selections['aggregations']
             )
-            # Показываем результат
-            QMessageBox.information(
-                self, 
-                "Grouping Result", 
-                f"Data grouped by {selections['group_column']}\n"
-                f"Found {len(result)} groups"
-            )
+            # Показываем результат в отдельном окне
+            names = ", ".join(headers[col] for col in selections['group_columns'])
+            result_dialog = GroupResultDialog(result, f"Grouped by {names}", self)
+            result_dialog.setAttribute(Qt.WA_DeleteOnClose)
+            result_dialog.show()
+            self.status_bar.showMessage(f"Data grouped by {names}: {result.row_count()} groups")
             self.audit_log.log(
                 "group_data", 
                 selections
             )
     
+    def show_pivot_dialog(self):
+        from csv_editor.ui.dialogs.pivot_dialog import PivotDialog, PivotResultDialog
+        headers = [self.model.headerData(col, Qt.Horizontal) or f"Column {col}" 
+                  for col in range(self.model.columnCount())]
+        dialog = PivotDialog(headers, self)
+        if dialog.exec_():
+            selections = dialog.get_selections()
+            if not selections['row_columns'] or not selections['column_columns']:
+                QMessageBox.warning(self, "Pivot Table", "Select row and column fields")
+                return
+            pivot = self.data_ops.pivot_data(
+                selections['row_columns'],
+                selections['column_columns'],
+                selections['value_column'],
+                selections['aggregate']
+            )
+            result_dialog = PivotResultDialog(pivot, self)
+            result_dialog.setAttribute(Qt.WA_DeleteOnClose)
+            result_dialog.show()
+            self.audit_log.log(
+                "pivot_data", 
+                selections
+            )
+    
     def show_history(self):
+        from csv_editor.ui.dialogs.history_browser import HistoryBrowserDialog
         dialog = HistoryBrowserDialog(self.history, self)
         if dialog.exec_():
             selected = dialog.get_selected_snapshot()
             self.history.restore_snapshot(selected)
     
     def compare_tables(self):
+        from csv_editor.ui.dialogs.comparison import TableComparisonDialog
         dialog = TableComparisonDialog(self.model, self)
         if dialog.exec_():
             # Обработка результатов сравнения
             pass
     
-    def autosave(self):
-        data = self.history._get_model_data()
-        try:
-            with open("autosave.json", "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=4)
-        except Exception as e:
-            print(f"Autosave failed: {e}")
+    def show_performance(self):
+        from csv_editor.ui.dialogs.performance import PerformanceDialog
+        dialog = PerformanceDialog(monitor, self)
+        dialog.setAttribute(Qt.WA_DeleteOnClose)
+        dialog.show()
+    
+    def on_span_finished(self, span):
+        if span.seconds < STATUS_SPAN_SECONDS:
+            return
+        text = f"{span.name}: {span.seconds:.2f} s"
+        rows = span.counters.get('rows')
+        if rows:
+            text += f", {rows:,} rows"
+        self.perf_label.setText(text)
+    
+    def recover_journal(self):
+        if not self.journal.has_recovery():
+            return
+        answer = QMessageBox.question(
+            self, "Recovery",
+            "Unsaved changes from the previous session were found. Restore them?",
+            QMessageBox.Yes | QMessageBox.No
+        )
+        if answer == QMessageBox.Yes:
+            image = self.journal.recover()
+            if image is not None:
+                self.model.set_store(image_to_store(image))
+                self.history.take_snapshot("Recovered unsaved changes")
+                return
+            QMessageBox.warning(self, "Recovery", "The autosave journal is damaged")
+        self.journal.discard()
+    
+    def closeEvent(self, event):
+        # Фоновые потоки Qt нельзя уничтожать работающими
+        if self.loader is not None:
+            self.loader.cancel()
+            self.loader.wait()
+        self.proxy_model.stop_filter_passes()
+        if self.export_worker is not None:
+            self.export_worker.wait()
+        # Недописанный кэш оставил бы на диске временный файл
+        if self.cache_writer is not None:
+            self.cache_writer.join()
+        # Хранилище SQLite дописывает ещё не отправленные правки
+        self.model.store.close()
+        self.journal.close()
+        self.audit_log.close()
+        monitor.remove_listener(self.span_listener)
+        monitor.close()
+        super().closeEvent(event)
     
     def load_settings(self):
         # Здесь будет загрузка настроек
@@ -293,6 +704,9 @@ class MainWindow(QMainWindow):
     
     def init_connections(self):
         self.model.dataChanged.connect(self.on_data_changed)
+        self.span_finished.connect(self.on_span_finished)
+        self.span_listener = self.span_finished.emit
+        monitor.add_listener(self.span_listener)
     
     def on_data_changed(self):
         self.status_bar.showMessage("Data changed")
@@ -10,4 +10,7 @@ setup(
         'sqlite3>=3.35'  # Обычно входит в стандартную библиотеку
     ],
     python_requires='>=3.8',
+    entry_points={
+        'console_scripts': ['csv_editor=csv_editor.cli:main'],
+    },
 )
@@ -0,0 +1,24 @@
+import pytest
+
+from csv_editor.core.models.column_types import INT, FLOAT, DATE, TEXT, infer_keys
+
+
+@pytest.mark.parametrize("values, kind", [
+    (["1", "-2", "", "+3", "007"], INT),
+    (["1.5", "2", ".5", "5.", "1e3", "-2E-2"], FLOAT),
+    (["01.01.2020", "2020-01-02"], DATE),
+    (["nan", "1"], TEXT),
+    (["inf", "2.5"], TEXT),
+    (["Infinity"], TEXT),
+    (["1_000", "2"], TEXT),
+    ([" 5", "6"], TEXT),
+    (["5\n", "6"], TEXT),
+    (["١٢"], TEXT),
+])
+def test_only_plain_decimal_literals_are_numbers(values, kind):
+    assert infer_keys(values)[0] == kind
+
+
+def test_float_column_rejects_non_finite_values():
+    assert infer_keys(["nan"], INT) == (TEXT, None)
+    assert infer_keys(["-inf"], FLOAT) == (TEXT, None)
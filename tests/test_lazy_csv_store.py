@@ -0,0 +1,65 @@
+import csv
+
+import pytest
+
+from csv_editor.core.models.lazy_csv_store import LazyCsvStore, build_row_index
+
+
+def write_rows(path, rows, first_line="", delimiter=","):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        f.write(first_line)
+        csv.writer(f, delimiter=delimiter).writerows(rows)
+
+
+def expected_rows(path, delimiter=","):
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.reader(f, delimiter=delimiter))
+    width = max(map(len, rows))
+    return [row + [""] * (width - len(row)) for row in rows]
+
+
+CASES = {
+    "stray quote and multiline": (
+        [[i, f"multi\r\nline {i}\"" if i % 7 == 0 else f"v{i}", "y"] for i in range(2000)],
+        '1,5" screen,x\r\n',
+    ),
+    "stray quotes only": ([[i, f'{i}" screen', "x"] for i in range(2000)], ""),
+    "text after closing quote": ([[i, '"a"b"c', 'say "hi"'] for i in range(2000)],
+                                 '1,"a"b"c,z\n2,"x" "y",z\n'),
+    "multiline only": ([[i, f"a\nb {i}" if i % 3 == 0 else "c", 1.5] for i in range(2000)], ""),
+    "escaped quotes": ([[i, f'say ""{i}""\n', ""] for i in range(2000)], ""),
+}
+
+
+@pytest.mark.parametrize("case", sorted(CASES))
+def test_lazy_rows_match_csv_reader(tmp_path, case):
+    path = tmp_path / "data.csv"
+    rows, first_line = CASES[case]
+    write_rows(path, rows, first_line)
+    store = LazyCsvStore(str(path))
+    try:
+        assert list(store.rows()) == expected_rows(path)
+        assert store.row(store.row_count() - 1) == expected_rows(path)[-1]
+    finally:
+        store.close()
+
+
+def test_quote_after_other_delimiter(tmp_path):
+    path = tmp_path / "data.csv"
+    write_rows(path, [[i, f"x\n{i}", "a,b"] for i in range(500)],
+               '1;5" screen;x\n2;"a;""b""";c,"d\n', delimiter=";")
+    store = LazyCsvStore(str(path), ";")
+    try:
+        assert list(store.rows()) == expected_rows(path, ";")
+    finally:
+        store.close()
+
+
+@pytest.mark.parametrize("case", sorted(CASES))
+def test_small_blocks_give_same_index(tmp_path, case):
+    # Границы блоков попадают внутрь записей, в том числе в кавычках
+    path = tmp_path / "data.csv"
+    rows, first_line = CASES[case]
+    write_rows(path, rows, first_line)
+    data = path.read_bytes()
+    assert build_row_index(data, block_size=512) == build_row_index(data)
@@ -0,0 +1,53 @@
+import csv
+
+import pytest
+
+from csv_editor.core.utils.importers import parallel_csv
+
+
+def write_rows(path, rows, first_line=""):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        f.write(first_line)
+        csv.writer(f).writerows(rows)
+
+
+def expected_rows(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.reader(f))
+    width = max(map(len, rows))
+    return [row + [""] * (width - len(row)) for row in rows]
+
+
+@pytest.fixture(autouse=True)
+def small_ranges(monkeypatch):
+    # Маленькие диапазоны, чтобы файл на несколько килобайт резался на части
+    monkeypatch.setattr(parallel_csv, "MIN_RANGE_SIZE", 512)
+
+
+CASES = {
+    "stray quote and multiline": (
+        [[i, f"multi\r\nline {i}\"" if i % 7 == 0 else f"v{i}", "y"] for i in range(4000)],
+        '1,5" screen,x\r\n',
+    ),
+    "stray quotes only": ([[i, f'{i}" screen', "x"] for i in range(4000)], ""),
+    "multiline only": ([[i, f"a\nb {i}" if i % 3 == 0 else "c", 1.5] for i in range(4000)], ""),
+    "escaped quotes": ([[i, f'say ""{i}""\n', ""] for i in range(4000)], ""),
+}
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+@pytest.mark.parametrize("case", sorted(CASES))
+def test_parallel_parse_matches_csv_reader(tmp_path, case, workers):
+    path = tmp_path / "data.csv"
+    rows, first_line = CASES[case]
+    write_rows(path, rows, first_line)
+    store = parallel_csv.parse_csv_parallel(str(path), workers=workers)
+    assert list(store.rows()) == expected_rows(path)
+
+
+def test_last_line_without_newline(tmp_path):
+    path = tmp_path / "data.csv"
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        f.write("\n".join(f'{i},"q {i}\nx",z' for i in range(2000)))
+    store = parallel_csv.parse_csv_parallel(str(path), workers=1)
+    assert list(store.rows()) == expected_rows(path)